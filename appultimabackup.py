@@ -2,34 +2,45 @@
 # Dash App: Universal Operations Hub (Scraper, Case Claimer, PDF Extractor, Foodora)
 
 # --- Python Standard Library Imports ---
-import io
+import hashlib
 import os
 import re
 import shutil
 import subprocess
 import sys
-import tempfile
 import time
+import tempfile
 import zipfile
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urljoin, urlparse, urlencode
 import traceback
 import json
+import asyncio
 import queue 
 import threading 
 import logging
+import atexit
+from collections import deque
+from contextlib import nullcontext
 from datetime import datetime, timedelta 
+from functools import lru_cache
 import base64 # For dcc.Upload content
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
 
 # --- Third-Party Library Imports ---
+import numpy as np
+import openpyxl
 import pandas as pd
 import requests
-from bs4 import BeautifulSoup
-from PIL import Image, UnidentifiedImageError
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, SoupStrainer
+import lxml.html
+from lxml import etree
 from selenium import webdriver
 from selenium.common.exceptions import (
     ElementClickInterceptedException,
     InvalidSelectorException,
-    NoSuchElementException,
     StaleElementReferenceException,
     TimeoutException,
     WebDriverException,
@@ -37,24 +48,60 @@ from selenium.common.exceptions import (
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.common.keys import Keys
+from webdriver_manager.core.driver_cache import DriverCacheManager
 from selenium.webdriver.common.action_chains import ActionChains
-import fitz # PyMuPDF
+try: # Optional: HTTP/2 image downloads (pip install "httpx[http2]"); without it images download over http_session threads
+    import httpx
+    import h2 # noqa: F401 - httpx needs it for http2=True
+except ImportError:
+    httpx = None
+try: # Optional: faster, streaming Excel output (pip install xlsxwriter); without it Excel files are written with openpyxl write-only
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+try: # Optional: fastest values-only Excel writer for menu-sized sheets (pip install pyexcelerate)
+    import pyexcelerate
+except ImportError:
+    pyexcelerate = None
+try: # Optional: gzip for Dash's JSON/JS responses (pip install "dash[compress]"); downloads (.xlsx/.zip) and the /ui-events stream are never compressed
+    import flask_compress # noqa: F401 - Dash(compress=True) imports it itself
+except ImportError:
+    flask_compress = None
+try: # Optional: SIMD base64 decoding of uploads (pip install pybase64); without it the stdlib base64 module is used
+    import pybase64
+except ImportError:
+    pybase64 = None
+
+# --- Local Imports --- (worker-process code; see menu_workers.py)
+from menu_workers import MenuItem, sanitize_filename, decode_and_resize_image, write_processed_image, extract_text_and_images_from_pdf
 
 # --- Dash Imports ---
 import dash
+import flask
 from dash import dcc, html, Input, Output, State, callback_context, dash_table
 # from dash.exceptions import PreventUpdate # May be useful later
 
 # --- Constants ---
+# Process-pool workers ('spawn', see get_worker_process_pool) re-run this script as __mp_main__ before their first job; they only
+# need menu_workers, so start-up side effects that must happen once (temp dirs, the case-log writer thread) are skipped there
+IS_WORKER_PROCESS = __name__ == '__mp_main__'
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__)) if '__file__' in globals() else os.getcwd()
 IMAGES_OUTPUT_FOLDER = os.path.join(SCRIPT_DIR, "menu_images_output") 
 LOCAL_IMAGES_OUTPUT_FOLDER = os.path.join(SCRIPT_DIR, "local_images_processed") 
 PDF_IMAGES_OUTPUT_FOLDER = os.path.join(SCRIPT_DIR, "pdf_images_extracted") 
-CASE_LOG_FILE = os.path.join(SCRIPT_DIR, "case_activity_log.xlsx") 
+CASE_LOG_FILE = os.path.join(SCRIPT_DIR, "case_activity_log.csv") 
+FFMPEG_CACHE_FILE = os.path.join(SCRIPT_DIR, ".ffmpeg_cache.json") # Resolved FFmpeg path/version from the last startup
+LEGACY_CASE_LOG_XLSX_FILE = os.path.join(SCRIPT_DIR, "case_activity_log.xlsx") # Migrated to CASE_LOG_FILE on first read
+OUTPUT_FILES_DIR = UPLOADED_FILES_DIR = None
+if not IS_WORKER_PROCESS:
+    OUTPUT_FILES_DIR = tempfile.mkdtemp(prefix="menu_tool_outputs_") # Generated Excel/ZIP downloads live here (served by the /output-files route), removed at exit
+    atexit.register(shutil.rmtree, OUTPUT_FILES_DIR, ignore_errors=True)
+    UPLOADED_FILES_DIR = tempfile.mkdtemp(prefix="menu_tool_uploads_") # Decoded dcc.Upload contents; stores keep only the paths, removed at exit
+    atexit.register(shutil.rmtree, UPLOADED_FILES_DIR, ignore_errors=True)
 
 # Case Claimer Constants
 APPSHEET_URL = "https://www.appsheet.com/start/3a5110ed-bddf-4499-a905-803ec733f4c6#appName=TaskAllocationAppData-810076412&view=All%20Pending%20Tasks"
@@ -64,16 +111,46 @@ PROFILE_DIRECTORY = "Default"
 # --- Global Variables / Shared State ---
 # These are used for simplicity in this transition. For more complex apps,
 # consider using dcc.Store more extensively or other state management patterns.
-app_log_messages = [] 
-data_queue_claimer = queue.Queue() 
+MAX_LOG_LINES = 300
+DEBUG_LOGGING = os.environ.get('MENU_TOOL_DEBUG_LOG', '1') != '0' # set to 0 to drop "debug" entries before they are formatted
+app_log_messages = deque(maxlen=MAX_LOG_LINES) # Oldest lines drop off on append
+app_log_lock = threading.Lock() # add_log is called from worker threads (claimer, image pool)
+# Change counters pushed to the browser over /ui-events (Server-Sent Events); callbacks re-render only when theirs moves
+ui_change_condition = threading.Condition()
+ui_change_versions = {'claimer': 0, 'log': 0}
+
+def notify_ui_change(kind):
+    with ui_change_condition:
+        ui_change_versions[kind] += 1
+        ui_change_condition.notify_all()
+# Claimer thread -> Dash callback messages. deque append/popleft are atomic, so no Queue mutex; the consumer is woken by notify_ui_change
+data_queue_claimer = deque() # Claim results; unbounded so a slow UI never loses a claimed case
+CLAIMER_STATUS_QUEUE_MAX = 16
+claimer_status_queue = deque(maxlen=CLAIMER_STATUS_QUEUE_MAX) # Per-cycle statuses without a claim; only the newest matter, oldest dropped when full
 stop_event_claimer = threading.Event()
 active_portugal_case_store = {} 
 active_ghana_case_store = {}
+active_case_stores_lock = threading.Lock() # The claimer thread fills a slot as soon as it claims; Dash callbacks also assign/clear the stores
+active_cases_version = 0 # Bumped (under active_case_stores_lock) on every store change; pages skip re-rendering the cards when it hasn't moved
+
+def mark_active_cases_changed():
+    global active_cases_version
+    active_cases_version += 1
+
+def active_case_slots():
+    """(Portugal slot taken, Ghana slot taken), both read under active_case_stores_lock."""
+    with active_case_stores_lock: return bool(active_portugal_case_store), bool(active_ghana_case_store)
 monitoring_active_flag = False 
 claimer_status_message = "Idle. Press Start Monitoring." 
 claimer_thread_instance = None 
 
-ffmpeg_path_global = None
+# Shared HTTP session for page and image fetches (keep-alive connection pool sized for the download workers)
+http_session = requests.Session()
+http_session.mount('https://', HTTPAdapter(pool_connections=64, pool_maxsize=64))
+http_session.mount('http://', HTTPAdapter(pool_connections=64, pool_maxsize=64))
+IMAGE_DOWNLOAD_WORKERS = 32
+MENU_ITEM_COLUMNS = ['ID', 'image_filename', 'Category', 'Price', 'name in pt-PT', 'Description in pt-PT', 'image_url'] # MenuItem (menu_workers) fields line up with these
+
 ffmpeg_path_info_global = "Checking for FFmpeg..."
 ffmpeg_version_info_global = ""
 
@@ -88,28 +165,59 @@ if 'WDM_LOG' not in os.environ:
     os.environ['WDM_LOG'] = '0'
 
 # --- Logging Helper ---
-def add_log(message, level="info"):
-    global app_log_messages
+def add_log(message, level="info", *format_args):
+    """Appends a timestamped line to the in-app log (and stdout). With format_args, message is a %-format string that is
+    only formatted if the entry is kept, so hot loops can log debug detail without paying for it when DEBUG_LOGGING is off."""
+    if level == "debug" and not DEBUG_LOGGING: return
     try:
+        if format_args: message = message % format_args
         timestamp = time.strftime("%H:%M:%S"); levels = {"info": "ℹ️ INFO", "warning": "⚠️ WARN", "error": "❌ ERROR", "success": "✅ OK", "debug": "🐞 DEBUG"}
         prefix = levels.get(level, "INFO"); log_entry = f"[{timestamp} {prefix}] {message}"
-        app_log_messages.append(log_entry)
-        max_log_lines = 300 
-        if len(app_log_messages) > max_log_lines:
-            app_log_messages = app_log_messages[-max_log_lines:]
+        with app_log_lock: app_log_messages.append(log_entry)
+        notify_ui_change('log')
         print(log_entry) 
     except Exception as e: print(f"Error in add_log: {e}")
 
+def add_log_exception(message, level="error"):
+    """add_log(message + the traceback being handled); call from an except block. The traceback is only formatted if the entry is kept."""
+    if level == "debug" and not DEBUG_LOGGING: return
+    add_log("%s\n%s", level, message, traceback.format_exc())
+
+# --- Output Folders --- created once at startup; image writers assume they exist
+for output_folder_path in (IMAGES_OUTPUT_FOLDER, LOCAL_IMAGES_OUTPUT_FOLDER, PDF_IMAGES_OUTPUT_FOLDER):
+    try: os.makedirs(output_folder_path, exist_ok=True)
+    except OSError as e_mkdir: add_log(f"Error creating output folder {output_folder_path}: {e_mkdir}", "error")
+
 # --- Core Helper Functions ---
-def sanitize_filename(name):
-    name = str(name) if name is not None else ''; name_part, ext_part = os.path.splitext(name); name = name_part
-    name = re.sub(r'[\\/*?:"<>|]', "", name); name = name.replace(" ", "_"); name = re.sub(r'_+', '_', name)
-    name = re.sub(r'[^A-Za-z0-9_.-]+', '_', name); name = name[:100].strip('_ ')
-    return f"{name}{ext_part.lower()}" if ext_part else name
-
-def find_ffmpeg_on_startup(): 
-    global ffmpeg_path_global, ffmpeg_path_info_global, ffmpeg_version_info_global
-    if ffmpeg_path_global: return ffmpeg_path_global
+FFMPEG_VERSION_RE = re.compile(r'(ffmpeg version.*?)(built.*|$)')
+PRICE_STRIP_RE = re.compile(r'[^\d,.]')
+PRICE_PREFIX_RE = re.compile(r'\b(from|a partir de)\b\s*', re.IGNORECASE)
+UBER_NOT_A_NAME_RE = re.compile(r'^[\€\$\d.,\s]+kcal$|^[\€\$\d.,\s]+$')
+CSS_URL_RE = re.compile(r'url\("?([^")]*)"?\)')
+SRCSET_URL_RE = re.compile(r'(?:^|,)\s*(https?://[^\s,]+)') # the URL token of each comma-separated srcset candidate
+BAD_IMAGE_URL_RE = re.compile(r'data:image|placeholder|default[_ ]?image', re.IGNORECASE)
+
+def is_bad_image_url(image_url):
+    """True for missing, too-short, inline (data:) or placeholder image URLs."""
+    return not image_url or len(image_url) < 25 or BAD_IMAGE_URL_RE.search(image_url) is not None
+
+def last_srcset_url(srcset):
+    """Last (normally the largest) absolute URL in a srcset attribute, or None."""
+    srcset_urls = SRCSET_URL_RE.findall(srcset) if srcset else []
+    return srcset_urls[-1] if srcset_urls else None
+
+@lru_cache(maxsize=None) # detected once per process; callers just call get_ffmpeg_path() instead of checking a global first
+def get_ffmpeg_path(): 
+    """FFmpeg executable path (bundled, next to the script, or on PATH), or None. Also fills the FFmpeg info shown in the UI."""
+    global ffmpeg_path_info_global, ffmpeg_version_info_global
+    try:
+        with open(FFMPEG_CACHE_FILE, encoding='utf-8') as cache_f: ffmpeg_cache = json.load(cache_f)
+        cached_path = ffmpeg_cache.get('path')
+        if cached_path and os.path.exists(cached_path) and os.path.getmtime(cached_path) == ffmpeg_cache.get('mtime'):
+            ffmpeg_path_info_global = f"Found at: `{cached_path}`"; ffmpeg_version_info_global = ffmpeg_cache.get('version', '')
+            add_log(f"Info: FFmpeg found at {cached_path} (cached).", "info")
+            return cached_path
+    except (OSError, ValueError, AttributeError): pass # No/stale/corrupt cache: run full detection
     ffmpeg_exe_name = "ffmpeg.exe" if sys.platform == "win32" else "ffmpeg"; found_path = None
     if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
         bundled_path = os.path.join(sys._MEIPASS, ffmpeg_exe_name)
@@ -136,115 +244,305 @@ def find_ffmpeg_on_startup():
             version_info_line = "Could not verify version."
             if verify_process.returncode == 0 and verify_process.stdout:
                 version_info_line = verify_process.stdout.splitlines()[0].strip()
-                match = re.search(r'(ffmpeg version.*?)(built.*|$)', version_info_line)
+                match = FFMPEG_VERSION_RE.search(version_info_line)
                 version_info_line = match.group(1).strip() if match else version_info_line
             ffmpeg_version_info_global = f"`{version_info_line}`"
         except Exception as e: add_log(f"Could not verify FFmpeg version: {e}", "warning"); ffmpeg_version_info_global = "Could not verify version (error)."
-    ffmpeg_path_global = found_path
+    if found_path:
+        try:
+            with open(FFMPEG_CACHE_FILE, 'w', encoding='utf-8') as cache_f: json.dump({'path': found_path, 'mtime': os.path.getmtime(found_path), 'version': ffmpeg_version_info_global}, cache_f)
+        except OSError as e_cache: add_log(f"Debug: Could not write FFmpeg cache: {e_cache}", "debug")
     return found_path 
 
-def convert_image_with_ffmpeg(input_data, ffmpeg_executable_path, output_format='png'):
-    if not ffmpeg_executable_path: add_log("DEBUG: FFmpeg Error: No executable path.", "debug"); return None
-    temp_input_file = None; process = None
-    try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".img") as temp_f:
-            temp_input_file = temp_f.name; temp_f.write(input_data)
-        command = [ffmpeg_executable_path, '-y', '-loglevel', 'error', '-i', temp_input_file, '-f', 'image2pipe', '-vcodec', output_format, 'pipe:1']
-        startupinfo = None; creationflags = 0
-        if sys.platform == "win32":
-            startupinfo = subprocess.STARTUPINFO(); startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW; startupinfo.wShowWindow = subprocess.SW_HIDE; creationflags = subprocess.CREATE_NO_WINDOW
-        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, startupinfo=startupinfo, creationflags=creationflags)
-        stdout, stderr = process.communicate(timeout=15)
-        if process.returncode != 0: add_log(f"DEBUG: FFmpeg Error (Code {process.returncode}): {stderr.decode(errors='ignore').strip()}", "debug"); return None
-        elif stderr:
-            warning_message = stderr.decode(errors='ignore').strip()
-            if warning_message and "deprecated pixel format" not in warning_message.lower(): add_log(f"DEBUG: FFmpeg Warning: {warning_message}", "debug")
-        if not stdout: add_log(f"DEBUG: FFmpeg Error: No output data", "debug"); return None
-        return stdout
-    except FileNotFoundError: add_log(f"DEBUG: FFmpeg Error: Executable not found at '{ffmpeg_executable_path}'.", "debug"); return None
-    except subprocess.TimeoutExpired:
-        add_log("DEBUG: FFmpeg Error: Process timed out.", "debug")
-        if process:
-            try: process.kill(); process.communicate()
-            except Exception as kill_e: add_log(f"DEBUG: Exception during FFmpeg process kill: {kill_e}", "debug")
-        return None
-    except Exception as e: add_log(f"DEBUG: Error during FFmpeg processing: {e}", "debug"); return None
-    finally:
-        if temp_input_file and os.path.exists(temp_input_file):
-            try: os.remove(temp_input_file)
-            except Exception as e_del: add_log(f"DEBUG: Warn - Failed to delete temp file {temp_input_file}: {e_del}", "debug")
+TEXT_SPAN_CSS = "span[data-testid='text-type-display-span']"
+EMAIL_SPAN_CSS = "span[data-testid='email-type-display-span']"
+URL_SPAN_CSS = "span[class*='UrlTypeDisplay__text']"
+DATE_TIME_SPAN_CSS = "span[data-testid='date-time-type-display-span']"
+APPSHEET_ROW_CSS = "span[data-testid='table-view-row'][class*='TableViewRow']" # table rows; CSS matching is cheaper than the equivalent XPath
+APPSHEET_ROW_XPATH = "//span[@data-testid='table-view-row' and contains(@class, 'TableViewRow')]" # same rows, for the indexed (...)[n] re-lookup of a stale row
+MAIN_TASK_ID_SPAN_CSS = "div[data-testonly-column='Main Task ID'] " + TEXT_SPAN_CSS
+# Claimer locators, (By, selector) tuples passed straight to EC.*
+LOC_APP_LOADED = (By.XPATH, "//div[@data-testid='appname-and-viewname'] | //div[@title='All Pending Tasks'] | //div[contains(@class,'appsheet-container') and .//div[@role='table']]")
+LOC_SIDEBAR_ACTION_BAR = (By.XPATH, "//div[contains(@class, 'SlideshowPage__action-bar')]")
+LOC_START_TASK_BUTTON = (By.XPATH, "//span[@data-testonly-action='Start Task' and @data-testid='Start Task' and contains(@class, 'GenericActionButton')]")
+LOC_SLIDESHOW_CLOSE = (By.CSS_SELECTOR, "[data-testid='close']")
+LOC_APPSHEET_ROWS = (By.CSS_SELECTOR, APPSHEET_ROW_CSS)
+LOC_MAIN_TASK_ID_SPAN = (By.CSS_SELECTOR, MAIN_TASK_ID_SPAN_CSS)
+
+# Reads several AppSheet columns of every table row in a single WebDriver round-trip: first matching span inside each column's div.
+# Returns [row element, {column: text or null}, row id or null] per row.
+ALL_ROWS_FIELDS_JS = """
+const rows = document.querySelectorAll(arguments[0]), fields = arguments[1];
+return Array.from(rows, row => {
+    const out = {};
+    for (const [col, spanSel] of fields) {
+        const colDiv = row.querySelector(`div[data-testonly-column='${col}']`);
+        const span = colDiv && colDiv.querySelector(spanSel);
+        const txt = span ? (span.innerText || span.textContent || '').trim() : '';
+        out[col] = txt || null;
+    }
+    return [row, out, row.id || null];
+});
+"""
+
+ROW_SCAN_FIELDS = { # Everything the claimer uses from a row (scan, claim details, colleague log), read for all rows in one execute_script
+    "Main Task ID": (TEXT_SPAN_CSS, ""), "Status": (TEXT_SPAN_CSS, "Status Not Specified"),
+    "Country": (TEXT_SPAN_CSS, "Country Not Specified"), "Useremail": (EMAIL_SPAN_CSS, "N/A"),
+    "Account Name": (TEXT_SPAN_CSS, "N/A"), "Case Title": (TEXT_SPAN_CSS, "N/A"),
+    "Menu link": (URL_SPAN_CSS, "N/A"), "Dish Photos Link": (URL_SPAN_CSS, "N/A"),
+    "Menu instructions": (TEXT_SPAN_CSS, "N/A"), "Menu Request Sent Date": (DATE_TIME_SPAN_CSS, "N/A"),
+    "Created By": (TEXT_SPAN_CSS, "N/A"),
+}
 
-def extract_field_data(row_element, column_name, span_sub_xpath="//span[@data-testid='text-type-display-span']", default_value="Not Specified"):
-    field_text = default_value
-    try:
-        if not isinstance(row_element, webdriver.remote.webelement.WebElement):
-            add_log(f"DEBUG Extract: Invalid row_element type for '{column_name}'.", "debug"); return default_value
-        column_div_xpath = f".//div[@data-testonly-column='{column_name}']"
-        column_divs = row_element.find_elements(By.XPATH, column_div_xpath) 
-        if not column_divs: return default_value
-        column_div = column_divs[0]
-        target_elements = column_div.find_elements(By.XPATH, "." + span_sub_xpath)
-        if not target_elements: return default_value
-        target_element = target_elements[0]
-        raw_text = target_element.text
-        stripped_text = raw_text.strip() if raw_text else ""
-        if stripped_text: field_text = stripped_text
-    except NoSuchElementException: pass 
-    except StaleElementReferenceException: add_log(f"WARNING Extract StaleElement: Col='{column_name}'. Raising.", "warning"); raise 
-    except WebDriverException as e_wd: add_log(f"CRITICAL WebDriver ERROR Extract: Col='{column_name}', WebDriverException: {e_wd}. Raising.", "error"); raise 
-    except Exception as e: add_log(f"ERROR Extract (Other type): Col='{column_name}', Exception: {e}. Using default.", "error")
-    return field_text
+# Row click in one command: AppSheet overlays intercept native clicks on grid rows, so the JS click was the path that worked anyway
+SCROLL_AND_CLICK_JS = "arguments[0].scrollIntoView({block: 'center', inline: 'nearest'}); arguments[0].click();"
+
+# Scrolls a row to the middle of the viewport and reports whether it is rendered (non-zero box) with its key child span present
+ROW_SCROLL_AND_CHECK_JS = """
+const row = arguments[0];
+row.scrollIntoView({behavior: 'auto', block: 'center', inline: 'nearest'});
+const box = row.getBoundingClientRect();
+return box.width > 0 && box.height > 0 && row.querySelector(arguments[1]) !== null;
+"""
+
+def scan_appsheet_rows(driver, field_specs):
+    """field_specs: {column_name: (span_css, default_value)}. Returns [(row_element, {column_name: stripped text or default}, row_id_attr)]
+    for every APPSHEET_ROW_CSS row, in page order. Only a row that is then clicked needs further WebDriver calls."""
+    raw_rows = driver.execute_script(ALL_ROWS_FIELDS_JS, APPSHEET_ROW_CSS, [[col, span_css] for col, (span_css, _) in field_specs.items()]) or []
+    return [(row_element, {col: ((raw_values or {}).get(col) or default_value) for col, (_, default_value) in field_specs.items()}, row_id_attr)
+            for row_element, raw_values, row_id_attr in raw_rows]
 
 def format_duration(seconds):
     if seconds is None or not isinstance(seconds, (int, float)) or seconds < 0: return "N/A"
     try: return str(timedelta(seconds=int(seconds)))
     except Exception: return "N/A"
 
+BOT_ASSIGNED_USER = "BOT_CLAIMED" # 'Assigned User' of cases the bot claimed/finished; excluded from the leaderboards
+BOT_ASSIGNED_USER_LOWER = BOT_ASSIGNED_USER.lower() # Case-insensitive "is this the bot" checks compare against this
+COLLEAGUE_LOG_STATUSES = frozenset(("inprogress", "escalated", "completed")) # Lowercased grid statuses worth logging for colleagues
 LOG_COLUMNS_DEFINITION = ['Date', 'Observed Timestamp', 'Claimed Timestamp', 'Finished Timestamp', 'Duration (seconds)', 'Duration (HH:MM:SS)', 'Case Display ID', 'Country', 'Assigned User', 'Status (Observed)', 'Account Name', 'Case Title', 'Menu Link']
+# Everything but the numeric duration is read back as text, as the xlsx log kept it: IDs keep leading zeros and never turn into 12345.0
+CASE_LOG_CSV_DTYPES = {col: str for col in LOG_COLUMNS_DEFINITION if col != 'Duration (seconds)'}
+
+def read_xlsx_streaming(xlsx_path):
+    """Reads the first sheet with a read-only openpyxl workbook (rows streamed as values, no cell objects). Falls back to pd.read_excel."""
+    try:
+        wb = openpyxl.load_workbook(xlsx_path, read_only=True, data_only=True)
+        try:
+            rows = wb.active.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None: return pd.DataFrame()
+            return pd.DataFrame(list(rows), columns=list(header))
+        finally: wb.close()
+    except Exception as e_stream:
+        add_log(f"Debug: Streaming xlsx read failed for '{xlsx_path}' ({e_stream}); using pandas reader.", "debug")
+        return pd.read_excel(xlsx_path, engine='openpyxl')
 
 def get_case_log_df():
     try:
         if os.path.exists(CASE_LOG_FILE):
-            df = pd.read_excel(CASE_LOG_FILE, engine='openpyxl')
-            for col in LOG_COLUMNS_DEFINITION:
-                if col not in df.columns: df[col] = pd.NA
-            df = df[LOG_COLUMNS_DEFINITION] 
+            df = pd.read_csv(CASE_LOG_FILE, encoding='utf-8', dtype=CASE_LOG_CSV_DTYPES, keep_default_na=False, na_values=['']) # only empty cells are missing; 'N/A' stays text
+            df = df.reindex(columns=LOG_COLUMNS_DEFINITION) # Adds missing columns as NaN and fixes order in one pass
+        elif os.path.exists(LEGACY_CASE_LOG_XLSX_FILE):
+            df = read_xlsx_streaming(LEGACY_CASE_LOG_XLSX_FILE).reindex(columns=LOG_COLUMNS_DEFINITION)
+            df.to_csv(CASE_LOG_FILE, index=False, encoding='utf-8')
+            add_log(f"Case log migrated from '{LEGACY_CASE_LOG_XLSX_FILE}' to '{CASE_LOG_FILE}' ({len(df)} rows).", "info")
         else:
             df = pd.DataFrame(columns=LOG_COLUMNS_DEFINITION)
-            df.to_excel(CASE_LOG_FILE, index=False, engine='openpyxl') 
+            df.to_csv(CASE_LOG_FILE, index=False, encoding='utf-8') 
             add_log(f"Case log file created: {CASE_LOG_FILE}", "info")
         return df
     except Exception as e: 
         add_log(f"Error reading/creating case log file '{CASE_LOG_FILE}': {e}. Returning empty DataFrame.", "error")
         return pd.DataFrame(columns=LOG_COLUMNS_DEFINITION)
 
-def append_to_case_log(log_entry_dict):
+case_log_cache = {'key': None, 'df': None, 'day_rows': {}, 'month_rows': {}, 'report_memo': {}} # Parsed case log for the sidebar reports; reused until the CSV's mtime/size changes
+case_log_cache_lock = threading.Lock()
+
+def get_parsed_case_log_df():
+    """get_case_log_df() plus columns derived once, cached by CASE_LOG_FILE's mtime and size: 'Date_dt' (day) and 'Observed_dt'
+    (datetime64), 'User_norm' (stripped, categorical), 'Is_bot' and 'Counts_for_leaderboard' (see first_inprogress_rows).
+    The frame is shared between callbacks: filter/copy it, never modify it in place."""
+    return load_parsed_case_log()['df']
+
+def load_parsed_case_log():
+    """The case_log_cache entry, refreshed if CASE_LOG_FILE changed: 'df' (see get_parsed_case_log_df) and 'day_rows' / 'month_rows',
+    row positions per day (normalized Timestamp) and per month (pd.Period 'M'), so a report click is a lookup, not a full scan."""
+    try: file_stat = os.stat(CASE_LOG_FILE); cache_key = (file_stat.st_mtime_ns, file_stat.st_size)
+    except OSError: cache_key = None # Not created yet; get_case_log_df writes it and the next call caches
+    with case_log_cache_lock:
+        if cache_key is not None and case_log_cache['key'] == cache_key: return dict(case_log_cache)
+        df = get_case_log_df()
+        # The log writes ISO dates/timestamps; a fixed format skips per-value format inference (anything else still becomes NaT)
+        df['Date_dt'] = pd.to_datetime(df['Date'], errors='coerce', format='ISO8601', cache=True).dt.normalize()
+        df['Observed_dt'] = pd.to_datetime(df['Observed Timestamp'], errors='coerce', format='ISO8601', cache=True)
+        # Categoricals: the string work below runs once per distinct status/user, and the masks compare integer codes
+        status_norm = df['Status (Observed)'].astype(str).str.strip().str.lower().astype('category')
+        df['User_norm'] = df['Assigned User'].astype(str).str.strip().astype('category')
+        user_lower = df['User_norm'].str.lower()
+        df['Is_bot'] = user_lower.str.contains(BOT_ASSIGNED_USER_LOWER, regex=False, na=False).astype(bool)
+        df['Counts_for_leaderboard'] = (status_norm == "inprogress") & df['User_norm'].notna() & (df['User_norm'] != "") & (user_lower != "n/a") & ~df['Is_bot']
+        case_log_cache.update(key=cache_key, df=df, day_rows=df.groupby('Date_dt', sort=False).indices,
+                              month_rows=df.groupby(df['Date_dt'].dt.to_period('M'), sort=False).indices, report_memo={})
+        return dict(case_log_cache)
+
+BOT_ACTIVITY_COLUMNS = ['Observed Timestamp', 'Case Display ID', 'Country', 'Status (Observed)', 'Account Name', 'Duration (HH:MM:SS)']
+
+def get_bot_activity_records(day_ts):
+    """DataTable records for the bot's rows on one day (normalized Timestamp), built once per case log version: re-clicking
+    'Load Daily Activity' reuses them instead of slicing, filling and converting the frame again."""
+    case_log_entry = load_parsed_case_log()
+    memo_key = ('bot_activity', day_ts)
+    if memo_key not in case_log_entry['report_memo']:
+        df = case_log_entry['df']; day_positions = case_log_entry['day_rows'].get(day_ts, [])
+        day_bot_rows = df.iloc[day_positions]
+        day_bot_rows = day_bot_rows.loc[day_bot_rows['Is_bot'], [c for c in BOT_ACTIVITY_COLUMNS if c in df.columns]]
+        case_log_entry['report_memo'][memo_key] = day_bot_rows.fillna("N/A").to_dict('records') # report_memo is shared with the cache entry
+    return case_log_entry['report_memo'][memo_key]
+
+def get_case_log_period_rows(period_kind, period_key):
+    """Copy of the cached case log rows for one day (period_kind 'day_rows', normalized Timestamp) or month ('month_rows', pd.Period)."""
+    case_log_entry = load_parsed_case_log()
+    period_positions = case_log_entry[period_kind].get(period_key)
+    return case_log_entry['df'].iloc[period_positions if period_positions is not None else []].copy()
+
+case_log_write_lock = threading.Lock() # Serializes appends from Dash callbacks and the colleague-log writer thread
+
+def append_batch_to_case_log(log_entry_dicts):
+    """Appends rows to the CSV case log in one open/write (no full-file rewrite)."""
+    if not log_entry_dicts: return True
     try:
-        df_log = get_case_log_df() 
-        new_entry_df = pd.DataFrame([log_entry_dict])
-        for col in LOG_COLUMNS_DEFINITION: 
-            if col not in new_entry_df.columns: new_entry_df[col] = pd.NA
-            if col not in df_log.columns: df_log[col] = pd.NA
-        new_entry_df = new_entry_df[LOG_COLUMNS_DEFINITION] 
-        df_log = df_log[LOG_COLUMNS_DEFINITION] 
-        df_log = pd.concat([df_log, new_entry_df], ignore_index=True)
-        df_log.to_excel(CASE_LOG_FILE, index=False, engine='openpyxl')
-        add_log(f"Case '{log_entry_dict.get('Case Display ID', 'Unknown')}' logged to Excel.", "info")
+        with case_log_write_lock:
+            if not os.path.exists(CASE_LOG_FILE): get_case_log_df() # Writes the header (or migrates the legacy xlsx) once
+            # One frame per batch in log column order; the duration column is cast once so pd.NA/None entries become empty cells, not "<NA>"
+            batch_df = pd.DataFrame.from_records(log_entry_dicts, columns=LOG_COLUMNS_DEFINITION)
+            batch_df['Duration (seconds)'] = pd.to_numeric(batch_df['Duration (seconds)'], errors='coerce').astype('Float64')
+            with open(CASE_LOG_FILE, 'a', newline='', encoding='utf-8') as log_f:
+                batch_df.to_csv(log_f, header=False, index=False, na_rep='')
+        if len(log_entry_dicts) == 1: add_log(f"Case '{log_entry_dicts[0].get('Case Display ID', 'Unknown')}' logged to CSV.", "info")
+        else: add_log(f"{len(log_entry_dicts)} case log entries appended to CSV.", "info")
         return True
     except Exception as e:
         add_log(f"Error appending to case log file '{CASE_LOG_FILE}': {e}", "error")
         traceback.print_exc()
         return False
 
+def append_to_case_log(log_entry_dict):
+    return append_batch_to_case_log([log_entry_dict])
+
+def leaderboard_candidate_rows(period_df, case_id_col, obs_ts_col, user_col):
+    """The rows of a day/month slice that can earn leaderboard credit ('Counts_for_leaderboard'), narrowed to the leaderboard columns
+    before the str cast and sort, then sorted by case and observed time (ready for first_inprogress_rows)."""
+    candidate_rows = period_df.loc[period_df['Counts_for_leaderboard'], [case_id_col, 'Observed_dt', 'User_norm', 'Counts_for_leaderboard']]
+    candidate_rows = candidate_rows.rename(columns={'Observed_dt': obs_ts_col, 'User_norm': user_col}) # parsed/normalized once in get_parsed_case_log_df
+    candidate_rows[case_id_col] = candidate_rows[case_id_col].astype(str)
+    sort_cols = [case_id_col, obs_ts_col] if candidate_rows[obs_ts_col].notna().any() else [case_id_col]
+    return candidate_rows.sort_values(by=sort_cols, na_position='first', kind='stable')
+
+def first_inprogress_rows(df, case_id_col):
+    """Leaderboard credit rows: per case, the first 'inprogress' row (in df's order) by a colleague, i.e. not empty/'n/a'/the bot.
+    df is (a slice of) get_parsed_case_log_df(), which precomputes that test as 'Counts_for_leaderboard'."""
+    return df[df['Counts_for_leaderboard']].drop_duplicates(subset=case_id_col, keep='first')
+
+def leaderboard_from_rows(counted_rows, user_col):
+    """'Assigned User' / 'Cases to InProgress' table from first_inprogress_rows, highest count first (ties in first-seen order)."""
+    user_scores = counted_rows.groupby(user_col, sort=False, observed=True).size().sort_values(ascending=False, kind='stable')
+    return pd.DataFrame({'Assigned User': user_scores.index, 'Cases to InProgress': user_scores.values})
+
+# --- Colleague activity log: claimer thread enqueues, a daemon writer appends in batches ---
+COLLEAGUE_LOG_BATCH_SIZE = 20
+COLLEAGUE_LOG_FLUSH_SECONDS = 5.0
+colleague_log_q = queue.Queue()
+
+def colleague_log_writer_worker():
+    """Appends queued entries every COLLEAGUE_LOG_BATCH_SIZE entries or COLLEAGUE_LOG_FLUSH_SECONDS; a None entry flushes and stops it."""
+    buffered_entries = []; first_buffered_at = None
+    while True:
+        try:
+            entry = colleague_log_q.get(timeout=1.0)
+            if entry is None:
+                append_batch_to_case_log(buffered_entries); return
+            buffered_entries.append(entry)
+            if first_buffered_at is None: first_buffered_at = time.time()
+        except queue.Empty: pass
+        if buffered_entries and (len(buffered_entries) >= COLLEAGUE_LOG_BATCH_SIZE or time.time() - first_buffered_at >= COLLEAGUE_LOG_FLUSH_SECONDS):
+            append_batch_to_case_log(buffered_entries)
+            buffered_entries = []; first_buffered_at = None
+
+colleague_log_writer_thread = threading.Thread(target=colleague_log_writer_worker, name="ColleagueLogWriter", daemon=True)
+
+def stop_colleague_log_writer():
+    colleague_log_q.put_nowait(None)
+    colleague_log_writer_thread.join(timeout=10)
+
+if not IS_WORKER_PROCESS: # only the app process writes the case log
+    colleague_log_writer_thread.start()
+    atexit.register(stop_colleague_log_writer)
+
 # (This code starts with setup_scraper_driver and ends after process_extracted_pdf_data)
 # (It assumes Part 1, including helper functions like add_log and sanitize_filename, is already in place)
 
 # --- Scraper: Selenium WebDriver Setup ---
+chromedriver_path_cache = None
+scraper_driver_instance = None
+scraper_driver_lock = threading.Lock() # Held while a scrape uses the shared driver (web scraper callback and claimer auto-scrape can overlap)
+
+CHROMEDRIVER_CACHE_VALID_DAYS = 30 # webdriver-manager reuses its downloaded driver this long before checking for a newer one
+
+def get_chromedriver_path():
+    """Resolves ChromeDriver through webdriver-manager once per process (install() may do a network version check); shared by
+    the scraper and claimer drivers, so driver restarts reuse it. Re-resolved only if the cached file disappears."""
+    global chromedriver_path_cache
+    if not chromedriver_path_cache or not os.path.isfile(chromedriver_path_cache):
+        add_log("Installing/Updating ChromeDriver...", "info")
+        chromedriver_path_cache = ChromeDriverManager(cache_manager=DriverCacheManager(valid_range=CHROMEDRIVER_CACHE_VALID_DAYS)).install()
+        add_log(f"ChromeDriver installed/found by webdriver-manager at: {chromedriver_path_cache}", "info")
+    return chromedriver_path_cache
+
+def get_scraper_driver():
+    """Returns the shared headless scraper driver, (re)creating it if missing or dead. Takes scraper_driver_lock; pair with release_scraper_driver()."""
+    global scraper_driver_instance
+    scraper_driver_lock.acquire()
+    try:
+        if scraper_driver_instance is not None:
+            try:
+                scraper_driver_instance.delete_all_cookies()
+                return scraper_driver_instance
+            except WebDriverException as e_dead:
+                add_log(f"Scraper WebDriver no longer responsive, recreating: {type(e_dead).__name__}", "warning")
+                try: scraper_driver_instance.quit()
+                except Exception: pass
+                scraper_driver_instance = None
+        scraper_driver_instance = setup_scraper_driver()
+        if scraper_driver_instance is None: scraper_driver_lock.release() # callers only release a driver they got back
+        return scraper_driver_instance
+    except Exception:
+        scraper_driver_lock.release(); raise
+
+def release_scraper_driver():
+    """Parks the shared driver on about:blank (stops the menu page's scripts and lazy-loads while idle) and frees it for the next scrape."""
+    try:
+        if scraper_driver_instance is not None: scraper_driver_instance.get('about:blank')
+    except WebDriverException as e_park: add_log(f"Scraper WebDriver could not be parked on about:blank: {type(e_park).__name__}", "debug")
+    finally:
+        if scraper_driver_lock.locked(): scraper_driver_lock.release()
+
+def quit_scraper_driver():
+    global scraper_driver_instance
+    if scraper_driver_instance is not None:
+        try: scraper_driver_instance.quit()
+        except Exception: pass
+        scraper_driver_instance = None
+
+atexit.register(quit_scraper_driver)
+
 def setup_scraper_driver():
     """Sets up Selenium WebDriver for the Scraper (headless)."""
     add_log("Setting up Scraper Chrome WebDriver (headless)...", "info")
     chrome_options = Options()
-    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--headless=new")
+    chrome_options.page_load_strategy = 'eager' # driver.get returns at DOMContentLoaded; scrapers wait for their own elements
+    chrome_options.add_argument("--disable-features=Translate,BackForwardCache,OptimizationHints")
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
     chrome_options.add_argument("--disable-gpu")
@@ -260,9 +558,7 @@ def setup_scraper_driver():
     log_output_selenium = os.devnull if sys.platform != "win32" else subprocess.DEVNULL
 
     try:
-        add_log("Installing/Updating ChromeDriver for Scraper...", "info")
-        driver_path = ChromeDriverManager().install()
-        add_log(f"Scraper ChromeDriver installed/found by webdriver-manager at: {driver_path}", "info")
+        driver_path = get_chromedriver_path()
         service = Service(executable_path=driver_path, log_output=log_output_selenium, service_args=service_args_selenium)
         driver = webdriver.Chrome(service=service, options=chrome_options)
         driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
@@ -283,91 +579,567 @@ def setup_scraper_driver():
         raise
 
 # --- Scraper: Image Processing Function ---
-def process_single_image(image_data, output_filename_base, output_folder, ffmpeg_path_to_use): 
-    """Processes a single image (bytes). Converts, resizes, and saves as JPEG."""
-    global ffmpeg_path_global 
-    if not ffmpeg_path_to_use: 
-        ffmpeg_path_to_use = ffmpeg_path_global
-
-    if not image_data:
-        add_log(f"DEBUG: Skipping {output_filename_base} - No image data provided.", "debug")
-        return None
-    
-    if not os.path.exists(output_folder):
+def add_worker_log(log_entries):
+    """Adds the (message, level) pairs a menu_workers function returned to the app log."""
+    for message, level in log_entries: add_log(message, level)
+
+worker_process_pool = None # created on first use by get_worker_process_pool; shared by every image and PDF batch
+worker_process_pool_lock = threading.Lock()
+
+def get_worker_process_pool():
+    """The app's long-lived process pool for menu_workers jobs. 'spawn' on every OS: forking this multi-threaded server could hand a
+    worker a lock another thread was holding. Workers are reused, so each one re-imports this script (see IS_WORKER_PROCESS) only once."""
+    global worker_process_pool
+    with worker_process_pool_lock:
+        if worker_process_pool is None:
+            worker_process_pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 4, mp_context=multiprocessing.get_context('spawn'))
+        return worker_process_pool
+
+def discard_worker_process_pool(broken_pool):
+    """Drops a broken pool, so the next get_worker_process_pool() call starts a fresh one."""
+    global worker_process_pool
+    if broken_pool is None: return
+    with worker_process_pool_lock:
+        if worker_process_pool is broken_pool: worker_process_pool = None
+    broken_pool.shutdown(wait=False, cancel_futures=True)
+
+PROCESS_POOL_MIN_IMAGES = 8 # Smaller batches are not worth the pipe round-trips; they run on threads
+
+def iter_processed_images(image_jobs, ffmpeg_path_to_use, job_count=None):
+    """Runs decode_and_resize_image over (key, image bytes) pairs and yields (key, jpeg_bytes, failure_reason) as each one finishes.
+    image_jobs may be a lazy iterable (e.g. downloads as they complete): each job is submitted as soon as it arrives, so decoding
+    overlaps whatever produces the bytes; pass job_count when it can't be len()'d. Large batches use the worker process pool (JPEG
+    encode is CPU-bound); if the pool breaks, the remaining images run on threads."""
+    if job_count is None: image_jobs = list(image_jobs); job_count = len(image_jobs)
+    incoming_jobs = iter(image_jobs); pending_jobs = {}
+    use_processes = job_count >= PROCESS_POOL_MIN_IMAGES
+    while True:
+        process_pool = None
         try:
-            os.makedirs(output_folder)
-            add_log(f"Created output folder for single image: {output_folder}", "info")
-        except Exception as e_mkdir:
-            add_log(f"Error creating output folder {output_folder}: {e_mkdir}", "error")
-            return None
+            if use_processes: process_pool = get_worker_process_pool()
+            with (nullcontext(process_pool) if use_processes else ThreadPoolExecutor(max_workers=os.cpu_count() or 4)) as executor:
+                future_to_key = {}
+                try:
+                    for key, img_bytes in pending_jobs.items(): future_to_key[executor.submit(decode_and_resize_image, img_bytes, ffmpeg_path_to_use)] = key # left over from a broken pool
+                    for key, img_bytes in incoming_jobs:
+                        pending_jobs[key] = img_bytes
+                        future_to_key[executor.submit(decode_and_resize_image, img_bytes, ffmpeg_path_to_use)] = key
+                    for future in as_completed(future_to_key):
+                        key = future_to_key[future]
+                        try: jpeg_bytes, failure_reason, log_entries = future.result()
+                        except BrokenProcessPool: raise
+                        except Exception as e_img: jpeg_bytes, failure_reason, log_entries = None, f"Unexp err: {e_img}", ()
+                        add_worker_log(log_entries)
+                        del pending_jobs[key]
+                        yield key, jpeg_bytes, failure_reason
+                finally:
+                    for future in future_to_key: future.cancel() # caller stopped early: don't leave its queued jobs on the shared pool
+            return
+        except (BrokenProcessPool, OSError) as e_pool:
+            if not use_processes: raise
+            discard_worker_process_pool(process_pool)
+            add_log(f"Image process pool unavailable ({type(e_pool).__name__}); processing the remaining images on threads.", "warning")
+            use_processes = False
+
+# --- Scraper: Embedded JSON Menu Parsing ---
+JSON_LD_SCRIPT_RE = re.compile(r'<script[^>]*type=["\']application/ld\+json["\'][^>]*>(.*?)</script>', re.S | re.I)
+NEXT_DATA_SCRIPT_RE = re.compile(r'<script[^>]*id=["\']__NEXT_DATA__["\'][^>]*>(.*?)</script>', re.S | re.I)
+JSON_MENU_SECTION_KEYS = ('hasMenuSection', 'hasMenuItem', 'products', 'items', 'elements')
+
+def normalize_price_text(price_text):
+    """'1.234,50 €' / '12,50' / '12.50' -> '1234.50' / '12.50' / '12.50'; 'N/A' when no digits."""
+    price_num_str = PRICE_STRIP_RE.sub('', str(price_text)).strip()
+    if ',' in price_num_str and '.' in price_num_str:
+        return price_num_str.replace('.', '').replace(',', '.') if price_num_str.rfind('.') < price_num_str.rfind(',') else price_num_str.replace(',', '')
+    elif ',' in price_num_str: return price_num_str.replace(',', '.')
+    return price_num_str if price_num_str else 'N/A'
+
+def normalize_prices(df):
+    """Vectorized normalize_price_text() over df['Price']: strips 'from'/'a partir de' and currency text, then picks the decimal separator per row."""
+    if df.empty or 'Price' not in df.columns: return df
+    raw = df['Price']
+    s = raw.astype(str).str.replace(PRICE_PREFIX_RE, '', regex=True).str.replace(PRICE_STRIP_RE, '', regex=True).str.strip()
+    decimal_comma = s.str.contains(',', regex=False) & (s.str.rfind('.') < s.str.rfind(','))
+    s = pd.Series(np.where(decimal_comma, s.str.replace('.', '', regex=False).str.replace(',', '.', regex=False), s.str.replace(',', '', regex=False)), index=df.index)
+    df['Price'] = s.where((s != '') & raw.notna(), 'N/A')
+    return df
+
+def _json_image_url(image_value):
+    if isinstance(image_value, list): image_value = image_value[0] if image_value else None
+    if isinstance(image_value, dict): image_value = image_value.get('url') or image_value.get('contentUrl')
+    return image_value if isinstance(image_value, str) and image_value.startswith('http') else None
+
+def _collect_json_menu_items(node, category, out_items):
+    """Walks a JSON tree and collects dicts that look like menu products (a name plus a scalar price or schema.org offers)."""
+    if isinstance(node, list):
+        for child in node: _collect_json_menu_items(child, category, out_items)
+        return
+    if not isinstance(node, dict): return
+    name = node.get('name') or node.get('title')
+    price = node.get('price')
+    if price is None and isinstance(node.get('offers'), dict): price = node['offers'].get('price')
+    if isinstance(name, str) and name.strip() and isinstance(price, (int, float, str)) and not isinstance(price, bool):
+        description = node.get('description') if isinstance(node.get('description'), str) else ''
+        out_items.append(MenuItem(
+            name.strip(), None, category, 
+            f"{float(price):.2f}" if isinstance(price, (int, float)) else normalize_price_text(price),
+            name.strip(), description.strip(),
+            _json_image_url(node.get('imageUrl') or node.get('image'))
+        ))
+        return
+    if isinstance(name, str) and name.strip() and any(isinstance(node.get(k), list) for k in JSON_MENU_SECTION_KEYS): category = name.strip()
+    for child in node.values(): _collect_json_menu_items(child, category, out_items)
+
+def extract_menu_items_from_embedded_json(html_text):
+    """Reads the menu from schema.org JSON-LD (hasMenu) or a Next.js __NEXT_DATA__ blob. Returns [] when neither yields products."""
+    items = []
+    for raw_json in JSON_LD_SCRIPT_RE.findall(html_text or ''):
+        try: _collect_json_menu_items(json.loads(raw_json), 'Unknown Category', items)
+        except ValueError: continue
+    if not items:
+        next_data_match = NEXT_DATA_SCRIPT_RE.search(html_text or '')
+        if next_data_match:
+            try: _collect_json_menu_items(json.loads(next_data_match.group(1)), 'Unknown Category', items)
+            except ValueError as e_json: add_log(f"Embedded JSON: __NEXT_DATA__ could not be parsed: {e_json}", "debug")
+    return [item for item in items if item.Price != 'N/A']
+
+# --- Scraper: Wolt / Foodora Menu APIs ---
+# Both sites load the menu from a JSON endpoint; reading it directly skips the browser. Any failure or unexpected schema
+# returns [] and scrape_website falls back to the Selenium path.
+WOLT_VENUE_SLUG_RE = re.compile(r'/(?:restaurant|venue)/([^/?#]+)')
+WOLT_MENU_API_URL = "https://restaurant-api.wolt.com/v4/venues/slug/{slug}/menu"
+FOODORA_VENDOR_CODE_RE = re.compile(r'/restaurant/([A-Za-z0-9]+)(?:[/?#]|$)')
+FOODORA_MENU_API_URL = "https://cz.fd-api.com/api/v5/vendors/{code}?include=menus&language_id=1&opening_type=delivery&basket_currency=CZK"
+
+def _api_menu_item(name, category, price, description, image_url):
+    return MenuItem(name, None, category or 'Unknown Category', f"{float(price):.2f}", name, (description or '').strip(), None if is_bad_image_url(image_url) else image_url)
+
+def fetch_wolt_menu_items(target_url, headers):
+    """Reads a Wolt venue menu from the restaurant API (prices are in minor units)."""
+    slug_match = WOLT_VENUE_SLUG_RE.search(urlparse(target_url).path)
+    if not slug_match: return []
+    response = http_session.get(WOLT_MENU_API_URL.format(slug=slug_match.group(1)), headers={**headers, 'Accept': 'application/json'}, timeout=20); response.raise_for_status()
+    menu_json = response.json()
+    category_names = {category.get('id'): category.get('name') for category in menu_json.get('categories') or [] if isinstance(category, dict)}
+    items = []
+    for item in menu_json.get('items') or []:
+        name = (item.get('name') or '').strip(); price = item.get('baseprice')
+        if not name or not isinstance(price, (int, float)) or isinstance(price, bool): continue
+        items.append(_api_menu_item(name, category_names.get(item.get('category')), price / 100, item.get('description'), item.get('image')))
+    return items
+
+def fetch_foodora_menu_items(target_url, headers):
+    """Reads a Foodora.cz vendor menu from the vendor API (first product variation's price)."""
+    code_match = FOODORA_VENDOR_CODE_RE.search(urlparse(target_url).path)
+    if not code_match: return []
+    response = http_session.get(FOODORA_MENU_API_URL.format(code=code_match.group(1)), headers={**headers, 'Accept': 'application/json'}, timeout=20); response.raise_for_status()
+    items = []
+    for menu in (response.json().get('data') or {}).get('menus') or []:
+        for menu_category in menu.get('menu_categories') or []:
+            category_name = (menu_category.get('name') or '').strip()
+            for product in menu_category.get('products') or []:
+                name = (product.get('name') or '').strip(); variations = product.get('product_variations') or [{}]
+                price = variations[0].get('price')
+                if not name or not isinstance(price, (int, float)) or isinstance(price, bool): continue
+                items.append(_api_menu_item(name, category_name, price, product.get('description'), product.get('file_path')))
+    return items
+
+# --- Scraper: Glovo lxml XPath Expressions (compiled once) ---
+GLOVO_CONTAINERS_XP = etree.XPath("//div[contains(concat(' ', normalize-space(@class), ' '), ' product-row ')] | //li[contains(@class, 'product-list__item')] | //li[contains(@class, 'product')] | //div[@data-testid='product-row']")
+GLOVO_LIST_TITLE_XP = etree.XPath("preceding::p[@data-test-id='list-title' and contains(@class, 'typography-title-3')][1]")
+GLOVO_HEADING_XP = etree.XPath("preceding::*[self::h2 or self::h3 or self::h4][1]")
+GLOVO_NAME_XP = etree.XPath(".//*[@data-testid='product-row-name' or contains(@class, 'product-row__name')] | .//div[contains(@class, 'product-card-name')]")
+GLOVO_DESC_XP = etree.XPath(".//*[@data-testid='product-row-description' or contains(@class, 'product-row__description')]")
+GLOVO_PRICE_XP = etree.XPath(".//*[contains(@data-testid, 'product-price') or contains(@class, '--price')] | .//span[contains(@class, 'product-price__effective')]")
+GLOVO_IMG_XP = etree.XPath(".//img")
+NODE_TEXT_XP = etree.XPath(".//text()[not(ancestor::script or ancestor::style)]")
+
+def lxml_text(element):
+    """Same result as BeautifulSoup's get_text(strip=True): stripped text pieces joined without a separator."""
+    return ''.join(t.strip() for t in NODE_TEXT_XP(element)) if element is not None else ''
+
+# --- Scraper: In-Browser Scrolling ---
+SCROLL_UNTIL_STABLE_MAX_MS = 110000
+# Async script: scrolls one viewport per tick and calls back with the item count once it is at the bottom and no items
+# have been added (tracked by a MutationObserver) for `stableTicks` ticks. Args: selector, intervalMs, stableTicks, maxMs, callback.
+SCROLL_UNTIL_STABLE_JS = """
+const [selector, intervalMs, stableTicks, maxMs, done] = arguments;
+const startedAt = Date.now(), count = () => document.querySelectorAll(selector).length;
+let lastCount = count(), stable = 0;
+const observer = new MutationObserver(() => { const n = count(); if (n !== lastCount) { lastCount = n; stable = 0; } });
+observer.observe(document.body, {childList: true, subtree: true});
+const timer = setInterval(() => {
+    window.scrollBy(0, window.innerHeight);
+    const atBottom = window.innerHeight + window.scrollY >= document.documentElement.scrollHeight - 2;
+    const n = count();
+    if (n !== lastCount) { lastCount = n; stable = 0; }
+    else if (atBottom) stable++;
+    if (stable >= stableTicks || Date.now() - startedAt > maxMs) { clearInterval(timer); observer.disconnect(); done(lastCount); }
+}, intervalMs);
+"""
+
+def scroll_until_stable(driver, item_css_selector, site_label, interval_ms=400, stable_ticks=8):
+    """Runs SCROLL_UNTIL_STABLE_JS in the page; returns the final item count, or None if the script timed out or failed."""
+    try:
+        driver.set_script_timeout(SCROLL_UNTIL_STABLE_MAX_MS // 1000 + 10)
+        final_item_count = driver.execute_async_script(SCROLL_UNTIL_STABLE_JS, item_css_selector, interval_ms, stable_ticks, SCROLL_UNTIL_STABLE_MAX_MS)
+        add_log(f"{site_label} Scroll: Item count stabilized at {final_item_count}.", "info")
+        return final_item_count
+    except TimeoutException:
+        add_log(f"{site_label} Scroll: In-browser scroll timed out; continuing with the items loaded so far.", "warning")
+    except WebDriverException as e_scroll_js:
+        add_log(f"{site_label} Scroll: In-browser scroll script failed: {e_scroll_js}", "warning")
+    return None
+
+# --- Scraper: Cookie Banners ---
+def click_cookie_banner(driver, wait, accept_css, accept_text_xpath, site_label, settle_seconds):
+    """Clicks the cookie accept button; one wait polls the attribute-based CSS selector first and the text-matching XPath only as a fallback."""
+    try:
+        add_log(f"{site_label}: Looking for cookie button...", "info")
+        accept_button = wait.until(EC.any_of(EC.element_to_be_clickable((By.CSS_SELECTOR, accept_css)), EC.element_to_be_clickable((By.XPATH, accept_text_xpath))))
+        driver.execute_script("arguments[0].click();", accept_button)
+        add_log(f"{site_label}: Clicked accept button.", "info")
+        time.sleep(settle_seconds)
+        return True
+    except Exception as e_cookie:
+        add_log(f"{site_label}: Cookie button not found/clicked (often OK): {type(e_cookie).__name__}", "debug")
+        return False
 
-    output_filepath_jpg = os.path.join(output_folder, f"{output_filename_base}.jpg")
+# --- Scraper: Uber Eats Page Snapshot Parsing (lxml) ---
+UBER_ACCEPT_CSS = 'button[data-testid*="accept"], button#cookie-accept'
+UBER_ACCEPT_XPATH = "//button[contains(translate(., 'ABCDEFGHIJKLMNÑOPQRSTUVWXYZ', 'abcdefghijklmnñopqrstuvwxyz'), 'accept') or contains(translate(., 'ABCDEFGHIJKLMNÑOPQRSTUVWXYZ', 'abcdefghijklmnñopqrstuvwxyz'), 'aceitar') or contains(translate(., 'ABCDEFGHIJKLMNÑOPQRSTUVWXYZ', 'abcdefghijklmnñopqrstuvwxyz'), 'agree')]"
+UBER_CONTAINERS_CSS = 'li[data-testid^="store-item-"], div[data-testid^="store-item-"], div[role="listitem"]'
+UBER_CONTAINERS_XPATH = "//li[starts-with(@data-testid, 'store-item-')] | //div[starts-with(@data-testid, 'store-item-')] | //div[@role='listitem']"
+UBER_CONTAINERS_XP = etree.XPath(UBER_CONTAINERS_XPATH)
+UBER_HEADERS_AND_CONTAINERS_XP = etree.XPath("//h2 | //h3 | " + UBER_CONTAINERS_XPATH)
+UBER_NAME_XP = etree.XPath("(.//div[not(.//button)]//span[normalize-space() and string-length(normalize-space()) > 3 and not(starts-with(normalize-space(), '€')) and not(starts-with(normalize-space(), '$')) and not(contains(.,'kcal')) and not(contains(translate(.,'0123456789','##########'),'#')) and not(ancestor::button) and not(ancestor::div[contains(@aria-label, 'quantity')]) and not(ancestor::div[contains(@aria-label, 'preço')]) ])[1]")
+UBER_NAME_H3_XP = etree.XPath(".//h3[string-length(normalize-space()) > 1 and not(contains(., '€')) and not(contains(., '$')) and not(contains(., 'kcal'))]")
+UBER_NAME_TITLE_DIV_XP = etree.XPath(".//div[contains(@id, 'title') or contains(@data-testid, 'title') or contains(@style, 'font-weight: 500')][string-length(normalize-space()) > 1 and not(contains(., '€')) and not(contains(., '$')) and not(contains(., 'kcal'))]")
+UBER_FIRST_SPAN_XP = etree.XPath("(.//span[normalize-space(.)])[1]")
+UBER_PRICE_SPAN = ".//span[contains(., '€') or contains(., '$') or contains(., 'R$') or (contains(., ',') and string-length(substring-after(.,','))=2 and translate(substring-before(.,','),'0123456789','')='') or (contains(., '.') and string-length(substring-after(.,'.'))=2 and translate(substring-before(.,'.'),'0123456789','')='') ]"
+UBER_PRICE_XP = etree.XPath("(" + UBER_PRICE_SPAN + ")[1]")
+# Containers worth running the name/price/description chains on: anything with a price span or an image (promo banners, "see all" tiles etc. have neither)
+UBER_ITEM_CARDS_XP = etree.XPath(" | ".join(f"{container}[{UBER_PRICE_SPAN} or .//img]" for container in UBER_CONTAINERS_XPATH.split(" | ")))
+UBER_DESC_XP = etree.XPath(".//div[contains(@class, 'pv ew')]//span[@class='pw']")
+UBER_DESC_CANDIDATES_XP = etree.XPath(".//div[string-length(normalize-space()) > 5 and not(.//h3) and not(contains(., '€')) and not(contains(., '$')) and not(contains(., 'kcal')) and not(ancestor::button)] | .//p[string-length(normalize-space()) > 5 and not(contains(., '€')) and not(contains(., '$')) and not(contains(., 'kcal'))]")
+UBER_IMAGE_CANDIDATES_XP = etree.XPath(".//picture/source[@srcset] | .//img[@src]") # one pass; priority is applied in uber_item_image_url()
+
+# --- Scraper: Wolt / Foodora Selectors ---
+WOLT_ACCEPT_CSS = 'button[data-test-id*="Accept"], button[data-localization-key*="banner.accept-button"]'
+WOLT_ACCEPT_XPATH = "//button[contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'accept') or contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'akceptuj') or contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'okay') or contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'got it')]"
+WOLT_CONTAINERS_CSS = 'div[data-test-id="horizontal-item-card"], div[data-test-id="VerticalItemCard"], a[data-testid*="venue-product"], div[class*="ProductCardBody"]'
+# Wolt items are parsed from one page_source snapshot: a single document-order pass over category headers and item
+# cards (headers inside a card are item titles, not categories), so each card takes the last header seen before it.
+WOLT_ITEM_PREDICATE = "self::div[@data-test-id='horizontal-item-card' or @data-test-id='VerticalItemCard' or contains(@class, 'ProductCardBody')] or self::a[contains(@data-testid, 'venue-product')]"
+WOLT_HEADERS_AND_ITEMS_XP = etree.XPath("//*[(self::h1 or self::h2 or self::h3 or @data-test-id='CategoryName' or contains(@class, 'CategoryName__')) and not(ancestor::*[%s])] | //*[%s]" % (WOLT_ITEM_PREDICATE, WOLT_ITEM_PREDICATE))
+WOLT_IS_ITEM_XP = etree.XPath(WOLT_ITEM_PREDICATE)
+WOLT_NAME_XP = etree.XPath("(.//*[@data-test-id='horizontal-item-card-title' or @data-test-id='VerticalItemCardName' or self::h3 or self::h4 or contains(@class, 'Title-module')])[1]")
+WOLT_PRICE_XP = etree.XPath("(.//*[contains(@data-test-id, 'price') or contains(@class, 'Price') or @data-hook='item-price'])[1]")
+WOLT_DESC_XP = etree.XPath("(.//*[contains(@data-test-id, 'description') or contains(@class, 'Description-module')] | .//p[contains(@class, 'description')])[1]")
+WOLT_IMG_XP = etree.XPath("(.//img[(@src and not(contains(@src, 'data:image')) and string-length(@src)>20) or (@srcset and string-length(@srcset)>20)])[1]")
+FOODORA_ACCEPT_CSS = 'button[data-testid="button-acceptAll"], button[class*="accept"][class*="cookie"]'
+FOODORA_ACCEPT_XPATH = "//button[contains(translate(., 'SOUHLASÍM', 'souhlasím'), 'souhlasím') or contains(translate(., 'PŘIJMOUT VŠE', 'přijmout vše'), 'přijmout vše')]"
+FOODORA_ITEM_CSS = "li.product-tile[data-testid='menu-product']"
+FOODORA_SECTION_XP = etree.XPath("//div[contains(concat(' ', normalize-space(@class), ' '), ' dish-category-section ') and @data-testid='menu-category-section']")
+FOODORA_CATEGORY_TITLE_XP = etree.XPath("(.//h2[contains(concat(' ', normalize-space(@class), ' '), ' dish-category-title ')])[1]")
+FOODORA_ITEM_XP = etree.XPath(".//li[contains(concat(' ', normalize-space(@class), ' '), ' product-tile ') and @data-testid='menu-product']")
+FOODORA_NAME_XP = etree.XPath("(.//span[@data-testid='menu-product-name'])[1]")
+FOODORA_PRICE_XP = etree.XPath("(.//p[@data-testid='menu-product-price'])[1]")
+FOODORA_DESC_XP = etree.XPath("(.//p[contains(concat(' ', normalize-space(@class), ' '), ' product-tile__description ') and @data-testid='menu-product-description'])[1]")
+FOODORA_IMG_STYLE_XP = etree.XPath("(.//div[contains(concat(' ', normalize-space(@class), ' '), ' lazy-loaded-dish-photo ') and @data-testid='menu-product-image'])[1]/@style")
+
+# --- Scraper: Generic Fallback Selectors ---
+# Every item selector keys on a class containing one of these words, so only those subtrees are built by the lxml parser
+GENERIC_ITEM_STRAINER = SoupStrainer(class_=re.compile(r'item|product|dish|menu'))
+GENERIC_ITEM_SELECTORS = ('div.menu-item', 'li.product', 'article.dish', '.item-card', 'div[class*="item"]', 'div[class*="product"]') # tried in order, first hit wins
+GENERIC_NAME_CSS = '.item-name, .product-name, .title, h3, h4, [class*="name"]'
+GENERIC_PRICE_CSS = '.item-price, .product-price, .price, [class*="price"]'
+GENERIC_DESC_CSS = '.item-description, .product-description, .description, p, [class*="desc"]'
+
+def normalized_text(element):
+    """Whitespace-collapsed text of an lxml element (close to Selenium's WebElement.text for inline content)."""
+    return ' '.join(element.text_content().split())
+
+def resolve_item_categories(page_tree, item_elements):
+    """One document-order pass: each item's nearest preceding non-empty h2/h3 outside item cards, skipping "Featured items".
+    Returns a list parallel to item_elements (None where no header precedes the item)."""
+    item_set = set(item_elements); category_by_item = {}; current = None
+    for el in UBER_HEADERS_AND_CONTAINERS_XP(page_tree):
+        if el in item_set: category_by_item[el] = current; continue
+        if el.tag not in ('h2', 'h3') or any(ancestor in item_set for ancestor in el.iterancestors()): continue
+        text = normalized_text(el)
+        if text and 'featured items' not in text.lower(): current = text
+    return [category_by_item.get(item) for item in item_elements]
+
+def uber_item_image_url(item_element):
+    """First <picture><source> srcset URL, else the first <picture><img> src, else the first <img> src (raw, may be relative).
+    libxml2 doesn't treat <source> as void, so a picture's <img> lands inside <source>: match <picture> as any ancestor."""
+    candidates = UBER_IMAGE_CANDIDATES_XP(item_element)
+    first_source = next((el for el in candidates if el.tag == 'source'), None)
+    image_url = last_srcset_url(first_source.get('srcset')) if first_source is not None else None
+    if not image_url:
+        img_tags = [el for el in candidates if el.tag == 'img']
+        img_tag = next((el for el in img_tags if any(ancestor.tag == 'picture' for ancestor in el.iterancestors())), img_tags[0] if img_tags else None)
+        if img_tag is not None: image_url = img_tag.get('src')
+    return image_url
+
+# --- Scraper: Per-Site Menu Parsers ---
+# Each parser takes the page HTML (fetched over HTTP or snapshotted from the browser) and returns a list of MenuItem rows.
+
+def parse_glovo_menu(page_html, target_url):
+    menu_items_data = []; item_counter = 1
+    menu_containers = GLOVO_CONTAINERS_XP(lxml.html.fromstring(page_html))
+    add_log(f"Glovo: Found {len(menu_containers)} potential containers.", "info")
+    current_category = 'Unknown Category'
+    for item_element in menu_containers:
+        try:
+            category = current_category
+            category_header = GLOVO_LIST_TITLE_XP(item_element) or GLOVO_HEADING_XP(item_element)
+            if category_header:
+                cat_text = lxml_text(category_header[0])
+                if cat_text: category = cat_text; current_category = category
+            
+            name_el = GLOVO_NAME_XP(item_element)
+            name_scraped_original = lxml_text(name_el[0]) if name_el else ''
+            id_for_excel = name_scraped_original if name_scraped_original and name_scraped_original != 'N/A' else f'Glovo_Item_{item_counter}'
+
+            desc_el = GLOVO_DESC_XP(item_element)
+            description = lxml_text(desc_el[0]) if desc_el else ''
+            price_el = GLOVO_PRICE_XP(item_element)
+            price = lxml_text(price_el[0]) if price_el else 'N/A' # raw text, normalized for all rows in normalize_prices()
+            
+            img_el = GLOVO_IMG_XP(item_element); image_url = None
+            if img_el:
+                img_el = img_el[0]; temp_url = img_el.get('data-src') or img_el.get('srcset') or img_el.get('src')
+                if temp_url:
+                    first_url = temp_url.split(',')[0].strip().split(' ')[0]
+                    if first_url.startswith('http'): image_url = urljoin(target_url, first_url)
+                    if is_bad_image_url(image_url): image_url = None
+            
+            if name_scraped_original and name_scraped_original != 'N/A' and price != 'N/A':
+                menu_items_data.append(MenuItem(id_for_excel, None, category, price, name_scraped_original, description, image_url))
+            item_counter += 1
+        except Exception as e_item: add_log(f"Glovo: Error processing item approx {item_counter}: {e_item}", "warning")
+    return menu_items_data
 
-    try:
-        img_to_process = None
-        needs_ffmpeg_fallback = False
+def parse_uber_eats_menu(page_html, target_url):
+    menu_items_data = []; item_counter = 1
+    page_tree = lxml.html.fromstring(page_html)
+    all_containers = UBER_CONTAINERS_XP(page_tree)
+    add_log(f"Uber Eats: Found {len(all_containers)} total potential item containers after re-fetch.", "info")
+    if not all_containers:
+        add_log("Uber Eats ERROR: No item containers found after re-fetch. Scraping will likely fail.", "error")
+    # Categories are resolved against every container (headers inside any card are never categories), then cards without price or image are dropped in one query
+    item_cards = set(UBER_ITEM_CARDS_XP(page_tree))
+    container_categories = resolve_item_categories(page_tree, all_containers)
+    menu_item_containers = [el for el in all_containers if el in item_cards]
+    item_categories = [category for el, category in zip(all_containers, container_categories) if el in item_cards]
+    if len(menu_item_containers) < len(all_containers):
+        add_log("Uber Eats: Skipping %d containers with no price or image.", "debug", len(all_containers) - len(menu_item_containers))
+
+    current_category = 'Unknown Category'
+    for item_idx, item_element in enumerate(menu_item_containers):
         try:
-            img_to_process = Image.open(io.BytesIO(image_data))
-        except (IOError, Image.DecompilationBombError, SyntaxError, UnidentifiedImageError) as e:
-            add_log(f"DEBUG: PIL failed for {output_filename_base} ({type(e).__name__}: {e}). Attempting FFmpeg fallback.", "debug")
-            needs_ffmpeg_fallback = True
-        except Exception as e_pil:
-            add_log(f"DEBUG: Unexpected PIL error for {output_filename_base}: {type(e_pil).__name__} - {e_pil}", "debug")
-            return None
-
-        if needs_ffmpeg_fallback:
-            if not ffmpeg_path_to_use:
-                add_log(f"DEBUG: PIL failed for {output_filename_base}, FFmpeg needed but not found/configured.", "debug")
-                return "FFmpeg required"
-            add_log(f"DEBUG: Using FFmpeg for {output_filename_base}...", "debug")
-            png_data = convert_image_with_ffmpeg(image_data, ffmpeg_path_to_use) 
-            if png_data:
-                try:
-                    img_to_process = Image.open(io.BytesIO(png_data))
-                    add_log(f"DEBUG: FFmpeg fallback successful for {output_filename_base}.", "debug")
-                except Exception as e_pil_ffmpeg:
-                    add_log(f"DEBUG: Error opening image post-FFmpeg fallback for {output_filename_base}: {e_pil_ffmpeg}", "debug")
-                    return None
+            category = current_category
+            if item_categories[item_idx]:
+                category = item_categories[item_idx]
+                current_category = category
+
+            name = 'N/A'; price = 'N/A'; description = ''; image_url = None
+            price_text_raw_for_desc_check = ''
+
+            # Name extraction from Streamlit logic
+            name_el = UBER_NAME_XP(item_element) or UBER_NAME_H3_XP(item_element) or UBER_NAME_TITLE_DIV_XP(item_element)
+            if name_el: name = normalized_text(name_el[0]) or 'N/A'
             else:
-                add_log(f"DEBUG: FFmpeg fallback conversion failed for {output_filename_base}.", "debug")
-                return None
+                name_el = UBER_FIRST_SPAN_XP(item_element) # One more very general attempt from Streamlit
+                name_candidate = normalized_text(name_el[0]) if name_el else ''
+                # Filter out common non-name patterns often caught by too-general selectors
+                if name_candidate and len(name_candidate) > 2 and not UBER_NOT_A_NAME_RE.match(name_candidate) and "available" not in name_candidate.lower():
+                    name = name_candidate
+            
+            id_for_excel = name if name and name != 'N/A' else f'UberEats_Item_{item_counter}'
+            
+            # Price extraction from Streamlit logic
+            price_el = UBER_PRICE_XP(item_element)
+            if price_el:
+                price_text_raw_for_desc_check = normalized_text(price_el[0])
+                price = price_text_raw_for_desc_check or 'N/A' # raw text, normalized for all rows in normalize_prices()
+
+            # Description extraction from Streamlit logic
+            desc_el = UBER_DESC_XP(item_element) # Specific path from Streamlit
+            if desc_el:
+                desc_text = normalized_text(desc_el[0])
+                if desc_text and desc_text.lower() != name.lower() and desc_text != price_text_raw_for_desc_check:
+                    description = desc_text
+            else:
+                potential_desc_elements = UBER_DESC_CANDIDATES_XP(item_element)
+                for cand_el in potential_desc_elements:
+                    desc_text_candidate = normalized_text(cand_el)
+                    if desc_text_candidate and (not name or (name.lower() not in desc_text_candidate.lower() and desc_text_candidate.lower() not in name.lower())) and desc_text_candidate != price_text_raw_for_desc_check:
+                        description = desc_text_candidate
+                        break 
+            
+            # Image URL extraction from Streamlit logic
+            image_url = uber_item_image_url(item_element)
+            if image_url and not image_url.startswith(('http:', 'https:')):
+                image_url = urljoin(target_url, image_url)
+            if is_bad_image_url(image_url): image_url = None
+
+            if name and name != 'N/A': # Main condition from Streamlit
+                add_log("--> Uber Eats Item %d: '%s' | Price: %s | Category: %s | Desc: %.30s... | Img: %s", "debug", item_counter, name, price, category, description, 'Yes' if image_url else 'No')
+                menu_items_data.append(MenuItem(id_for_excel, None, category, price, name, description, image_url))
+                item_counter += 1
+            else:
+                add_log("Uber Eats: Skipping container approx index %d - name was '%s'.", "debug", item_idx, name)
+
+        except Exception as e_item_proc_uber: # More general catch for item processing
+            add_log(f"Uber Eats: Error processing item at index {item_idx}: {e_item_proc_uber}", "warning")
+    return menu_items_data
+
+def parse_wolt_menu(page_html, target_url):
+    menu_items_data = []; item_counter = 1
+    current_category = 'Unknown Category'; item_count = 0
+    for item_element in WOLT_HEADERS_AND_ITEMS_XP(lxml.html.fromstring(page_html)):
+        try:
+            if not WOLT_IS_ITEM_XP(item_element):
+                cat_text = normalized_text(item_element)
+                if cat_text: current_category = cat_text
+                continue
+            category = current_category; item_count += 1
+            
+            name_scraped_original = ''; price = 'N/A'; description = ''; image_url = None
+            name_el = WOLT_NAME_XP(item_element)
+            if name_el: name_scraped_original = normalized_text(name_el[0])
+            id_for_excel = name_scraped_original if name_scraped_original and name_scraped_original != 'N/A' else f'Wolt_Item_{item_counter}'
+            
+            price_el = WOLT_PRICE_XP(item_element)
+            if price_el: price = normalized_text(price_el[0]) or 'N/A' # raw text, normalized for all rows in normalize_prices()
+            
+            desc_el = WOLT_DESC_XP(item_element)
+            if desc_el: description = normalized_text(desc_el[0])
+            
+            img_tag = WOLT_IMG_XP(item_element)
+            if img_tag:
+                src = img_tag[0].get('src'); temp_url = last_srcset_url(img_tag[0].get('srcset'))
+                if not temp_url and src and src.startswith('http'): temp_url = src
+                if temp_url:
+                    image_url = urljoin(target_url, temp_url)
+                    if is_bad_image_url(image_url): image_url = None
+
+            if name_scraped_original and name_scraped_original != 'N/A' and price != 'N/A':
+                menu_items_data.append(MenuItem(id_for_excel, None, category, price, name_scraped_original, description, image_url))
+            item_counter += 1
+        except Exception as e_item_proc_wolt: add_log(f"Wolt: Error processing item approx {item_counter}: {e_item_proc_wolt}", "warning")
+    add_log(f"Wolt: Parsed {item_count} item containers from the page snapshot.", "info")
+    return menu_items_data
 
-        if img_to_process:
+def parse_foodora_menu(page_html, target_url):
+    menu_items_data = []; item_counter = 1
+    category_sections = FOODORA_SECTION_XP(lxml.html.fromstring(page_html))
+    add_log(f"Foodora.cz: Found {len(category_sections)} category sections.", "info")
+    for section_element in category_sections:
+        current_category = "Unknown Category"
+        category_title_el = FOODORA_CATEGORY_TITLE_XP(section_element)
+        if category_title_el: current_category = normalized_text(category_title_el[0])
+        else: add_log("Foodora.cz: Category title not found for a section.", "debug")
+        
+        for item_element in FOODORA_ITEM_XP(section_element):
             try:
-                if img_to_process.mode == 'RGBA':
-                    bg = Image.new("RGB", img_to_process.size, (255, 255, 255))
-                    bg.paste(img_to_process, mask=img_to_process.split()[3])
-                    img_final = bg
-                elif img_to_process.mode in ('P', 'LA'):
-                    img_final = img_to_process.convert('RGB')
-                elif img_to_process.mode != 'RGB':
-                    add_log(f"DEBUG: Converting image {output_filename_base} from mode {img_to_process.mode} to RGB.", "debug")
-                    img_final = img_to_process.convert('RGB')
-                else:
-                    img_final = img_to_process
-
-                img_resized = img_final.resize((1200, 1200), Image.Resampling.LANCZOS)
-                img_resized.save(output_filepath_jpg, "JPEG", quality=90)
-                return output_filepath_jpg
-            except Exception as e_resize_save:
-                add_log(f"DEBUG: Error during resize/save for {output_filename_base}: {e_resize_save}", "debug")
-                return None
-        else:
-            add_log(f"DEBUG: Image load/convert ultimately failed for {output_filename_base}", "debug")
-            return None
-    except Exception as e_outer:
-        add_log(f"DEBUG: Unexpected error processing image {output_filename_base}: {e_outer}", "error")
-        return None
+                name_el = FOODORA_NAME_XP(item_element)
+                name_scraped_original = normalized_text(name_el[0]) if name_el else ''
+                id_for_excel = name_scraped_original if name_scraped_original else f'Foodora_Item_{item_counter}'
+                price_el = FOODORA_PRICE_XP(item_element)
+                price = (normalized_text(price_el[0]) if price_el else '') or 'N/A' # raw text, normalized for all rows in normalize_prices()
+                desc_el = FOODORA_DESC_XP(item_element)
+                description = normalized_text(desc_el[0]) if desc_el else ''
+                image_url = None
+                img_style = FOODORA_IMG_STYLE_XP(item_element)
+                url_match = CSS_URL_RE.search(img_style[0]) if img_style else None
+                if url_match: image_url = url_match.group(1)
+                if is_bad_image_url(image_url): image_url = None
+                if name_scraped_original and price != 'N/A':
+                    menu_items_data.append(MenuItem(id_for_excel, None, current_category, price, name_scraped_original, description, image_url))
+                item_counter += 1
+            except Exception as e_item_foodora: add_log(f"Foodora.cz: Error processing item in '{current_category}': {e_item_foodora}", "warning")
+    return menu_items_data
+
+def parse_generic_menu(page_html, target_url):
+    menu_items_data = []; item_counter = 1
+    soup = BeautifulSoup(page_html, 'lxml', parse_only=GENERIC_ITEM_STRAINER); add_log("Generic scrape attempt...", "info")
+    menu_item_containers = []
+    for selector in GENERIC_ITEM_SELECTORS:
+        menu_item_containers = soup.select(selector)
+        if menu_item_containers: add_log(f"Found items using generic selector: '{selector}'", "info"); break
+    if not menu_item_containers: add_log("Generic: Could not find elements.", "warning")
+    for item_element in menu_item_containers:
+        try:
+            name_el = item_element.select_one(GENERIC_NAME_CSS)
+            name_scraped_original = name_el.text.strip() if name_el else ''
+            id_for_excel = name_scraped_original if name_scraped_original and name_scraped_original != 'N/A' else f'Generic_Item_{item_counter}'
+            price_el = item_element.select_one(GENERIC_PRICE_CSS)
+            price = price_el.text.strip() if price_el else 'N/A' 
+            desc_el = item_element.select_one(GENERIC_DESC_CSS)
+            description = desc_el.text.strip() if desc_el else ''
+            image_tag = item_element.find('img'); image_url = None
+            if image_tag:
+                temp_url = image_tag.get('data-src') or image_tag.get('src')
+                if temp_url:
+                    abs_url = urljoin(target_url, temp_url)
+                    if abs_url.startswith('http') and not is_bad_image_url(abs_url): image_url = abs_url
+            if name_scraped_original and name_scraped_original != 'N/A' and price != 'N/A':
+                menu_items_data.append(MenuItem(id_for_excel, None, 'Generic Fallback', price, name_scraped_original, description, image_url))
+            item_counter += 1
+        except Exception as e_gen_item: add_log(f"Generic: Error processing item: {e_gen_item}", "warning")
+    return menu_items_data
+
+# --- Scraper: Site Table ---
+# One entry per supported domain. 'menu_source' is tried first and needs no DOM work ('embedded_json' or a menu API
+# fetcher); otherwise the page comes from 'http' or from the shared 'browser' driver (cookie banner, in-page scroll,
+# settle) and goes to 'parse'. HTTP-fetched sites re-raise scraping failures; browser sites log them and return [].
+SITE_SCRAPERS = {
+    'glovoapp.com': {'label': 'Glovo', 'menu_source': 'embedded_json', 'page': 'http', 'parse': parse_glovo_menu},
+    'ubereats.com': {'label': 'Uber Eats', 'menu_source': 'embedded_json', 'page': 'browser', 'parse': parse_uber_eats_menu,
+                     'accept_css': UBER_ACCEPT_CSS, 'accept_xpath': UBER_ACCEPT_XPATH, 'items_css': UBER_CONTAINERS_CSS, 'wait_seconds': 25, 'cookie_settle_seconds': 2.5, 'settle_seconds': 7},
+    'wolt.com': {'label': 'Wolt', 'menu_source': fetch_wolt_menu_items, 'page': 'browser', 'parse': parse_wolt_menu,
+                 'accept_css': WOLT_ACCEPT_CSS, 'accept_xpath': WOLT_ACCEPT_XPATH, 'items_css': WOLT_CONTAINERS_CSS, 'wait_seconds': 20, 'cookie_settle_seconds': 2, 'settle_seconds': 5},
+    'foodora.cz': {'label': 'Foodora.cz', 'menu_source': fetch_foodora_menu_items, 'page': 'browser', 'parse': parse_foodora_menu,
+                   'accept_css': FOODORA_ACCEPT_CSS, 'accept_xpath': FOODORA_ACCEPT_XPATH, 'items_css': FOODORA_ITEM_CSS, 'wait_seconds': 20, 'cookie_settle_seconds': 2, 'settle_seconds': 3},
+}
+GENERIC_SITE_SCRAPER = {'label': 'Generic', 'menu_source': None, 'page': 'http', 'parse': parse_generic_menu}
+COMPATIBLE_LINK_RE = re.compile('|'.join(re.escape(domain) for domain in SITE_SCRAPERS), re.IGNORECASE) # links the claimer can auto-scrape
+
+def pick_scrape_url(*candidate_links):
+    """First link pointing at a SITE_SCRAPERS domain (skipping empty/"N/A" values), else None."""
+    return next((link for link in candidate_links if link and link != "N/A" and COMPATIBLE_LINK_RE.search(link)), None)
+
+def load_page_in_browser(target_url, site):
+    """Loads target_url in the shared scraper driver, accepts cookies, scrolls until the item count settles and returns page_source."""
+    label = site['label']; driver = None
+    try:
+        driver = get_scraper_driver() # Shared driver, kept open between scrapes
+        if not driver: raise ValueError(f"WebDriver setup failed for {label}.")
+        add_log(f"{label}: Navigating to {target_url}...", "info"); driver.get(target_url)
+        wait = WebDriverWait(driver, site['wait_seconds'])
+        click_cookie_banner(driver, wait, site['accept_css'], site['accept_xpath'], label, site['cookie_settle_seconds'])
+        add_log(f"{label}: Scrolling in-browser until item count stabilizes...", "info")
+        scroll_until_stable(driver, site['items_css'], label)
+        add_log(f"{label}: Scrolling finished. Waiting for final content...", "info")
+        time.sleep(site['settle_seconds'])
+        try: wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, site['items_css'])))
+        except TimeoutException: add_log(f"{label}: No item containers ('{site['items_css']}') present after scrolling.", "warning")
+        # One page_source snapshot; every per-item lookup runs in-process on lxml instead of over WebDriver
+        return driver.page_source
+    finally:
+        if driver: release_scraper_driver()
 
 # --- Scraper: Main Scraping Logic (ID as Dish Name, Foodora Added, Uber Eats Fix) ---
 def scrape_website(target_url, ffmpeg_path_to_use):
-    global _internal_item_counter # Used in your Dash app
-    _internal_item_counter = 1 # Reset for each scrape_website call
-
     add_log(f"Scraping: {target_url}", "info")
     parsed_url = urlparse(target_url)
     domain = parsed_url.netloc
-    menu_items_data = []
+    site = next((site for domain_key, site in SITE_SCRAPERS.items() if domain_key in domain), GENERIC_SITE_SCRAPER)
+    label = site['label']; menu_items_data = []
     
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/110.0.0.0 Safari/537.36',
@@ -376,584 +1148,325 @@ def scrape_website(target_url, ffmpeg_path_to_use):
         'Referer': 'https://www.google.com/'
     }
 
-    if 'glovoapp.com' in domain:
-        add_log("Glovo: Using Requests/BeautifulSoup...", "info")
+    prefetched_html = None
+    if site['menu_source'] == 'embedded_json':
+        # The site ships the menu as embedded JSON; when it parses, no DOM traversal or Selenium scroll is needed
         try:
-            response = requests.get(target_url, headers=headers, timeout=30)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
-            menu_containers = soup.select('div.product-row, li[class*=product-list__item], li[class*=product], div[data-testid="product-row"]')
-            add_log(f"Glovo: Found {len(menu_containers)} potential containers.", "info")
-            current_category = 'Unknown Category'
-            for item_element in menu_containers:
-                try:
-                    category = current_category
-                    category_header = item_element.find_previous('p', {'data-test-id': 'list-title', 'class': re.compile(r'\btypography-title-3\b')})
-                    if not category_header: category_header = item_element.find_previous(['h2', 'h3', 'h4', 'div[data-testid="category-title"]'])
-                    if category_header:
-                        cat_text = category_header.get_text(strip=True)
-                        if cat_text: category = cat_text; current_category = category
-                    
-                    name_el = item_element.select_one('[data-testid="product-row-name"], [class*=product-row__name], div[class*="product-card-name"]')
-                    name_scraped_original = name_el.get_text(strip=True) if name_el else ''
-                    id_for_excel = name_scraped_original if name_scraped_original and name_scraped_original != 'N/A' else f'Glovo_Item_{_internal_item_counter}'
-
-                    desc_el = item_element.select_one('[data-testid="product-row-description"], [class*=product-row__description]')
-                    description = desc_el.get_text(strip=True) if desc_el else ''
-                    price_el = item_element.select_one('[data-testid*="product-price"], [class*=--price], span[class*="product-price__effective"]')
-                    price = 'N/A'
-                    if price_el:
-                        price_text = price_el.get_text(strip=True); price_cleaned = re.sub(r'[^\d,.]', '', price_text).strip()
-                        if ',' in price_cleaned and '.' in price_cleaned: price = price_cleaned.replace(',', '') if price_cleaned.rfind('.') > price_cleaned.rfind(',') else price_cleaned.replace('.', '').replace(',', '.')
-                        elif ',' in price_cleaned: price = price_cleaned.replace(',', '.')
-                        else: price = price_cleaned
-                    
-                    img_el = item_element.find('img'); image_url = None
-                    if img_el:
-                        temp_url = img_el.get('data-src') or img_el.get('srcset') or img_el.get('src')
-                        if temp_url:
-                            first_url = temp_url.split(',')[0].strip().split(' ')[0]
-                            if first_url.startswith('http'): image_url = urljoin(target_url, first_url)
-                            if image_url and ('data:image' in image_url or len(image_url) < 20 or 'placeholder' in image_url): image_url = None
-                    
-                    if name_scraped_original and name_scraped_original != 'N/A' and price != 'N/A':
-                        menu_items_data.append({
-                            'ID': id_for_excel, 
-                            'image_filename': None, 'Category': category, 'Price': price, 
-                            'name in pt-PT': name_scraped_original, 'Description in pt-PT': description, 
-                            'image_url': image_url
-                        })
-                    _internal_item_counter += 1
-                except Exception as e_item: add_log(f"Glovo: Error processing item approx {_internal_item_counter}: {e_item}", "warning")
-        except Exception as e_glovo: add_log(f"Glovo: Scraping failed critically: {e_glovo}", "error"); raise e_glovo
-
-    elif 'ubereats.com' in domain:
-        add_log("Uber Eats: Using Selenium (logic from Streamlit app)...", "info")
-        driver = None
+            response = http_session.get(target_url, headers=headers, timeout=30); response.raise_for_status()
+            prefetched_html = response.text
+            menu_items_data = extract_menu_items_from_embedded_json(prefetched_html)
+        except requests.exceptions.RequestException as e_prefetch: add_log(f"Embedded JSON: Page fetch failed, using DOM scraping: {e_prefetch}", "debug")
+        except Exception as e_json_menu: add_log(f"Embedded JSON: Menu extraction failed, using DOM scraping: {e_json_menu}", "debug"); menu_items_data = []
+    elif site['menu_source']:
+        try: menu_items_data = site['menu_source'](target_url, headers)
+        except requests.exceptions.RequestException as e_menu_api: add_log(f"Menu API: Request failed, using Selenium: {e_menu_api}", "debug")
+        except Exception as e_menu_api: add_log(f"Menu API: Unexpected response, using Selenium: {e_menu_api}", "debug"); menu_items_data = []
+
+    if menu_items_data:
+        add_log(f"Menu data: Extracted {len(menu_items_data)} items without a browser for {domain}.", "info")
+    else:
+        if site is GENERIC_SITE_SCRAPER: add_log(f"Domain '{domain}' not specifically handled. Using generic Requests/BS4.", "warning")
+        add_log(f"{label}: Using {'Selenium' if site['page'] == 'browser' else 'Requests/lxml'}...", "info")
         try:
-            driver = setup_scraper_driver() # Your Dash app's setup_scraper_driver
-            if not driver: raise ValueError("WebDriver setup failed for Uber Eats.")
-
-            add_log(f"Uber Eats: Navigating to {target_url}...", "info")
-            driver.get(target_url)
-            wait = WebDriverWait(driver, 25) 
-
-            try:
-                add_log("Uber Eats: Looking for cookie button...", "info")
-                accept_xpath = "//button[contains(translate(., 'ABCDEFGHIJKLMNÑOPQRSTUVWXYZ', 'abcdefghijklmnñopqrstuvwxyz'), 'accept') or contains(translate(., 'ABCDEFGHIJKLMNÑOPQRSTUVWXYZ', 'abcdefghijklmnñopqrstuvwxyz'), 'aceitar') or contains(translate(., 'ABCDEFGHIJKLMNÑOPQRSTUVWXYZ', 'abcdefghijklmnñopqrstuvwxyz'), 'agree') or contains(@data-testid, 'accept') or @id='cookie-accept']"
-                accept_button = wait.until(EC.element_to_be_clickable((By.XPATH, accept_xpath)))
-                driver.execute_script("arguments[0].click();", accept_button) 
-                add_log("Uber Eats: Clicked accept button.", "info")
-                time.sleep(2.5) 
-            except Exception as e_cookie:
-                add_log(f"Uber Eats: Cookie button not found/clicked (often OK): {type(e_cookie).__name__}", "debug")
-
-            add_log("Uber Eats: Scrolling page until item count stabilizes (tuned)...", "info")
-            SCROLL_PAUSE_TIME = 1.8
-            scroll_attempts = 0
-            max_scroll_attempts = 200 # From Streamlit
-            last_item_count = 0
-            no_change_count = 0
-            STABILIZATION_CHECKS = 15 # From Streamlit
-            container_css_selector = 'li[data-testid^="store-item-"], div[data-testid^="store-item-"], div[role="listitem"]'
-
-            body_element = None
-            try:
-                body_element = driver.find_element(By.TAG_NAME, 'body')
-            except NoSuchElementException:
-                add_log("Error: Could not find body element for Uber Eats. Scrolling may fail.", "error")
-
-            while body_element and scroll_attempts < max_scroll_attempts:
-                scroll_attempts += 1
-                add_log(f"Uber Eats Scroll: Attempt {scroll_attempts}/{max_scroll_attempts}", "debug")
-                try:
-                    body_element.send_keys(Keys.PAGE_DOWN)
-                except Exception as e_keys:
-                    add_log(f"Uber Eats Scroll: Error sending Page Down key: {e_keys}", "debug")
-                    break 
-                time.sleep(SCROLL_PAUSE_TIME)
-                time.sleep(0.75) 
-
-                try:
-                    current_items = driver.find_elements(By.CSS_SELECTOR, container_css_selector)
-                    current_item_count = len(current_items)
-                    add_log(f"Uber Eats Scroll: Found {current_item_count} items (previously {last_item_count}).", "debug")
-                    if current_item_count == last_item_count:
-                        no_change_count += 1
-                        add_log(f"Uber Eats Scroll: Item count unchanged ({no_change_count}/{STABILIZATION_CHECKS}).", "debug")
-                        if no_change_count >= STABILIZATION_CHECKS:
-                            add_log("Uber Eats Scroll: Item count stabilized.", "info")
-                            break
-                    else:
-                        no_change_count = 0 
-                    last_item_count = current_item_count
-                except Exception as e_find: 
-                    add_log(f"Uber Eats Scroll: Error finding items after scroll: {e_find}", "debug")
-            
-            if scroll_attempts == max_scroll_attempts:
-                add_log("Uber Eats Scroll: Max scroll attempts reached.", "warning")
-            
-            add_log("Uber Eats: Scrolling finished. Waiting for final content...", "info")
-            time.sleep(7) 
-
-            add_log(f"Uber Eats: Re-fetching item containers after scroll ('{container_css_selector}')...", "info")
-            menu_item_containers = []
-            try:
-                wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, container_css_selector)))
-                menu_item_containers = driver.find_elements(By.CSS_SELECTOR, container_css_selector)
-            except Exception as e_final_find:
-                add_log(f"Uber Eats: Error finding final containers after scroll: {e_final_find}", "warning")
-
-            num_items_found = len(menu_item_containers)
-            add_log(f"Uber Eats: Found {num_items_found} total potential item containers after re-fetch.", "info")
-
-            if num_items_found == 0:
-                add_log("Uber Eats ERROR: No item containers found after re-fetch. Scraping will likely fail.", "error")
-            
-            current_category = 'Unknown Category'
-            for item_idx, item_element in enumerate(menu_item_containers):
-                item_processed_flag = False 
-                try:
-                    category = current_category
-                    try: # Category extraction from Streamlit code
-                        category_xpath = (
-                            "./preceding::*[ "
-                            "(self::h3[contains(@class, 'mb mc im ik b1')]) or " 
-                            "(self::div[@data-testid='catalog-section-title']//h3) or " 
-                            "(self::div[contains(@class, 'kf kg ma bb')]//h3) or " 
-                            "(self::h2[normalize-space() and not(contains(translate(., 'ABCDEFGHIJKLMNÑOPQRSTUVWXYZ', 'abcdefghijklmnñopqrstuvwxyz'),'featured items'))]) or "
-                            "(self::h3[normalize-space() and not(contains(translate(., 'ABCDEFGHIJKLMNÑOPQRSTUVWXYZ', 'abcdefghijklmnñopqrstuvwxyz'),'featured items'))])"
-                            "][1]"
-                        )
-                        category_header = item_element.find_element(By.XPATH, category_xpath)
-                        category_text = category_header.text.strip()
-                        if category_text and category_text.lower() != 'featured items':
-                            category = category_text
-                            current_category = category
-                    except NoSuchElementException:
-                        pass # Keep current_category if new one not found above item
-                    except Exception as e_cat_uber: # More general catch for category errors
-                         add_log(f"Uber Eats Item {_internal_item_counter}: Error extracting category: {e_cat_uber}", "debug")
-
-
-                    name = 'N/A'; price = 'N/A'; description = ''; image_url = None
-                    price_text_raw_for_desc_check = ''
-
-                    # Name extraction from Streamlit logic
-                    try:
-                        name_el = item_element.find_element(By.XPATH, "(.//div[not(.//button)]//span[normalize-space() and string-length(normalize-space()) > 3 and not(starts-with(normalize-space(), '€')) and not(starts-with(normalize-space(), '$')) and not(contains(.,'kcal')) and not(contains(translate(.,'0123456789','##########'),'#')) and not(ancestor::button) and not(ancestor::div[contains(@aria-label, 'quantity')]) and not(ancestor::div[contains(@aria-label, 'preço')]) ])[1]")
-                        name = name_el.text.strip() if name_el else 'N/A'
-                    except NoSuchElementException:
-                        try: 
-                            name_el = item_element.find_element(By.XPATH, ".//h3[string-length(normalize-space()) > 1 and not(contains(., '€')) and not(contains(., '$')) and not(contains(., 'kcal'))]")
-                            name = name_el.text.strip() if name_el else 'N/A'
-                        except NoSuchElementException:
-                            try:
-                                name_el = item_element.find_element(By.XPATH, ".//div[contains(@id, 'title') or contains(@data-testid, 'title') or contains(@style, 'font-weight: 500')][string-length(normalize-space()) > 1 and not(contains(., '€')) and not(contains(., '$')) and not(contains(., 'kcal'))]")
-                                name = name_el.text.strip() if name_el else 'N/A'
-                            except NoSuchElementException:
-                                try: # One more very general attempt from Streamlit
-                                    name_el = item_element.find_element(By.XPATH, "(.//span[normalize-space(.)])[1]")
-                                    name_candidate = name_el.text.strip()
-                                    # Filter out common non-name patterns often caught by too-general selectors
-                                    if name_candidate and len(name_candidate) > 2 and not re.match(r'^[\€\$\d.,\s]+kcal$|^[\€\$\d.,\s]+$', name_candidate) and "available" not in name_candidate.lower():
-                                        name = name_candidate
-                                    else: name = 'N/A'
-                                except: name = 'N/A'
-                    
-                    id_for_excel = name if name and name != 'N/A' else f'UberEats_Item_{_internal_item_counter}'
-                    
-                    # Price extraction from Streamlit logic
-                    try:
-                        price_el = item_element.find_element(By.XPATH, "(.//span[contains(., '€') or contains(., '$') or contains(., 'R$') or (contains(., ',') and string-length(substring-after(.,','))=2 and translate(substring-before(.,','),'0123456789','')='') or (contains(., '.') and string-length(substring-after(.,'.'))=2 and translate(substring-before(.,'.'),'0123456789','')='') ])[1]")
-                        price_text_raw_for_desc_check = price_el.text.strip()
-                        price_text_cleaned = re.sub(r'(?i)\b(from|a partir de)\b\s*', '', price_text_raw_for_desc_check, flags=re.IGNORECASE).strip()
-                        price_num_str = re.sub(r'[^\d,.]', '', price_text_cleaned).strip()
-                        if ',' in price_num_str and '.' in price_num_str:
-                            price = price_num_str.replace('.', '').replace(',', '.') if price_num_str.rfind('.') < price_num_str.rfind(',') else price_num_str.replace(',', '')
-                        elif ',' in price_num_str: price = price_num_str.replace(',', '.')
-                        elif price_num_str: price = price_num_str
-                        else: price = 'N/A'
-                    except NoSuchElementException: price = 'N/A'
-
-                    # Description extraction from Streamlit logic
-                    try:
-                        desc_el = item_element.find_element(By.XPATH, ".//div[contains(@class, 'pv ew')]//span[@class='pw']") # Specific path from Streamlit
-                        desc_text = desc_el.text.strip()
-                        if desc_text and desc_text.lower() != name.lower() and desc_text != price_text_raw_for_desc_check:
-                            description = desc_text
-                    except NoSuchElementException:
-                        try: 
-                            potential_desc_elements = item_element.find_elements(By.XPATH, ".//div[string-length(normalize-space()) > 5 and not(.//h3) and not(contains(., '€')) and not(contains(., '$')) and not(contains(., 'kcal')) and not(ancestor::button)] | .//p[string-length(normalize-space()) > 5 and not(contains(., '€')) and not(contains(., '$')) and not(contains(., 'kcal'))]")
-                            for cand_el in potential_desc_elements:
-                                desc_text_candidate = cand_el.text.strip()
-                                if desc_text_candidate and (not name or (name.lower() not in desc_text_candidate.lower() and desc_text_candidate.lower() not in name.lower())) and desc_text_candidate != price_text_raw_for_desc_check:
-                                    description = desc_text_candidate
-                                    break 
-                        except: description = ''
-                    
-                    # Image URL extraction from Streamlit logic
-                    try:
-                        image_url = None
-                        try:
-                            source_tag = item_element.find_element(By.XPATH, ".//picture/source[@srcset]")
-                            srcset = source_tag.get_attribute('srcset')
-                            if srcset:
-                                sources = [s.strip().split(' ')[0] for s in srcset.split(',') if s.strip() and s.strip().split(' ')[0].startswith('http')]
-                                image_url = sources[-1] if sources else None 
-                        except NoSuchElementException: pass
-                        if not image_url:
-                            try:
-                                img_tag = item_element.find_element(By.XPATH, ".//picture/img[@src]")
-                                image_url = img_tag.get_attribute('src')
-                            except NoSuchElementException: pass
-                        if not image_url:
-                            try:
-                                img_tag = item_element.find_element(By.XPATH, ".//img[@src]")
-                                image_url = img_tag.get_attribute('src')
-                            except NoSuchElementException: pass
-                        
-                        if image_url and not image_url.startswith(('http:', 'https:')):
-                            image_url = urljoin(target_url, image_url)
-                        if image_url and ('data:image' in image_url or len(image_url) < 25 or 'placeholder' in image_url.lower() or 'default_image' in image_url.lower()):
-                            image_url = None
-                    except Exception as e_img_uber: image_url = None
-
-
-                    if name and name != 'N/A': # Main condition from Streamlit
-                        add_log(f"--> Uber Eats Item {_internal_item_counter}: '{name}' | Price: {price} | Category: {category} | Desc: {description[:30]}... | Img: {'Yes' if image_url else 'No'}", "debug")
-                        menu_items_data.append({
-                            'ID': id_for_excel, 
-                            'image_filename': None, 'Category': category, 'Price': price, 
-                            'name in pt-PT': name, 
-                            'Description in pt-PT': description,
-                            'image_url': image_url
-                        })
-                        _internal_item_counter += 1
-                        item_processed_flag = True # Mark as processed
-                    
-                    # Log if skipped due to missing name (after all attempts)
-                    if not item_processed_flag:
-                         add_log(f"Uber Eats: Skipping container approx index {item_idx} - name was '{name}'.", "debug")
-
-                except StaleElementReferenceException:
-                    add_log(f"Uber Eats: Stale element at index {item_idx}. Skipping.", "warning")
-                except Exception as e_item_proc_uber: # More general catch for item processing
-                    add_log(f"Uber Eats: Error processing item at index {item_idx}: {e_item_proc_uber}", "warning")
-        
-        except Exception as e_uber_main: # Catch-all for the main Uber Eats block
-            add_log(f"Uber Eats: Scraping failed critically: {e_uber_main}", "error")
+            if site['page'] == 'browser': page_html = load_page_in_browser(target_url, site)
+            elif prefetched_html is not None: page_html = prefetched_html
+            else:
+                response = http_session.get(target_url, headers=headers, timeout=30); response.raise_for_status()
+                page_html = response.text
+            menu_items_data = site['parse'](page_html, target_url)
+        except Exception as e_site:
+            add_log(f"{label}: Scraping failed critically: {e_site}", "error")
+            if site['page'] == 'http': raise
             traceback.print_exc()
-        finally:
-            if driver:
-                add_log("Uber Eats: Closing WebDriver...", "info")
-                driver.quit()
-                add_log("Uber Eats: WebDriver closed.", "info")
-
-    elif 'wolt.com' in domain:
-        # ... (Your existing Wolt logic - assuming it's working or will be tuned separately) ...
-        add_log("Wolt: Using Selenium...", "info"); driver = None
-        try:
-            driver = setup_scraper_driver(); 
-            if not driver: raise ValueError("WebDriver setup failed for Wolt.")
-            add_log(f"Wolt: Navigating to {target_url}...", "info"); driver.get(target_url); wait = WebDriverWait(driver, 20)
-            try:
-                wolt_accept_xpath = "//button[contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'accept') or contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'akceptuj') or contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'okay') or contains(translate(., 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'got it') or contains(@data-test-id,'Accept') or contains(@data-localization-key, 'banner.accept-button')]"
-                accept_button = wait.until(EC.element_to_be_clickable((By.XPATH, wolt_accept_xpath)))
-                driver.execute_script("arguments[0].click();", accept_button); add_log("Wolt: Clicked accept button.", "info"); time.sleep(2)
-            except Exception as e_cookie_wolt: add_log(f"Wolt: Cookie button not found/clicked (often OK): {type(e_cookie_wolt).__name__}", "debug")
-            
-            add_log("Wolt: Scrolling page...", "info")
-            SCROLL_PAUSE_TIME = 1.8; max_scroll_attempts = 120; last_height = driver.execute_script("return document.body.scrollHeight"); no_change_count = 0; STABILIZATION_CHECKS_WOLT = 8
-            body_element = driver.find_element(By.TAG_NAME, 'body')
-            for scroll_attempt in range(max_scroll_attempts):
-                try: body_element.send_keys(Keys.PAGE_DOWN); time.sleep(SCROLL_PAUSE_TIME)
-                except: break
-                new_height = driver.execute_script("return document.body.scrollHeight")
-                if abs(new_height - last_height) < 50 : no_change_count += 1
-                else: no_change_count = 0
-                if no_change_count >= STABILIZATION_CHECKS_WOLT: add_log("Wolt: Height stabilized.", "info"); break
-                last_height = new_height
-            if scroll_attempt == max_scroll_attempts -1: add_log("Wolt: Max scroll attempts reached.", "warning")
-            time.sleep(5)
-            wolt_container_selector = 'div[data-test-id="horizontal-item-card"], div[data-test-id="VerticalItemCard"], a[data-testid*="venue-product"], div[class*="ProductCardBody"]'
-            menu_item_containers = driver.find_elements(By.CSS_SELECTOR, wolt_container_selector)
-            add_log(f"Wolt: Found {len(menu_item_containers)} item containers.", "info")
-            current_category = 'Unknown Category'
-
-            for item_element in menu_item_containers:
-                try:
-                    category = current_category
-                    try: 
-                        category_element = item_element.find_element(By.XPATH, "./preceding::*[self::h1 or self::h2 or self::h3 or @data-test-id='CategoryName' or contains(@class, 'CategoryName__')][1]")
-                        cat_text = category_element.text.strip()
-                        if cat_text: category = cat_text; current_category = category
-                    except NoSuchElementException: pass
-                    
-                    name_scraped_original = ''; price = 'N/A'; description = ''; image_url = None
-                    try: name_el = item_element.find_element(By.CSS_SELECTOR, '[data-test-id="horizontal-item-card-title"], [data-test-id="VerticalItemCardName"], h3, h4, [class*="Title-module"]')
-                    except NoSuchElementException: name_el = None
-                    if name_el: name_scraped_original = name_el.text.strip()
-                    id_for_excel = name_scraped_original if name_scraped_original and name_scraped_original != 'N/A' else f'Wolt_Item_{_internal_item_counter}'
-                    
-                    try: 
-                        price_el = item_element.find_element(By.CSS_SELECTOR, '[data-test-id*="price"], [class*="Price"], [data-hook="item-price"]')
-                        price_text_raw = price_el.text.strip(); price_num_str = re.sub(r'[^\d,.]', '', price_text_raw).strip()
-                        if ',' in price_num_str and '.' in price_num_str: price = price_num_str.replace('.', '').replace(',', '.') if price_num_str.rfind('.') > price_num_str.rfind(',') else price_num_str.replace(',', '')
-                        elif ',' in price_num_str: price = price_num_str.replace(',', '.')
-                        elif price_num_str: price = price_num_str
-                    except NoSuchElementException: price = 'N/A'
-                    
-                    try: desc_el = item_element.find_element(By.CSS_SELECTOR, '[data-test-id*="description"], [class*="Description-module"], p[class*="description"]')
-                    except NoSuchElementException: desc_el = None
-                    if desc_el: description = desc_el.text.strip()
-                    
-                    try:
-                        img_tag = item_element.find_element(By.XPATH, ".//img[(@src and not(contains(@src, 'data:image')) and string-length(@src)>20) or (@srcset and string-length(@srcset)>20)]")
-                        srcset = img_tag.get_attribute('srcset'); src = img_tag.get_attribute('src'); temp_url = None
-                        if srcset: 
-                            sources = [s.strip().split(' ')[0] for s in srcset.split(',') if s.strip() and s.strip().split(' ')[0].startswith('http')]
-                            temp_url = sources[-1] if sources else None
-                        if not temp_url and src and src.startswith('http'): temp_url = src
-                        if temp_url:
-                            image_url = urljoin(target_url, temp_url)
-                            if 'placeholder' in image_url.lower() or 'default' in image_url.lower() or len(image_url) < 25: image_url = None
-                    except NoSuchElementException: image_url = None
-
-                    if name_scraped_original and name_scraped_original != 'N/A' and price != 'N/A':
-                        menu_items_data.append({
-                            'ID': id_for_excel, 
-                            'image_filename': None, 'Category': category, 'Price': price, 
-                            'name in pt-PT': name_scraped_original, 
-                            'Description in pt-PT': description,
-                            'image_url': image_url
-                        })
-                    _internal_item_counter += 1
-                except StaleElementReferenceException: add_log(f"Wolt: Stale element approx {_internal_item_counter}. Skipping.", "warning"); continue
-                except Exception as e_item_proc_wolt: add_log(f"Wolt: Error processing item approx {_internal_item_counter}: {e_item_proc_wolt}", "warning")
-        except Exception as e_wolt: add_log(f"Wolt: Scraping failed critically: {e_wolt}", "error"); traceback.print_exc(); 
-        finally:
-            if driver: add_log("Wolt: Closing WebDriver...", "info"); driver.quit()
-
-    elif 'foodora.cz' in domain:
-        # ... (Your existing Foodora logic from the Dash app) ...
-        add_log("Foodora.cz: Using Selenium...", "info")
-        driver = None
-        try:
-            driver = setup_scraper_driver()
-            if not driver: raise ValueError("WebDriver setup failed for Foodora.cz.")
-            add_log(f"Foodora.cz: Navigating to {target_url}...", "info"); driver.get(target_url); wait = WebDriverWait(driver, 20)
-            try: 
-                consent_xpaths = [ "//button[contains(translate(., 'SOUHLASÍM', 'souhlasím'), 'souhlasím')]", "//button[contains(translate(., 'PŘIJMOUT VŠE', 'přijmout vše'), 'přijmout vše')]", "//button[@data-testid='button-acceptAll']", "//button[contains(@class, 'accept') and contains(@class, 'cookie')]" ]
-                for xpath_consent in consent_xpaths: 
-                    try:
-                        consent_button = wait.until(EC.element_to_be_clickable((By.XPATH, xpath_consent)))
-                        if consent_button: driver.execute_script("arguments[0].click();", consent_button); add_log("Foodora.cz: Clicked a consent button.", "info"); time.sleep(2); break
-                    except TimeoutException: continue
-            except Exception as e_cookie_foodora: add_log(f"Foodora.cz: Error handling cookie consent: {e_cookie_foodora}", "warning")
-
-            add_log("Foodora.cz: Scrolling page...", "info") 
-            SCROLL_PAUSE_TIME = 2.0; max_scroll_attempts = 60; last_height = driver.execute_script("return document.body.scrollHeight"); no_change_count = 0; STABILIZATION_CHECKS_FOODORA = 5
-            body_element = driver.find_element(By.TAG_NAME, 'body')
-            for scroll_attempt in range(max_scroll_attempts):
-                try: body_element.send_keys(Keys.PAGE_DOWN); time.sleep(SCROLL_PAUSE_TIME)
-                except: break
-                new_height = driver.execute_script("return document.body.scrollHeight")
-                if abs(new_height - last_height) < 100: no_change_count += 1
-                else: no_change_count = 0
-                if no_change_count >= STABILIZATION_CHECKS_FOODORA: add_log("Foodora.cz: Page scroll height stabilized.", "info"); break
-                last_height = new_height
-            if scroll_attempt == max_scroll_attempts -1: add_log("Foodora.cz: Max scroll attempts reached.", "warning")
-            time.sleep(3)
-
-            category_sections = driver.find_elements(By.CSS_SELECTOR, "div.dish-category-section[data-testid='menu-category-section']")
-            add_log(f"Foodora.cz: Found {len(category_sections)} category sections.", "info")
-            for section_element in category_sections:
-                current_category = "Unknown Category"
-                try:
-                    category_title_el = section_element.find_element(By.CSS_SELECTOR, "h2.dish-category-title")
-                    current_category = category_title_el.text.strip() if category_title_el else "Unknown Category"
-                except NoSuchElementException: add_log("Foodora.cz: Category title not found for a section.", "debug")
-                
-                item_containers = section_element.find_elements(By.CSS_SELECTOR, "li.product-tile[data-testid='menu-product']")
-                for item_element in item_containers:
-                    try:
-                        name_scraped_original = ''; price = 'N/A'; description = ''; image_url = None
-                        try:
-                            name_el = item_element.find_element(By.CSS_SELECTOR, "span[data-testid='menu-product-name']")
-                            name_scraped_original = name_el.text.strip() if name_el else ''
-                        except NoSuchElementException: name_scraped_original = ''
-                        id_for_excel = name_scraped_original if name_scraped_original else f'Foodora_Item_{_internal_item_counter}'
-                        try:
-                            price_el = item_element.find_element(By.CSS_SELECTOR, "p[data-testid='menu-product-price']")
-                            price_text_raw = price_el.text.strip() if price_el else ''
-                            price_match = re.search(r'(\d+([.,]\d{1,2})?)', price_text_raw) 
-                            price = price_match.group(1).replace(',', '.') if price_match else 'N/A'
-                        except NoSuchElementException: price = 'N/A'
-                        try:
-                            desc_el = item_element.find_element(By.CSS_SELECTOR, "p.product-tile__description[data-testid='menu-product-description']")
-                            description = desc_el.text.strip() if desc_el else ''
-                        except NoSuchElementException: description = ''
-                        try:
-                            img_div = item_element.find_element(By.CSS_SELECTOR, "div.lazy-loaded-dish-photo[data-testid='menu-product-image']")
-                            style_attr = img_div.get_attribute("style")
-                            url_match = re.search(r'url\("?([^")]*)"?\)', style_attr)
-                            if url_match: image_url = url_match.group(1)
-                            if image_url and ('data:image' in image_url or len(image_url) < 20): image_url = None
-                        except NoSuchElementException: image_url = None
-                        if name_scraped_original and price != 'N/A':
-                            menu_items_data.append({'ID': id_for_excel, 'image_filename': None, 'Category': current_category, 'Price': price, 'name in pt-PT': name_scraped_original, 'Description in pt-PT': description, 'image_url': image_url})
-                        _internal_item_counter += 1
-                    except Exception as e_item_foodora: add_log(f"Foodora.cz: Error processing item in '{current_category}': {e_item_foodora}", "warning")
-        except Exception as e_foodora: add_log(f"Foodora.cz: Scraping failed critically: {e_foodora}", "error"); traceback.print_exc();
-        finally:
-            if driver: add_log("Foodora.cz: Closing WebDriver...", "info"); driver.quit()
-    
-    else: 
-        add_log(f"Domain '{domain}' not specifically handled. Using generic Requests/BS4.", "warning")
-        try:
-            response = requests.get(target_url, headers=headers, timeout=25); response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser'); add_log("Generic scrape attempt...", "info")
-            generic_selectors = ['div.menu-item', 'li.product', 'article.dish', '.item-card', 'div[class*="item"]', 'div[class*="product"]']
-            menu_item_containers = []
-            for selector in generic_selectors:
-                menu_item_containers = soup.select(selector)
-                if menu_item_containers: add_log(f"Found items using generic selector: '{selector}'", "info"); break
-            if not menu_item_containers: add_log("Generic: Could not find elements.", "warning")
-            for item_element in menu_item_containers:
-                try:
-                    name_el = item_element.select_one('.item-name, .product-name, .title, h3, h4, [class*="name"]')
-                    name_scraped_original = name_el.text.strip() if name_el else ''
-                    id_for_excel = name_scraped_original if name_scraped_original and name_scraped_original != 'N/A' else f'Generic_Item_{_internal_item_counter}'
-                    price_el = item_element.select_one('.item-price, .product-price, .price, [class*="price"]')
-                    price = price_el.text.strip() if price_el else 'N/A' 
-                    desc_el = item_element.select_one('.item-description, .product-description, .description, p, [class*="desc"]')
-                    description = desc_el.text.strip() if desc_el else ''
-                    category = 'Generic Fallback'; image_tag = item_element.find('img'); image_url = None
-                    if image_tag:
-                        temp_url = image_tag.get('data-src') or image_tag.get('src')
-                        if temp_url:
-                            abs_url = urljoin(target_url, temp_url)
-                            if abs_url.startswith('http') and 'data:image' not in abs_url and len(abs_url) > 20: image_url = abs_url
-                    if name_scraped_original and name_scraped_original != 'N/A' and price != 'N/A':
-                        menu_items_data.append({'ID': id_for_excel, 'image_filename': None, 'Category': category, 'Price': price, 'name in pt-PT': name_scraped_original, 'Description in pt-PT': description, 'image_url': image_url})
-                    _internal_item_counter +=1
-                except Exception as e_gen_item: add_log(f"Generic: Error processing item: {e_gen_item}", "warning")
-        except requests.exceptions.RequestException as e_req_gen: add_log(f"Error fetching generic URL: {e_req_gen}", "error"); raise e_req_gen
-        except Exception as e_gen_other: add_log(f"Error during generic scraping: {e_gen_other}", "error"); raise e_gen_other
 
     if not menu_items_data:
         add_log(f"Warning: No menu items were successfully scraped from {target_url}", "warning")
         
     return menu_items_data
 
+IMAGE_URL_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp', '.avif', '.tiff', '.bmp')
+
+def download_image_bytes(image_url, headers):
+    """Fetches one image through the shared session. Returns (status, bytes); bytes is None on failure and status holds the reason."""
+    try:
+        with http_session.get(image_url, headers=headers, timeout=20, stream=True) as img_response: # stream: the body is only read once the headers say it's an image
+            img_response.raise_for_status()
+            content_type = img_response.headers.get('Content-Type', '').lower()
+            is_image = content_type.startswith('image/') or str(image_url).lower().endswith(IMAGE_URL_EXTENSIONS)
+            if not is_image: return f'Non-image ({content_type[:20]})', None
+            image_data_bytes = img_response.content
+        if not image_data_bytes: return 'DL empty file', None
+        return None, image_data_bytes
+    except requests.exceptions.Timeout: return 'DL Timeout', None
+    except requests.exceptions.HTTPError as e_http: return f'DL HTTP Err {e_http.response.status_code}', None
+    except requests.exceptions.RequestException: return 'DL Conn Err', None
+    except Exception as e_unexp: add_log(f"Web Img DL for '{image_url}': Unexp err: {e_unexp}", "error"); return 'Unknown Proc Error', None
+
+async def download_image_bytes_async(client, image_url):
+    """download_image_bytes() over a shared httpx.AsyncClient; same (status, bytes) result."""
+    try:
+        async with client.stream('GET', image_url) as img_response:
+            img_response.raise_for_status()
+            content_type = img_response.headers.get('Content-Type', '').lower()
+            if not (content_type.startswith('image/') or str(image_url).lower().endswith(IMAGE_URL_EXTENSIONS)): return f'Non-image ({content_type[:20]})', None
+            image_data_bytes = await img_response.aread()
+        if not image_data_bytes: return 'DL empty file', None
+        return None, image_data_bytes
+    except httpx.TimeoutException: return 'DL Timeout', None
+    except httpx.HTTPStatusError as e_http: return f'DL HTTP Err {e_http.response.status_code}', None
+    except httpx.RequestError: return 'DL Conn Err', None
+    except Exception as e_unexp: add_log(f"Web Img DL for '{image_url}': Unexp err: {e_unexp}", "error"); return 'Unknown Proc Error', None
+
+def iter_image_downloads(download_jobs, headers):
+    """Downloads [(key, image_url), ...] and yields (key, status, bytes) as each finishes. With httpx + h2 installed, all
+    requests multiplex over HTTP/2 connections from one asyncio loop (on a helper thread); otherwise they fan out over
+    IMAGE_DOWNLOAD_WORKERS threads on the keep-alive http_session."""
+    if httpx is None:
+        with ThreadPoolExecutor(max_workers=IMAGE_DOWNLOAD_WORKERS) as download_executor:
+            future_to_key = {download_executor.submit(download_image_bytes, image_url, headers): key for key, image_url in download_jobs}
+            for future in as_completed(future_to_key): yield (future_to_key[future], *future.result())
+        return
+    finished = queue.Queue()
+    async def fetch_all():
+        limits = httpx.Limits(max_connections=IMAGE_DOWNLOAD_WORKERS, max_keepalive_connections=16)
+        async with httpx.AsyncClient(http2=True, limits=limits, timeout=20, headers=headers, follow_redirects=True) as client:
+            async def fetch_one(key, image_url): finished.put((key, *await download_image_bytes_async(client, image_url)))
+            await asyncio.gather(*(fetch_one(key, image_url) for key, image_url in download_jobs))
+    def run_fetch_all():
+        try: asyncio.run(fetch_all())
+        except Exception as e_loop: add_log(f"HTTP/2 image download loop failed: {e_loop}", "error")
+        finally: finished.put(None)
+    threading.Thread(target=run_fetch_all, daemon=True).start()
+    pending_keys = {key for key, _ in download_jobs}
+    while pending_keys:
+        result = finished.get()
+        if result is None: break
+        pending_keys.discard(result[0]); yield result
+    for key in pending_keys: yield key, 'DL Conn Err', None # only reached if the loop itself died
+
 # --- Scraper: Data and Image Processing after Scraping ---
 def process_web_images_and_data(menu_items_data, base_url, ffmpeg_path_to_use): 
-    global ffmpeg_path_global
-    if not ffmpeg_path_to_use: ffmpeg_path_to_use = ffmpeg_path_global
+    if not ffmpeg_path_to_use: ffmpeg_path_to_use = get_ffmpeg_path()
 
-    if not os.path.exists(IMAGES_OUTPUT_FOLDER):
-        try: os.makedirs(IMAGES_OUTPUT_FOLDER)
-        except Exception as e: add_log(f"Error creating web image output folder: {e}", "error"); return pd.DataFrame(), []
     processed_image_files = []; df = pd.DataFrame(); headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/110.0.0.0 Safari/537.36', 'Referer': base_url}
     if not menu_items_data: return df, processed_image_files
     try:
-        df = pd.DataFrame(menu_items_data)
-        cols_needed = ['ID', 'image_filename', 'Category', 'Price', 'name in pt-PT', 'Description in pt-PT', 'image_url']
-        for col in cols_needed:
-            if col not in df.columns: 
-                df[col] = pd.NA 
+        df = normalize_prices(pd.DataFrame.from_records(menu_items_data, columns=MENU_ITEM_COLUMNS))
         add_log(f"Processing Web Images: DataFrame created ({df.shape}). Columns: {df.columns.tolist()}", "info")
         total_items = len(df)
+        download_jobs = [] # (position, sanitized_base_name, image_url) - downloaded on threads, then decoded/resized as each download lands
+        statuses = ['Processing Error'] * total_items # written back to df['image_filename'] in one assignment at the end
         
-        for index, row in df.iterrows():
-            add_log(f"Processing web image {index+1}/{total_items}", "debug") 
-            dish_name_for_file = str(row.get('ID', f'item_unnamed_{index}')) 
+        for position, (index, dish_id, image_url_val) in enumerate(zip(df.index, df['ID'], df['image_url'])):
+            dish_name_for_file = str(dish_id) 
             sanitized_base_name = sanitize_filename(f"{index}_{dish_name_for_file}")
-            image_url_val = row.get('image_url')
-            df.loc[index, 'image_filename'] = 'Processing Error' 
             if not image_url_val or not isinstance(image_url_val, str) or not image_url_val.startswith(('http:', 'https:')):
-                df.loc[index, 'image_filename'] = 'No valid URL'; continue
+                statuses[position] = 'No valid URL'; continue
             if not sanitized_base_name: 
-                df.loc[index, 'image_filename'] = 'Invalid name for file'; continue
-            try:
-                img_response = requests.get(image_url_val, headers=headers, timeout=20, stream=True); img_response.raise_for_status()
-                content_type = img_response.headers.get('Content-Type', '').lower()
-                is_image = content_type.startswith('image/') or any(str(image_url_val).lower().endswith(ext) for ext in ['.jpg', '.jpeg', '.png', '.gif', '.webp', '.avif', '.tiff', '.bmp'])
-                if not is_image: df.loc[index, 'image_filename'] = f'Non-image ({content_type[:20]})'; continue
-                image_data_bytes = img_response.content
-                if not image_data_bytes: df.loc[index, 'image_filename'] = 'DL empty file'; continue
-                output_filepath = process_single_image(image_data_bytes, sanitized_base_name, IMAGES_OUTPUT_FOLDER, ffmpeg_path_to_use)
-                if output_filepath == "FFmpeg required": current_image_status = "FFmpeg required"
+                statuses[position] = 'Invalid name for file'; continue
+            download_jobs.append((position, sanitized_base_name, image_url_val))
+
+        def downloaded_images():
+            for job_key, dl_status, image_data_bytes in iter_image_downloads([((position, base_name), image_url) for position, base_name, image_url in download_jobs], headers):
+                if image_data_bytes: yield job_key, image_data_bytes
+                else: statuses[job_key[0]] = dl_status
+
+        if download_jobs:
+            add_log(f"Downloading and processing {len(download_jobs)} of {total_items} web images concurrently...", "info")
+            for (position, base_name), jpeg_bytes, failure_reason in iter_processed_images(downloaded_images(), ffmpeg_path_to_use, job_count=len(download_jobs)):
+                output_filepath = write_processed_image(jpeg_bytes, base_name, IMAGES_OUTPUT_FOLDER) if jpeg_bytes else None
+                if failure_reason == "FFmpeg required": current_image_status = "FFmpeg required"
                 elif output_filepath: current_image_status = os.path.basename(output_filepath); processed_image_files.append(output_filepath)
-                else: current_image_status = 'Image processing failed'
-                df.loc[index, 'image_filename'] = current_image_status
-            except requests.exceptions.Timeout: df.loc[index, 'image_filename'] = 'DL Timeout'
-            except requests.exceptions.HTTPError as e_http: df.loc[index, 'image_filename'] = f'DL HTTP Err {e_http.response.status_code}'
-            except requests.exceptions.RequestException: df.loc[index, 'image_filename'] = f'DL Conn Err'
-            except Exception as e_unexp: add_log(f"Web Img DL for '{dish_name_for_file}': Unexp err: {e_unexp}", "error"); df.loc[index, 'image_filename'] = 'Unknown Proc Error'
+                else: add_log("DEBUG: Web image %s failed: %s", "debug", base_name, failure_reason); current_image_status = 'Image processing failed'
+                statuses[position] = current_image_status
+        df['image_filename'] = statuses
     except Exception as e_proc_web: 
         add_log(f"CRITICAL WEB IMAGE PROCESSING ERROR: {e_proc_web}", "error"); traceback.print_exc()
+        if 'statuses' in locals(): df['image_filename'] = statuses
         return df if 'df' in locals() and isinstance(df, pd.DataFrame) else pd.DataFrame(), processed_image_files
     return df, processed_image_files
 
 # --- Scraper: Output File Generation (Updated for Conditional Columns) ---
+OUTPUT_FILES_KEEP = 32 # Newest generated files kept on disk; each scrape/claimed case adds up to two, only the latest few are still downloadable
+recent_output_files = deque()
+output_files_lock = threading.Lock() # claimer thread and Dash callbacks both create output files
+
+def new_output_file_path(suffix):
+    """Fresh file path in OUTPUT_FILES_DIR. Files from older scraping cycles beyond OUTPUT_FILES_KEEP are deleted, so a
+    long-running claimer doesn't pile up one Excel + ZIP per case."""
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=OUTPUT_FILES_DIR); os.close(fd)
+    with output_files_lock:
+        recent_output_files.append(path)
+        while len(recent_output_files) > OUTPUT_FILES_KEEP:
+            stale_path = recent_output_files.popleft()
+            try: os.remove(stale_path)
+            except OSError: pass
+    return path
+
+output_file_memo = {} # content key -> path from new_output_file_path, so reprocessing identical data reuses the file it built
+
+def memoized_output_file(memo_key, suffix):
+    """New output path (see new_output_file_path) hard-linked to the file built earlier for memo_key, or None when that file is gone.
+    Every caller gets its own path, so deleting one run's download (e.g. a finished case's) never breaks another run's link."""
+    with output_files_lock:
+        cached_path = output_file_memo.get(memo_key)
+        if cached_path is not None and (cached_path not in recent_output_files or not os.path.isfile(cached_path)):
+            del output_file_memo[memo_key]; cached_path = None
+    if cached_path is None: return None
+    path = new_output_file_path(suffix)
+    try:
+        os.remove(path) # mkstemp's empty placeholder; the unique name is kept for the link
+        try: os.link(cached_path, path)
+        except OSError: shutil.copyfile(cached_path, path) # filesystems without hard links
+    except OSError: delete_output_files(path); return None # cached file deleted meanwhile: build it again
+    remember_output_file(memo_key, path) # newest copy, so the memo outlives the original's rotation
+    return path
+
+def remember_output_file(memo_key, path):
+    with output_files_lock:
+        kept_paths = set(recent_output_files)
+        for stale_key in [k for k, p in output_file_memo.items() if p not in kept_paths]: del output_file_memo[stale_key]
+        output_file_memo[memo_key] = path
+
+def is_output_file(path):
+    """True for an existing file inside OUTPUT_FILES_DIR (store data comes back from the browser, so don't serve arbitrary paths)."""
+    return bool(path) and os.path.dirname(os.path.abspath(path)) == os.path.abspath(OUTPUT_FILES_DIR) and os.path.isfile(path)
+
+def delete_output_files(*paths):
+    """Deletes files created by new_output_file_path as soon as they are no longer needed (e.g. a finished case's downloads)."""
+    for path in paths:
+        if not is_output_file(path): continue
+        with output_files_lock:
+            try: recent_output_files.remove(path)
+            except ValueError: pass
+        try: os.remove(path)
+        except OSError: pass
+
+UPLOAD_DECODE_WORKERS = 4
+upload_decode_executor = ThreadPoolExecutor(max_workers=UPLOAD_DECODE_WORKERS, thread_name_prefix="UploadDecode")
+
+def save_uploaded_file(upload_content, upload_filename):
+    """Decodes one dcc.Upload data URL into a new file in UPLOADED_FILES_DIR and returns its path."""
+    fd, path = tempfile.mkstemp(suffix=os.path.splitext(upload_filename or '')[1], dir=UPLOADED_FILES_DIR)
+    with os.fdopen(fd, 'wb') as upload_f: upload_f.write((pybase64 or base64).b64decode(upload_content.split(',', 1)[1]))
+    return path
+
+def is_uploaded_file(path):
+    """True for an existing file saved by save_uploaded_file (store data comes back from the browser, so don't trust other paths)."""
+    return bool(path) and os.path.dirname(os.path.abspath(path)) == os.path.abspath(UPLOADED_FILES_DIR) and os.path.isfile(path)
+
+def read_uploaded_file(path):
+    """Bytes of a file saved by save_uploaded_file; b'' for anything else."""
+    if not is_uploaded_file(path): return b''
+    with open(path, 'rb') as upload_f: return upload_f.read()
+
+def delete_uploaded_files(paths):
+    for path in paths:
+        if is_uploaded_file(path):
+            try: os.remove(path)
+            except OSError: pass
+
+PYEXCELERATE_MAX_ROWS = 50000 # pyexcelerate builds the whole sheet in memory; bigger frames go to the streaming writers
+
+def write_dataframe_xlsx(df, sheet_name, xlsx_path):
+    """Single-sheet, unstyled .xlsx written to xlsx_path, without pandas to_excel's per-cell styling. Uses the first available of:
+    pyexcelerate (values dumped in one go, menu-sized frames only), xlsxwriter in constant_memory mode, openpyxl write-only (lxml serializer)."""
+    header = [str(col) for col in df.columns]
+    values = df.astype(object).where(df.notna(), None) # NaN/NA -> empty cells
+    if pyexcelerate is not None and len(values) <= PYEXCELERATE_MAX_ROWS:
+        wb = pyexcelerate.Workbook(); wb.new_sheet(sheet_name, data=[header] + values.values.tolist())
+        wb.save(xlsx_path)
+        return
+    rows = values.itertuples(index=False, name=None)
+    if xlsxwriter is not None:
+        wb = xlsxwriter.Workbook(xlsx_path, {'constant_memory': True, 'strings_to_urls': False}); ws = wb.add_worksheet(sheet_name)
+        ws.write_row(0, 0, header)
+        for row_idx, row in enumerate(rows, start=1): ws.write_row(row_idx, 0, row)
+        wb.close()
+    else:
+        wb = openpyxl.Workbook(write_only=True); ws = wb.create_sheet(title=sheet_name)
+        ws.append(header)
+        for row in rows: ws.append(row)
+        wb.save(xlsx_path)
+
+def files_present_on_disk(file_paths):
+    """Set of the given paths that exist as regular files, from one os.scandir per distinct folder (DirEntry.is_file() uses
+    the directory listing) instead of exists() + isfile() stat calls per file. Entry paths are built like os.path.join(folder, name)."""
+    present = set()
+    for folder in {os.path.dirname(f) for f in file_paths}:
+        try:
+            with os.scandir(folder or '.') as entries: present.update(os.path.join(folder, e.name) for e in entries if e.is_file())
+        except OSError: continue
+    return present
+
+# Per-country Excel layout: (output column order, {scraped column: output column}); output columns not mapped stay empty
+PT_EXCEL_RENAMES = {'image_filename': 'images', 'Category': 'category', 'Price': 'price', 'name in pt-PT': 'name pt', 'Description in pt-PT': 'description pt'}
+EN_EXCEL_LAYOUT = (['ID', 'Category', 'Images', 'Name en-US', 'Description en-US', 'Price'], {'image_filename': 'Images', 'name in pt-PT': 'Name en-US', 'Description in pt-PT': 'Description en-US'})
+EXCEL_COLUMN_LAYOUTS = {
+    'Portugal': (['ID', 'images', 'category', 'price', 'name pt', 'name en', 'description pt', 'description en'], PT_EXCEL_RENAMES),
+    'Ghana': EN_EXCEL_LAYOUT,
+    'Czechia': EN_EXCEL_LAYOUT,
+}
+DEFAULT_EXCEL_COLUMN_LAYOUT = (['ID', 'images', 'category', 'price', 'name pt', 'description pt'], PT_EXCEL_RENAMES)
+
+ZIP_COPY_CHUNK_BYTES = 1 << 20 # ZipFile.write copies members in 8 KiB reads; images are copied in 1 MiB chunks instead
+
+def write_stored_zip_member(zf, file_path):
+    """Like zf.write(file_path, arcname=basename) for a stored (uncompressed) member, with fewer, larger reads/writes."""
+    member_info = zipfile.ZipInfo.from_file(file_path, arcname=os.path.basename(file_path)); member_info.compress_type = zipfile.ZIP_STORED
+    with open(file_path, 'rb') as src_f, zf.open(member_info, 'w') as member_f: shutil.copyfileobj(src_f, member_f, ZIP_COPY_CHUNK_BYTES)
+
 def create_output_files(df, processed_image_files, images_folder_path, selected_country):
+    """Writes the Excel and the images ZIP to files under OUTPUT_FILES_DIR (nothing is buffered in memory).
+    Returns (excel_path, excel_download_name, zip_path, zip_download_name); a path is None when that file wasn't produced."""
     excel_filename_base = f"scraped_menu_{selected_country.lower()}"
     final_excel_filename = f"{excel_filename_base}_final.xlsx"
     zip_filename = f"scraped_menu_images_{selected_country.lower()}.zip"
-    excel_data = None; zip_data = None
+    excel_path = None; zip_path = None
     if df is not None and not df.empty:
-        final_df_for_excel = pd.DataFrame()
-        if selected_country == "Portugal":
-            desired_excel_column_order = ['ID', 'images', 'category', 'price', 'name pt', 'name en', 'description pt', 'description en']
-            final_df_for_excel['ID'] = df['ID']; final_df_for_excel['images'] = df.get('image_filename', pd.NA)
-            final_df_for_excel['category'] = df.get('Category', pd.NA); final_df_for_excel['price'] = df.get('Price', pd.NA)
-            final_df_for_excel['name pt'] = df['name in pt-PT']; final_df_for_excel['name en'] = pd.NA 
-            final_df_for_excel['description pt'] = df.get('Description in pt-PT', pd.NA); final_df_for_excel['description en'] = pd.NA
-        elif selected_country == "Ghana" or selected_country == "Czechia": 
-            desired_excel_column_order = ['ID', 'Category', 'Images', 'Name en-US', 'Description en-US', 'Price']
-            final_df_for_excel['ID'] = df['ID']; final_df_for_excel['Category'] = df.get('Category', pd.NA)
-            final_df_for_excel['Images'] = df.get('image_filename', pd.NA); final_df_for_excel['Name en-US'] = df['name in pt-PT'] 
-            final_df_for_excel['Description en-US'] = df.get('Description in pt-PT', pd.NA); final_df_for_excel['Price'] = df.get('Price', pd.NA)
-        else: 
+        if selected_country not in EXCEL_COLUMN_LAYOUTS:
             add_log(f"Warning: Unknown country '{selected_country}' for Excel. Using default PT structure.", "warning")
-            desired_excel_column_order = ['ID', 'images', 'category', 'price', 'name pt', 'description pt'] 
-            final_df_for_excel['ID'] = df['ID']; final_df_for_excel['images'] = df.get('image_filename', pd.NA)
-            final_df_for_excel['category'] = df.get('Category', pd.NA); final_df_for_excel['price'] = df.get('Price', pd.NA)
-            final_df_for_excel['name pt'] = df['name in pt-PT']; final_df_for_excel['description pt'] = df.get('Description in pt-PT', pd.NA)
-        final_df_for_excel = final_df_for_excel.reindex(columns=desired_excel_column_order)
+        desired_excel_column_order, source_column_renames = EXCEL_COLUMN_LAYOUTS.get(selected_country, DEFAULT_EXCEL_COLUMN_LAYOUT)
+        final_df_for_excel = df.rename(columns=source_column_renames).reindex(columns=desired_excel_column_order) # one projection; columns with no source come out empty
         try:
-            excel_buffer = io.BytesIO()
-            with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer: final_df_for_excel.to_excel(writer, index=False, sheet_name=f'Menu_{selected_country}')
-            excel_data = excel_buffer.getvalue(); add_log(f"Excel data for {selected_country} created ({len(excel_data)} bytes).", "info")
-        except Exception as e_excel: add_log(f"Error creating Excel for {selected_country}: {e_excel}", "error"); traceback.print_exc()
+            # Reprocessing the same upload/URL yields the same frame: hash it (values + column names) and reuse the workbook already written
+            excel_memo_key = ('xlsx', selected_country, hashlib.blake2b(pd.util.hash_pandas_object(final_df_for_excel.astype(str), index=False).values.tobytes()
+                                                                          + '\x1f'.join(map(str, final_df_for_excel.columns)).encode(), digest_size=16).hexdigest())
+            excel_path = memoized_output_file(excel_memo_key, '.xlsx')
+            if excel_path: add_log(f"Excel data for {selected_country} unchanged; reusing the file already written.", "info")
+            else:
+                excel_path = new_output_file_path('.xlsx'); write_dataframe_xlsx(final_df_for_excel, f'Menu_{selected_country}', excel_path)
+                remember_output_file(excel_memo_key, excel_path)
+                add_log(f"Excel data for {selected_country} created ({os.path.getsize(excel_path)} bytes).", "info")
+        except Exception as e_excel: excel_path = None; add_log(f"Error creating Excel for {selected_country}: {e_excel}", "error"); traceback.print_exc()
     else: add_log(f"DataFrame empty, skipping Excel for {selected_country} scrape.", "warning")
     if processed_image_files:
-        existing_files_on_disk = [f for f in processed_image_files if os.path.exists(f) and os.path.isfile(f)]
+        files_on_disk = files_present_on_disk(processed_image_files)
+        existing_files_on_disk = [f for f in processed_image_files if f in files_on_disk]
         if existing_files_on_disk:
             try:
-                zip_buffer = io.BytesIO()
-                with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                    add_log(f"Zipping {len(existing_files_on_disk)} web images for {selected_country}...", "info")
-                    for file_path in existing_files_on_disk: zipf.write(file_path, arcname=os.path.basename(file_path))
-                zip_data = zip_buffer.getvalue(); add_log(f"Web images ZIP data for {selected_country} created ({len(zip_data)} bytes).", "info")
-            except Exception as e_zip: add_log(f"Error creating web images zip for {selected_country}: {e_zip}", "error")
+                # Same image files (path, size, mtime) in the same order -> same ZIP; no need to read the images again
+                zip_memo_key = ('zip', tuple((f, f_stat.st_size, f_stat.st_mtime_ns) for f, f_stat in ((f, os.stat(f)) for f in existing_files_on_disk)))
+                zip_path = memoized_output_file(zip_memo_key, '.zip')
+                if zip_path: add_log(f"Web images for {selected_country} unchanged; reusing the ZIP already written.", "info")
+                else:
+                    zip_path = new_output_file_path('.zip')
+                    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_STORED) as zipf: # already-compressed JPEGs: deflate costs CPU and saves ~nothing
+                        add_log(f"Zipping {len(existing_files_on_disk)} web images for {selected_country}...", "info")
+                        for file_path in existing_files_on_disk: write_stored_zip_member(zipf, file_path)
+                    remember_output_file(zip_memo_key, zip_path)
+                    add_log(f"Web images ZIP data for {selected_country} created ({os.path.getsize(zip_path)} bytes).", "info")
+            except Exception as e_zip: zip_path = None; add_log(f"Error creating web images zip for {selected_country}: {e_zip}", "error")
         else: add_log(f"No processed web image files on disk for {selected_country} zipping.", "warning")
     else: add_log(f"No web images listed as processed for {selected_country} zipping.", "warning")
-    return excel_data, final_excel_filename, zip_data, zip_filename
+    return excel_path, final_excel_filename, zip_path, zip_filename
 
 # --- Helper Function for Auto-Scraping Claimed Case Links ---
 def scrape_and_prepare_case_files(url_to_scrape, case_country, case_id_for_log=""):
-    global ffmpeg_path_global 
     if not url_to_scrape or not isinstance(url_to_scrape, str) or not url_to_scrape.startswith('http'):
         add_log(f"Auto-Scrape: Invalid URL for case '{case_id_for_log}': {url_to_scrape}", "warning"); return None
     add_log(f"Auto-Scrape: Starting for case '{case_id_for_log}', URL: {url_to_scrape}, Country: {case_country}", "info")
     
-    if not ffmpeg_path_global: 
-        add_log("Auto-Scrape: FFmpeg path not set globally. Attempting to find now.", "warning")
-        find_ffmpeg_on_startup() 
-    
     class DummyProgressArea: 
         def empty(self): return self
         def progress(self, val): pass
@@ -961,126 +1474,83 @@ def scrape_and_prepare_case_files(url_to_scrape, case_country, case_id_for_log="
     dummy_log_area = DummyProgressArea()
 
     try:
-        menu_data = scrape_website(url_to_scrape, ffmpeg_path_global) 
+        menu_data = scrape_website(url_to_scrape, get_ffmpeg_path()) 
         if not menu_data: add_log(f"Auto-Scrape: No data from scraping URL for case '{case_id_for_log}'.", "warning"); return None
         
         df_processed, images_saved = process_web_images_and_data(
-            menu_data, url_to_scrape, ffmpeg_path_global
+            menu_data, url_to_scrape, get_ffmpeg_path()
         )
 
         if df_processed is None or df_processed.empty: add_log(f"Auto-Scrape: DataFrame empty after processing for case '{case_id_for_log}'.", "warning"); return None
 
-        excel_bytes, excel_name, zip_bytes, zip_name = create_output_files(
+        excel_path, excel_name, zip_path, zip_name = create_output_files(
             df_processed, images_saved, IMAGES_OUTPUT_FOLDER, case_country
         )
         
-        if excel_bytes or zip_bytes:
-            add_log(f"Auto-Scrape: Files prepared for case '{case_id_for_log}'. Excel: {'Yes' if excel_bytes else 'No'}, ZIP: {'Yes' if zip_bytes else 'No'}", "info")
-            return {"excel_bytes": excel_bytes, "excel_name": excel_name, "zip_bytes": zip_bytes, "zip_name": zip_name}
+        if excel_path or zip_path:
+            add_log(f"Auto-Scrape: Files prepared for case '{case_id_for_log}'. Excel: {'Yes' if excel_path else 'No'}, ZIP: {'Yes' if zip_path else 'No'}", "info")
+            return {"excel_path": excel_path, "excel_name": excel_name, "zip_path": zip_path, "zip_name": zip_name}
         else: add_log(f"Auto-Scrape: No output files (Excel/ZIP) generated for case '{case_id_for_log}'.", "warning"); return None
     except Exception as e: add_log(f"Auto-Scrape: CRITICAL ERROR for case '{case_id_for_log}', URL '{url_to_scrape}': {e}", "error"); traceback.print_exc(); return None
 
-# --- PDF Processing Functions ---
-def extract_text_and_images_from_pdf(pdf_file_bytes, pdf_name):
-    """Extracts text blocks and images from a PDF file."""
-    global ffmpeg_path_global 
-    extracted_items = []
-    extracted_images_paths = []
-    doc = None
-    _internal_pdf_item_counter = 1 
-
-    try:
-        doc = fitz.open(stream=pdf_file_bytes, filetype="pdf")
-        add_log(f"PDF '{pdf_name}': Opened with {doc.page_count} pages.", "info")
-
-        for page_num in range(len(doc)):
-            page = doc.load_page(page_num)
-            
-            blocks = page.get_text("blocks") 
-            for i, block in enumerate(blocks):
-                if block[6] == 0: 
-                    text = block[4].replace("\n", " ").strip()
-                    text = re.sub(r'\s+', ' ', text) 
-                    if len(text) > 5: 
-                        lines = block[4].strip().split('\n')
-                        item_name_scraped = lines[0].strip()
-                        item_desc = " ".join(lines[1:]).strip() if len(lines) > 1 else ""
-                        
-                        id_for_excel = item_name_scraped if item_name_scraped else f"PDF_{sanitize_filename(pdf_name)}_Item_{_internal_pdf_item_counter}"
-
-                        price_match = re.search(r'(\€|\$|R\$|£|zł|GHS)?\s*(\d+([.,]\d{1,2})?)', text, re.IGNORECASE) 
-                        item_price = price_match.group(0).strip() if price_match else "N/A"
-                        if price_match and item_name_scraped.endswith(item_price): item_name_scraped = item_name_scraped[:-len(item_price)].strip()
-                        if price_match and item_desc.startswith(item_price): item_desc = item_desc[len(item_price):].strip()
-
-                        extracted_items.append({
-                            "ID": id_for_excel, 
-                            "name in pt-PT": item_name_scraped, 
-                            "Description in pt-PT": item_desc, 
-                            "Price": item_price,
-                            "Category": "PDF Extracted", 
-                            "image_url": None, 
-                            "image_filename": None 
-                        })
-                        _internal_pdf_item_counter +=1
-            
-            image_list = page.get_images(full=True)
-            for img_index, img in enumerate(image_list):
-                xref = img[0]
-                try:
-                    base_image = doc.extract_image(xref)
-                    if not base_image: continue 
-                    image_bytes = base_image["image"]
-                except Exception as e_img_extract:
-                    add_log(f"PDF '{pdf_name}': Error extracting image xref {xref} on page {page_num + 1}: {e_img_extract}", "warning")
-                    continue
-
-                sanitized_pdf_name = sanitize_filename(os.path.splitext(pdf_name)[0])
-                img_filename_base = f"pdf_{sanitized_pdf_name}_p{page_num + 1}_img{img_index}"
-                
-                if not os.path.exists(PDF_IMAGES_OUTPUT_FOLDER):
-                    os.makedirs(PDF_IMAGES_OUTPUT_FOLDER)
-                
-                processed_image_path = process_single_image(image_bytes, img_filename_base, PDF_IMAGES_OUTPUT_FOLDER, ffmpeg_path_global)
-                
-                if processed_image_path:
-                    extracted_images_paths.append(processed_image_path)
-                    if not any(item.get("image_filename") == os.path.basename(processed_image_path) for item in extracted_items):
-                        extracted_items.append({
-                            "ID": f"PDF_Image_{_internal_pdf_item_counter}", 
-                            "name in pt-PT": f"Image: {os.path.basename(processed_image_path)}",
-                            "Description in pt-PT": f"Extracted from page {page_num + 1} of {pdf_name}",
-                            "Price": "N/A", "Category": "PDF Image", "image_url": None,
-                            "image_filename": os.path.basename(processed_image_path)
-                        })
-                        _internal_pdf_item_counter +=1
-        add_log(f"PDF '{pdf_name}': Extracted {len(extracted_items)} items (text/image placeholders) and processed {len(extracted_images_paths)} images.", "info")
-    except Exception as e: add_log(f"Error processing PDF '{pdf_name}': {e}", "error"); traceback.print_exc()
-    finally:
-        if doc: doc.close()
-    return extracted_items, extracted_images_paths
+# Auto-scrapes run here so the claimer thread goes straight back to scanning; the active-cases callback collects results
+CASE_SCRAPE_WORKERS = 2
+case_scrape_executor = ThreadPoolExecutor(max_workers=CASE_SCRAPE_WORKERS, thread_name_prefix="CaseScrape")
+case_scrape_futures = {} # display_id -> Future of scrape_and_prepare_case_files; the case dict only carries "scrape_pending" (stores must stay JSON)
+
+def collect_case_scrape_result(case):
+    """Moves a finished background scrape into case["scraped_files_data"]. Returns True if the case dict changed."""
+    if not case or not case.get("scrape_pending"): return False
+    case_id = case.get("display_id")
+    future = case_scrape_futures.get(case_id)
+    if future is not None and not future.done(): return False
+    case_scrape_futures.pop(case_id, None)
+    scraped_data = None
+    if future is not None:
+        try: scraped_data = future.result()
+        except Exception as e_scrape: add_log(f"Auto-Scrape: Background scrape for case {case_id} raised: {e_scrape}", "error")
+    case["scraped_files_data"] = scraped_data; case["scrape_pending"] = False
+    if scraped_data: add_log(f"Auto-Scrape: Successfully prepared files for case {case_id}.", "success")
+    else: add_log(f"Auto-Scrape: Failed to prepare files for case {case_id}.", "warning")
+    return True
+
+# --- PDF Processing Functions --- (extract_text_and_images_from_pdf lives in menu_workers)
+PDF_PROCESS_POOL_MIN_FILES = 2 # A single PDF runs in-process (no worker start-up cost)
 
 def process_extracted_pdf_data(uploaded_pdf_files, selected_country_pdf): 
-    """Processes multiple uploaded PDF files and prepares data for Excel/ZIP."""
+    """Processes multiple uploaded PDF files, given as (path, filename) pairs, and prepares data for Excel/ZIP."""
     all_pdf_items_data = []
     all_pdf_image_paths = []
     if not uploaded_pdf_files: add_log("No PDF files uploaded for processing.", "warning"); return pd.DataFrame(), []
     total_files = len(uploaded_pdf_files)
-    
-    for i, uploaded_file in enumerate(uploaded_pdf_files):
-        pdf_name = uploaded_file.name
+    pending_pdfs = dict(enumerate(uploaded_pdf_files))
+    results_by_index = {}
+
+    if total_files >= PDF_PROCESS_POOL_MIN_FILES:
+        process_pool = None
+        try:
+            process_pool = get_worker_process_pool()
+            future_to_index = {process_pool.submit(extract_text_and_images_from_pdf, pdf_path, pdf_name, PDF_IMAGES_OUTPUT_FOLDER, get_ffmpeg_path()): i for i, (pdf_path, pdf_name) in pending_pdfs.items()}
+            add_log(f"[PDF] Processing {total_files} files in parallel...", "info")
+            for future in as_completed(future_to_index):
+                i = future_to_index[future]; results_by_index[i] = future.result(); pdf_name = pending_pdfs.pop(i)[1]
+                add_worker_log(results_by_index[i][2])
+                add_log(f"[PDF] Finished {len(results_by_index)}/{total_files}: {pdf_name} ({len(results_by_index[i][0])} items, {len(results_by_index[i][1])} images)", "info")
+        except (BrokenProcessPool, OSError) as e_pool:
+            discard_worker_process_pool(process_pool)
+            add_log(f"PDF process pool unavailable ({type(e_pool).__name__}); processing the remaining PDFs here.", "warning")
+    for i, (pdf_path, pdf_name) in pending_pdfs.items(): # small batches, or whatever a broken pool left over
         add_log(f"[PDF] Processing {i+1}/{total_files}: {pdf_name}", "info") 
-        pdf_bytes = uploaded_file.getvalue()
-        items, image_paths = extract_text_and_images_from_pdf(pdf_bytes, pdf_name)
+        results_by_index[i] = extract_text_and_images_from_pdf(pdf_path, pdf_name, PDF_IMAGES_OUTPUT_FOLDER, get_ffmpeg_path())
+        add_worker_log(results_by_index[i][2])
+    for i in range(total_files): # upload order, however the files finished
+        items, image_paths, _ = results_by_index[i]
         all_pdf_items_data.extend(items); all_pdf_image_paths.extend(image_paths) 
         
     add_log("PDF processing finished.", "info") 
 
     if not all_pdf_items_data: add_log("No items extracted from any PDF.", "warning"); return pd.DataFrame(), []
-    df_pdf_processed = pd.DataFrame(all_pdf_items_data)
-    cols_needed = ['ID', 'image_filename', 'Category', 'Price', 'name in pt-PT', 'Description in pt-PT', 'image_url']
-    for col in cols_needed:
-        if col not in df_pdf_processed.columns: df_pdf_processed[col] = pd.NA
+    df_pdf_processed = pd.DataFrame.from_records(all_pdf_items_data, columns=MENU_ITEM_COLUMNS) # MenuItem tuples: positional, no per-row key lookups
     return df_pdf_processed, all_pdf_image_paths
 
 # (This code starts with initialize_claimer_driver and ends after run_claimer_loop)
@@ -1118,8 +1588,7 @@ def initialize_claimer_driver():
     add_log("!!! ENSURE CHROME IS COMPLETELY CLOSED BEFORE STARTING CLAIMER !!!", "warning")
     
     try:
-        driver_path = ChromeDriverManager().install() 
-        add_log(f"Claimer ChromeDriver installed/found by webdriver-manager at: {driver_path}", "info")
+        driver_path = get_chromedriver_path()
         service = Service(executable_path=driver_path, log_output=log_output_selenium, service_args=service_args_selenium)
         driver = webdriver.Chrome(service=service, options=options)
         driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
@@ -1135,6 +1604,40 @@ def initialize_claimer_driver():
         add_log(f"ERROR initializing Claimer WebDriver (Non-WebDriverException): {e}", "error")
         return None
 
+claimer_driver_instance = None
+claimer_driver_lock = threading.Lock()
+
+def get_claimer_driver():
+    """Returns the claimer driver kept from the previous Start/Stop if it still responds, otherwise initialize_claimer_driver()."""
+    global claimer_driver_instance
+    with claimer_driver_lock:
+        if claimer_driver_instance is not None:
+            try:
+                claimer_driver_instance.current_url
+                add_log("Claimer: Reusing the WebDriver kept from the previous run.", "info")
+                return claimer_driver_instance
+            except WebDriverException as e_dead:
+                add_log(f"Claimer WebDriver no longer responsive, recreating: {type(e_dead).__name__}", "warning")
+                try: claimer_driver_instance.quit()
+                except Exception: pass
+                claimer_driver_instance = None
+        claimer_driver_instance = initialize_claimer_driver()
+        return claimer_driver_instance
+
+def release_claimer_driver(driver, keep_alive=True):
+    """Called when the claimer thread stops: the driver stays open for the next Start unless keep_alive is False (driver failed), then it is quit."""
+    global claimer_driver_instance
+    if driver is None or keep_alive: return
+    with claimer_driver_lock:
+        if claimer_driver_instance is driver: claimer_driver_instance = None
+    try: driver.quit()
+    except Exception as qe: add_log(f"Claimer: Error quitting WebDriver: {qe}", "warning")
+
+def quit_claimer_driver():
+    release_claimer_driver(claimer_driver_instance, keep_alive=False)
+
+atexit.register(quit_claimer_driver)
+
 # --- Case Claimer: Login Status Check ---
 def check_claimer_login_status(driver):
     """Checks if the user is logged into AppSheet."""
@@ -1157,24 +1660,21 @@ def check_claimer_login_status(driver):
         add_log("Claimer: Initial navigation to AppSheet URL complete. Waiting for page body (10s)...", "debug")
         WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
         
-        add_log("Claimer: Page body present. Waiting for AppSheet to potentially settle (additional 10s sleep)...", "debug")
-        time.sleep(10)
+        wait_for_app_element_timeout = 90 
+        # Polls (every 0.5s) until the app is up or the page has redirected away (e.g. to a login page), instead of a fixed settle sleep
+        add_log(f"Claimer: Waiting for the app loaded indicator or a redirect (up to {wait_for_app_element_timeout}s)... XPath: {LOC_APP_LOADED[1]}", "debug")
+        WebDriverWait(driver, wait_for_app_element_timeout).until(EC.any_of(
+            EC.visibility_of_element_located(LOC_APP_LOADED),
+            lambda d: "appsheet.com" not in d.current_url.lower()
+        ))
 
         current_url_after_get = driver.current_url
-        add_log(f"Claimer: Current URL after get and sleep: {current_url_after_get}", "debug")
+        add_log(f"Claimer: Current URL after app wait: {current_url_after_get}", "debug")
 
         if "appsheet.com" not in current_url_after_get.lower():
             claimer_status_message = f"Claimer: Redirected to unexpected URL: {current_url_after_get}. Login likely failed."
             add_log(claimer_status_message, "error")
             return False
-
-        wait_for_app_element_timeout = 90 
-        app_loaded_indicator_xpath = "//div[@data-testid='appname-and-viewname'] | //div[@title='All Pending Tasks'] | //div[contains(@class,'appsheet-container') and .//div[@role='table']]"
-        
-        add_log(f"Claimer: Attempting to find a reliable app loaded indicator (up to {wait_for_app_element_timeout}s)... XPath: {app_loaded_indicator_xpath}", "debug")
-        WebDriverWait(driver, wait_for_app_element_timeout).until(
-            EC.visibility_of_element_located((By.XPATH, app_loaded_indicator_xpath))
-        )
         add_log("Claimer: Reliable app loaded indicator found and visible.", "debug")
         
         add_log("Claimer: Basic login check passed.", "success")
@@ -1202,25 +1702,74 @@ def check_claimer_login_status(driver):
         except: pass
 
 # --- Case Claimer: Core Scraper Logic (Updated for Auto-Scraping and Colleague Logging) ---
-def find_and_claim_cases(driver, data_q: queue.Queue, stop_event: threading.Event):
-    global active_portugal_case_store, active_ghana_case_store, ffmpeg_path_global
+CLAIM_UI_POLL_SECONDS = 0.1 # Poll interval for claim-flow waits (WebDriverWait default is 0.5s)
+
+def wait_for_appsheet_rows(driver, timeout=15):
+    """After (re)loading APPSHEET_URL: returns True as soon as table rows are present, False (logged) on timeout. Replaces fixed sleeps."""
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=CLAIM_UI_POLL_SECONDS).until(EC.presence_of_element_located(LOC_APPSHEET_ROWS))
+        return True
+    except TimeoutException:
+        add_log(f"Claimer DEBUG: No AppSheet rows {timeout}s after loading the view.", "debug")
+        return False
+
+def close_case_detail_view(driver, timeout=2):
+    """Returns to the AppSheet grid from a case's slideshow view without reloading the app: Escape, then the close button,
+    and only if the grid is still not back after each, a full driver.get(APPSHEET_URL). Returns True once rows are showing."""
+    def grid_is_back(d):
+        return EC.invisibility_of_element_located(LOC_SIDEBAR_ACTION_BAR)(d) and EC.visibility_of_element_located(LOC_APPSHEET_ROWS)(d)
+    close_wait = WebDriverWait(driver, timeout, poll_frequency=CLAIM_UI_POLL_SECONDS)
+    try:
+        ActionChains(driver).send_keys(Keys.ESCAPE).perform()
+        close_wait.until(grid_is_back)
+        return True
+    except TimeoutException: pass
+    close_buttons = driver.find_elements(*LOC_SLIDESHOW_CLOSE)
+    if close_buttons:
+        try:
+            close_buttons[0].click()
+            close_wait.until(grid_is_back)
+            return True
+        except (TimeoutException, StaleElementReferenceException, ElementClickInterceptedException): pass
+    add_log(f"Claimer DEBUG: Case view did not close in-app within {timeout}s; reloading AppSheet URL.", "debug")
+    driver.get(APPSHEET_URL)
+    return wait_for_appsheet_rows(driver)
+
+def call_with_stale_retry(action, element, relocate, tries=2):
+    """Runs action(element); if the element went stale, re-locates it with relocate() and retries instead of giving up on the row."""
+    for attempt in range(tries):
+        try: return action(element)
+        except StaleElementReferenceException:
+            if attempt == tries - 1: raise
+            add_log("Claimer DEBUG: Element went stale during the claim flow; re-locating it.", "debug")
+            element = relocate()
+
+def post_claimer_message(message, claim_q=None):
+    """Claim results go to claim_q (default data_queue_claimer) and are never dropped; other statuses go to the bounded
+    claimer_status_queue, whose maxlen evicts the oldest entry when it is full."""
+    if message.get("claimed_case_data"): (claim_q if claim_q is not None else data_queue_claimer).append(message)
+    else: claimer_status_queue.append(message)
+    notify_ui_change('claimer')
+
+def find_and_claim_cases(driver, data_q: deque, stop_event: threading.Event):
+    global active_portugal_case_store, active_ghana_case_store
+
+    # Slot check first: nothing below (driver probe, waits, row scan) is needed when no case could be claimed
+    active_pt_case_exists, active_gh_case_exists = active_case_slots()
+    if active_pt_case_exists and active_gh_case_exists:
+        add_log("Claimer DEBUG: Both Portugal and Ghana slots are full. Skipping claim attempts for this cycle.", "debug")
+        return "OK_BOTH_SLOTS_FULL"
 
     if driver is None:
         add_log("Claimer CRITICAL: find_and_claim_cases called with driver=None.", "error")
-        data_q.put_nowait({"status": "DRIVER_DEAD_PRE_CHECK", "claimed_case_data": None})
+        post_claimer_message({"status": "DRIVER_DEAD_PRE_CHECK", "claimed_case_data": None}, data_q)
         return "DRIVER_DEAD_PRE_CHECK"
 
     claimed_case_details_to_return = None
     current_pass_status = "OK_NO_NEW_CLAIMABLE_SLOT_OR_CASE"
     wait = WebDriverWait(driver, 30)
-    detail_page_wait = WebDriverWait(driver, 30)
-
-    active_pt_case_exists = bool(active_portugal_case_store)
-    active_gh_case_exists = bool(active_ghana_case_store)
-
-    if active_pt_case_exists and active_gh_case_exists:
-        add_log("Claimer DEBUG: Both Portugal and Ghana slots are full. Skipping claim attempts for this cycle.", "debug")
-        return "OK_BOTH_SLOTS_FULL"
+    detail_page_wait = WebDriverWait(driver, 30, poll_frequency=CLAIM_UI_POLL_SECONDS)
+    fast_wait = WebDriverWait(driver, 10, poll_frequency=CLAIM_UI_POLL_SECONDS) # In-page row/button waits
 
     try:
         try:
@@ -1234,16 +1783,10 @@ def find_and_claim_cases(driver, data_q: queue.Queue, stop_event: threading.Even
 
         all_rows_list = []
         if current_pass_status not in ["DRIVER_DEAD", "STOPPED", "DRIVER_DEAD_RESP_CHECK"]:
-            all_rows_xpath = "//span[@data-testid='table-view-row' and contains(@class, 'TableViewRow')]"
             try:
-                add_log(f"Claimer: Actively waiting up to {wait._timeout}s for rows with XPath: {all_rows_xpath}", "debug")
-                time.sleep(3)
-
-                WebDriverWait(driver, wait._timeout).until(
-                    EC.presence_of_all_elements_located((By.XPATH, all_rows_xpath))
-                )
-                time.sleep(2)
-                all_rows_list = driver.find_elements(By.XPATH, all_rows_xpath)
+                add_log(f"Claimer: Actively waiting up to {wait._timeout}s for rows with CSS: {APPSHEET_ROW_CSS}", "debug")
+                WebDriverWait(driver, wait._timeout, poll_frequency=CLAIM_UI_POLL_SECONDS).until(EC.presence_of_all_elements_located(LOC_APPSHEET_ROWS)) # scanned as soon as rows exist; a timeout keeps the page dump below
+                all_rows_list = scan_appsheet_rows(driver, ROW_SCAN_FIELDS) # Elements + every needed column for all rows, one round-trip
 
                 if not all_rows_list:
                     add_log("Claimer INFO: No rows found on page after explicit wait. (AppSheet view might be empty, filtered, or not fully loaded).", "info")
@@ -1276,67 +1819,30 @@ def find_and_claim_cases(driver, data_q: queue.Queue, stop_event: threading.Even
 
         if current_pass_status not in possible_early_exit_statuses and all_rows_list:
             add_log(f"Claimer INFO: Starting to scan {len(all_rows_list)} found rows for details.", "info")
-            for i in range(len(all_rows_list)):
+            for i, (listed_row_element, row_fields, row_id_attr_val) in enumerate(all_rows_list):
                 if stop_event.is_set():
                     add_log("Claimer DEBUG: Stop event detected during row processing loop.", "debug")
                     current_pass_status = "STOPPED"; break
-
-                row_element_to_process = None
+                # Slots are re-read per row (Finish/claims handled by the UI thread can change them mid-pass); no DOM work once both are taken
+                active_pt_case_exists, active_gh_case_exists = active_case_slots()
+                if active_pt_case_exists and active_gh_case_exists:
+                    add_log("Claimer DEBUG: Both slots became full during the row scan. Stopping the scan.", "debug")
+                    current_pass_status = "OK_BOTH_SLOTS_FULL"; break
+
+                row_element_to_process = listed_row_element # returned by scan_appsheet_rows; only re-located by XPath if it goes stale
+                row_scan_time = datetime.now() # One clock read per row for the claim and colleague-log timestamps
                 display_id_for_log_temp = f"Row_Index_{i+1}"
 
                 try:
-                    current_row_xpath = f"({all_rows_xpath})[{i+1}]"
-                    add_log(f"Claimer DEBUG: Attempting to locate row with XPath: {current_row_xpath}", "debug")
-                    row_element_to_process = WebDriverWait(driver, 7).until(
-                        EC.presence_of_element_located((By.XPATH, current_row_xpath))
-                    )
-
-                    add_log(f"Claimer DEBUG: Attempting to scroll and check visibility for Row Element ID: {row_element_to_process.id}", "debug")
-                    is_row_visible_and_interactable = False
-                    for attempt in range(2):
-                        try:
-                            driver.execute_script("arguments[0].scrollIntoView({behavior: 'auto', block: 'center', inline: 'nearest'});", row_element_to_process)
-                            time.sleep(0.75 + (attempt * 0.5))
-
-                            if row_element_to_process.is_displayed():
-                                try:
-                                    key_child_xpath = ".//div[@data-testonly-column='Main Task ID']//span[@data-testid='text-type-display-span']"
-                                    key_child = WebDriverWait(row_element_to_process, 1).until(
-                                        EC.visibility_of_element_located((By.XPATH, key_child_xpath))
-                                    )
-                                    if key_child.is_displayed():
-                                        is_row_visible_and_interactable = True
-                                        add_log(f"Claimer DEBUG: Row Element ID {row_element_to_process.id} and key child are displayed.", "debug")
-                                        break
-                                except TimeoutException:
-                                    add_log(f"Claimer DEBUG: Row Element ID {row_element_to_process.id} - key child NOT found/visible. Main row .is_displayed() was {row_element_to_process.is_displayed()}", "debug")
-                                    if row_element_to_process.is_displayed():
-                                        is_row_visible_and_interactable = True
-                                        break
-                            else:
-                                add_log(f"Claimer DEBUG: Row Element ID {row_element_to_process.id} .is_displayed() is False on attempt {attempt+1}.", "debug")
-                        except StaleElementReferenceException:
-                            add_log(f"Claimer WARNING: Row Element ID {row_element_to_process.id if row_element_to_process else 'Unknown'} became stale during scroll/visibility check. Re-fetching for next attempt or skipping.", "warning")
-                            if attempt < 1:
-                                row_element_to_process = WebDriverWait(driver, 5).until(EC.presence_of_element_located((By.XPATH, current_row_xpath)))
-                                continue
-                            else: break
-                        except Exception as e_scroll_vis:
-                            add_log(f"Claimer DEBUG: Error during scroll/visibility check for Row Element ID {row_element_to_process.id if row_element_to_process else 'Unknown'} (attempt {attempt+1}): {e_scroll_vis}", "debug")
-                            if attempt == 1: break
-
-                    if not is_row_visible_and_interactable:
-                        add_log(f"Claimer DEBUG: Row ID '{display_id_for_log_temp}' (Element ID: {row_element_to_process.id if row_element_to_process else 'N/A'}) ultimately considered NOT VISIBLE or interactable, skipping.", "debug")
-                        continue
-
-                    main_task_id_val = extract_field_data(row_element_to_process, "Main Task ID", default_value="")
-                    row_id_attr_val = row_element_to_process.get_attribute("id")
+                    main_task_id_val = row_fields["Main Task ID"]
                     display_id = main_task_id_val if main_task_id_val else (row_id_attr_val if row_id_attr_val else f"Row_Index_{i+1}_NoID")
                     display_id_for_log_temp = display_id
 
-                    status = extract_field_data(row_element_to_process, "Status", default_value="Status Not Specified")
-                    country_from_row = extract_field_data(row_element_to_process, "Country", default_value="Country Not Specified")
-                    user_email_on_row = extract_field_data(row_element_to_process, "Useremail", span_sub_xpath="//span[@data-testid='email-type-display-span']", default_value="N/A")
+                    status = row_fields["Status"]
+                    country_from_row = row_fields["Country"]
+                    user_email_on_row = row_fields["Useremail"]
+                    # Shared by the claim branch and the colleague log below; read for all rows by scan_appsheet_rows
+                    account_name = row_fields["Account Name"]; case_title = row_fields["Case Title"]; menu_link = row_fields["Menu link"]
 
                     add_log(f"Claimer Row Scan: Index {i+1}, ID='{display_id}', Country='{country_from_row}', Status='{status}', User='{user_email_on_row}' (Row Element ID: {row_element_to_process.id})", "info")
 
@@ -1348,34 +1854,65 @@ def find_and_claim_cases(driver, data_q: queue.Queue, stop_event: threading.Even
 
                     if claim_this_case_for_country_slot:
                         add_log(f"Claimer: Potential claim for {claim_this_case_for_country_slot}: ID '{display_id}'. Attempting...", "info")
+                        # Only the row about to be clicked is scrolled into view and checked
+                        current_row_xpath = f"({APPSHEET_ROW_XPATH})[{i+1}]"
 
-                        account_name = extract_field_data(row_element_to_process, "Account Name", default_value="N/A")
-                        case_title = extract_field_data(row_element_to_process, "Case Title", default_value="N/A")
-                        menu_link = extract_field_data(row_element_to_process, "Menu link", span_sub_xpath="//span[contains(@class, 'UrlTypeDisplay__text')]", default_value="N/A")
-                        dish_photos_link = extract_field_data(row_element_to_process, "Dish Photos Link", span_sub_xpath="//span[contains(@class, 'UrlTypeDisplay__text')]", default_value="N/A")
-                        menu_instructions = extract_field_data(row_element_to_process, "Menu instructions", default_value="N/A")
-                        request_sent_date = extract_field_data(row_element_to_process, "Menu Request Sent Date", span_sub_xpath="//span[@data-testid='date-time-type-display-span']", default_value="N/A")
-                        created_by = extract_field_data(row_element_to_process, "Created By", default_value="N/A")
-
-                        try:
-                            clickable_target = WebDriverWait(row_element_to_process, 10).until(
-                                EC.element_to_be_clickable(row_element_to_process)
-                            )
+                        add_log(f"Claimer DEBUG: Attempting to scroll and check visibility for Row Element ID: {row_element_to_process.id}", "debug")
+                        # Fast path: scroll + visibility + key-child check in one round-trip, no sleeps; the retry loop below only runs if it fails
+                        is_row_visible_and_interactable = bool(driver.execute_script(ROW_SCROLL_AND_CHECK_JS, row_element_to_process, MAIN_TASK_ID_SPAN_CSS))
+                        for attempt in range(0 if is_row_visible_and_interactable else 2):
                             try:
-                                clickable_target.click()
-                            except ElementClickInterceptedException:
-                                add_log(f"Claimer DEBUG: Direct click intercepted for {display_id}. Trying JS click.", "debug")
-                                driver.execute_script("arguments[0].click();", clickable_target)
+                                driver.execute_script("arguments[0].scrollIntoView({behavior: 'auto', block: 'center', inline: 'nearest'});", row_element_to_process)
+                                time.sleep(0.75 + (attempt * 0.5))
+
+                                if row_element_to_process.is_displayed():
+                                    try:
+                                        key_child = WebDriverWait(row_element_to_process, 1, poll_frequency=CLAIM_UI_POLL_SECONDS).until(
+                                            EC.visibility_of_element_located(LOC_MAIN_TASK_ID_SPAN)
+                                        )
+                                        if key_child.is_displayed():
+                                            is_row_visible_and_interactable = True
+                                            add_log(f"Claimer DEBUG: Row Element ID {row_element_to_process.id} and key child are displayed.", "debug")
+                                            break
+                                    except TimeoutException:
+                                        add_log(f"Claimer DEBUG: Row Element ID {row_element_to_process.id} - key child NOT found/visible. Main row .is_displayed() was {row_element_to_process.is_displayed()}", "debug")
+                                        if row_element_to_process.is_displayed():
+                                            is_row_visible_and_interactable = True
+                                            break
+                                else:
+                                    add_log(f"Claimer DEBUG: Row Element ID {row_element_to_process.id} .is_displayed() is False on attempt {attempt+1}.", "debug")
+                            except StaleElementReferenceException:
+                                add_log(f"Claimer WARNING: Row Element ID {row_element_to_process.id if row_element_to_process else 'Unknown'} became stale during scroll/visibility check. Re-fetching for next attempt or skipping.", "warning")
+                                if attempt < 1:
+                                    row_element_to_process = fast_wait.until(EC.presence_of_element_located((By.XPATH, current_row_xpath)))
+                                    continue
+                                else: break
+                            except Exception as e_scroll_vis:
+                                add_log(f"Claimer DEBUG: Error during scroll/visibility check for Row Element ID {row_element_to_process.id if row_element_to_process else 'Unknown'} (attempt {attempt+1}): {e_scroll_vis}", "debug")
+                                if attempt == 1: break
+
+                        if not is_row_visible_and_interactable:
+                            add_log(f"Claimer DEBUG: Row ID '{display_id_for_log_temp}' (Element ID: {row_element_to_process.id if row_element_to_process else 'N/A'}) ultimately considered NOT VISIBLE or interactable, skipping.", "debug")
+                            continue
+
+                        dish_photos_link = row_fields["Dish Photos Link"]
+                        menu_instructions = row_fields["Menu instructions"]; request_sent_date = row_fields["Menu Request Sent Date"]
+                        created_by = row_fields["Created By"]
 
-                            time.sleep(5)
+                        try:
+                            # Stale row: re-hydrate by its id attribute (or its index when it has none) and retry the click, keeping this row's data
+                            relocate_row = ((lambda: driver.find_element(By.ID, row_id_attr_val)) if row_id_attr_val
+                                            else (lambda: fast_wait.until(EC.presence_of_element_located((By.XPATH, f"({APPSHEET_ROW_XPATH})[{i+1}]")))))
+                            call_with_stale_retry(lambda row_el: driver.execute_script(SCROLL_AND_CLICK_JS, row_el), row_element_to_process, relocate_row)
 
-                            sidebar_action_bar_xpath = "//div[contains(@class, 'SlideshowPage__action-bar')]"
-                            detail_page_wait.until(EC.visibility_of_element_located((By.XPATH, sidebar_action_bar_xpath)))
-                            start_task_button_xpath = "//span[@data-testonly-action='Start Task' and @data-testid='Start Task' and contains(@class, 'GenericActionButton')]"
-                            start_task_button = detail_page_wait.until(EC.element_to_be_clickable((By.XPATH, start_task_button_xpath)))
+                            # detail_page_wait polls for the sidebar, so no fixed settle sleep after the click
+                            detail_page_wait.until(EC.visibility_of_element_located(LOC_SIDEBAR_ACTION_BAR))
+                            start_task_button = detail_page_wait.until(EC.element_to_be_clickable(LOC_START_TASK_BUTTON))
 
-                            ActionChains(driver).move_to_element(start_task_button).click().perform()
-                            time.sleep(7)
+                            call_with_stale_retry(lambda button: ActionChains(driver).move_to_element(button).click().perform(),
+                                                  start_task_button, lambda: detail_page_wait.until(EC.element_to_be_clickable(LOC_START_TASK_BUTTON)))
+                            try: WebDriverWait(driver, 15, poll_frequency=CLAIM_UI_POLL_SECONDS).until(EC.invisibility_of_element_located(LOC_START_TASK_BUTTON))
+                            except TimeoutException: add_log(f"Claimer DEBUG: Start Task button still shown 15s after clicking it for {display_id}; continuing.", "debug")
 
                             claimed_case_details_to_return = {
                                 "display_id": display_id, "row_id_attr": row_id_attr_val, "user_email": user_email_on_row,
@@ -1384,48 +1921,39 @@ def find_and_claim_cases(driver, data_q: queue.Queue, stop_event: threading.Even
                                 "country": claim_this_case_for_country_slot,
                                 "status": f"In Progress (Claimed by Bot for {claim_this_case_for_country_slot})",
                                 "menu_instructions": menu_instructions, "request_sent_date": request_sent_date,
-                                "created_by": created_by, "claimed_time": time.strftime("%Y-%m-%d %H:%M:%S"),
+                                "created_by": created_by, "claimed_time": row_scan_time.strftime("%Y-%m-%d %H:%M:%S"),
                                 "scraped_files_data": None
                             }
                             add_log(f"Claimer SUCCESS: Case '{display_id}' for {claim_this_case_for_country_slot} presumed claimed.", "success")
                             current_pass_status = f"CLAIM_SUCCESS_{claim_this_case_for_country_slot.upper()}"
 
-                            url_to_scrape_for_case = None
-                            compatible_domains = ["glovoapp.com", "ubereats.com", "wolt.com", "foodora.cz"]
-                            if menu_link and menu_link != "N/A" and any(kw in menu_link.lower() for kw in compatible_domains):
-                                url_to_scrape_for_case = menu_link
-                            elif dish_photos_link and dish_photos_link != "N/A" and any(kw in dish_photos_link.lower() for kw in compatible_domains):
-                                url_to_scrape_for_case = dish_photos_link
+                            url_to_scrape_for_case = pick_scrape_url(menu_link, dish_photos_link)
 
                             if url_to_scrape_for_case:
                                 add_log(f"Auto-Scrape: Identified compatible link for case {display_id}: {url_to_scrape_for_case}", "info")
-                                scraped_data = scrape_and_prepare_case_files(url_to_scrape_for_case, claim_this_case_for_country_slot, display_id)
-                                if scraped_data:
-                                    claimed_case_details_to_return["scraped_files_data"] = scraped_data
-                                    add_log(f"Auto-Scrape: Successfully prepared files for case {display_id}.", "success")
-                                else:
-                                    add_log(f"Auto-Scrape: Failed to prepare files for case {display_id}.", "warning")
+                                case_scrape_futures[display_id] = case_scrape_executor.submit(scrape_and_prepare_case_files, url_to_scrape_for_case, claim_this_case_for_country_slot, display_id)
+                                case_scrape_futures[display_id].add_done_callback(lambda _: notify_ui_change('claimer')) # card swaps "preparing" for the downloads
+                                claimed_case_details_to_return["scrape_pending"] = True
                             else:
                                 add_log(f"Auto-Scrape: No compatible (Glovo/Uber/Wolt/Foodora) menu/photo link found for case {display_id}.", "info")
 
-                            add_log(f"Claimer: Navigating back to AppSheet URL: {APPSHEET_URL} after claim.", "info")
-                            driver.get(APPSHEET_URL)
-                            time.sleep(5)
+                            add_log("Claimer: Returning to the AppSheet grid after claim.", "info")
+                            close_case_detail_view(driver)
                             break # Exit row loop after successful claim
 
                         except WebDriverException as e_wd_claim:
                             add_log(f"Claimer CRITICAL: WebDriverException during claim process for '{display_id}' ({claim_this_case_for_country_slot}): {e_wd_claim}", "error")
                             traceback.print_exc()
                             current_pass_status = "DRIVER_DEAD_CLAIM_PROC"
-                            try: driver.get(APPSHEET_URL); time.sleep(3)
+                            try: driver.get(APPSHEET_URL); wait_for_appsheet_rows(driver)
                             except: add_log("Claimer: Also failed to navigate back after WebDriverException during claim.", "error")
                             break
                         except Exception as claim_err:
                             add_log(f"Claimer ERROR: Unexpected error during claim attempt for '{display_id}' ({claim_this_case_for_country_slot}): {claim_err}", "error")
                             traceback.print_exc()
                             try:
-                                add_log("Claimer: Attempting to navigate back to AppSheet URL after claim error.", "info")
-                                driver.get(APPSHEET_URL); time.sleep(3)
+                                add_log("Claimer: Attempting to return to the AppSheet grid after claim error.", "info")
+                                close_case_detail_view(driver)
                             except WebDriverException as e_wd_nav_back:
                                 add_log(f"Claimer CRITICAL: WebDriver error navigating back after failed claim: {e_wd_nav_back}", "error")
                                 current_pass_status = "DRIVER_DEAD_NAV_BACK_FAIL" ; break
@@ -1433,15 +1961,14 @@ def find_and_claim_cases(driver, data_q: queue.Queue, stop_event: threading.Even
                                 add_log(f"Claimer ERROR navigating back (other): {e_nav_other}", "error")
 
                     # Logging colleague activity
-                    bot_email_identifier = "BOT_CLAIMED"
                     # Ensure status variable is lowercased for comparison if AppSheet status can vary in case
                     current_row_status_lower = status.lower() if isinstance(status, str) else ""
-                    if user_email_on_row and user_email_on_row != "N/A" and not (bot_email_identifier.lower() in user_email_on_row.lower()):
-                        if current_row_status_lower in ["inprogress", "escalated", "completed"]:
+                    if current_row_status_lower in COLLEAGUE_LOG_STATUSES and user_email_on_row and user_email_on_row != "N/A":
+                        if BOT_ASSIGNED_USER_LOWER not in user_email_on_row.lower():
                             # Corrected colleague_log_entry dictionary
                             colleague_log_entry = {
-                                'Date': datetime.now().strftime('%Y-%m-%d'),
-                                'Observed Timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                                'Date': row_scan_time.strftime('%Y-%m-%d'),
+                                'Observed Timestamp': row_scan_time.strftime('%Y-%m-%d %H:%M:%S'),
                                 'Claimed Timestamp': pd.NA,
                                 'Finished Timestamp': pd.NA,
                                 'Duration (seconds)': pd.NA,
@@ -1450,12 +1977,11 @@ def find_and_claim_cases(driver, data_q: queue.Queue, stop_event: threading.Even
                                 'Country': country_from_row, # Use already extracted country_from_row
                                 'Assigned User': user_email_on_row, # Use already extracted user_email_on_row
                                 'Status (Observed)': status, # Use already extracted status
-                                # Re-extract or use previously stored if concerned about staleness for these specific fields
-                                'Account Name': extract_field_data(row_element_to_process, "Account Name", default_value="N/A"),
-                                'Case Title': extract_field_data(row_element_to_process, "Case Title", default_value="N/A"),
-                                'Menu Link': extract_field_data(row_element_to_process, "Menu link", span_sub_xpath="//span[contains(@class, 'UrlTypeDisplay__text')]", default_value="N/A")
+                                'Account Name': account_name,
+                                'Case Title': case_title,
+                                'Menu Link': menu_link
                             }
-                            append_to_case_log(colleague_log_entry)
+                            colleague_log_q.put_nowait(colleague_log_entry) # Written in batches by colleague_log_writer_worker, off the claimer thread
 
                 except StaleElementReferenceException:
                     add_log(f"Claimer WARNING: Row at index {i+1} (last known ID: {display_id_for_log_temp}) became STALE before/during detail extraction. Skipping.", "warning"); continue
@@ -1481,39 +2007,52 @@ def find_and_claim_cases(driver, data_q: queue.Queue, stop_event: threading.Even
         traceback.print_exc()
         current_pass_status = "ERROR_UNKNOWN_FCC_OUTER"
 
+    if claimed_case_details_to_return:
+        # Mark the slot taken here rather than waiting for the UI to drain the queue, so the next pass never claims a second case for it
+        with active_case_stores_lock:
+            if claimed_case_details_to_return["country"] == "Portugal": active_portugal_case_store = claimed_case_details_to_return
+            else: active_ghana_case_store = claimed_case_details_to_return
+            mark_active_cases_changed()
+
     message_to_queue = {
         "status": current_pass_status,
         "claimed_case_data": claimed_case_details_to_return
     }
-    try:
-        data_q.put_nowait(message_to_queue)
-    except queue.Full:
-        add_log("Claimer WARNING: Data queue is full when trying to send find_and_claim_cases result.", "warning")
+    post_claimer_message(message_to_queue, data_q)
 
     return current_pass_status
 
 # --- Case Claimer: Main Loop for the Background Thread (Dash Context) ---
+CLAIMER_CRITICAL_STATUSES = frozenset({ # find_and_claim_cases results that stop the claimer thread
+    "DRIVER_DEAD_PRE_CHECK", "DRIVER_DEAD_RESP_CHECK", "DRIVER_DEAD_ROW_FIND",
+    "DRIVER_DEAD_ROW_PROC", "DRIVER_DEAD_CLAIM_PROC", "DRIVER_DEAD_NAV_BACK_FAIL",
+    "DRIVER_DEAD_OUTER_FCC", "EXCEPTION_CALLING_FCC", "ERROR_UNEXPECTED_FINDING_ROWS",
+    "ERROR_UNKNOWN_FCC_OUTER" # THREAD_OUTER_EXCEPTION is not here: it comes from run_claimer_loop's own handler
+})
+CLAIMER_STATUS_ERROR_KEYWORDS = ("ERROR", "FAILED", "CRITICAL", "STOP", "DEAD") # Routine status updates don't overwrite a message containing these
+
 def run_claimer_loop(stop_event_ref: threading.Event):
     global monitoring_active_flag, claimer_status_message, active_portugal_case_store, active_ghana_case_store, data_queue_claimer
 
     driver = None
+    driver_failed = False # Set when the driver is dead/unusable, so it is quit instead of kept for the next Start
     thread_name = threading.current_thread().name
     add_log(f"Claimer THREAD ({thread_name}): Starting execution.", "info")
 
     try:
         claimer_status_message = "Claimer: Initializing WebDriver..."
-        driver = initialize_claimer_driver()
+        driver = get_claimer_driver()
 
         if driver is None:
             add_log(f"Claimer THREAD ({thread_name}): WebDriver initialization failed (driver is None). Thread stopping.", "error")
-            data_queue_claimer.put_nowait({"status": "DRIVER_INIT_FAIL", "claimed_case_data": None})
+            post_claimer_message({"status": "DRIVER_INIT_FAIL", "claimed_case_data": None})
             monitoring_active_flag = False
             return
 
         login_successful = check_claimer_login_status(driver)
         if not login_successful:
             add_log(f"Claimer THREAD ({thread_name}): Login check failed. Thread stopping.", "error")
-            data_queue_claimer.put_nowait({"status": "LOGIN_FAIL", "claimed_case_data": None})
+            post_claimer_message({"status": "LOGIN_FAIL", "claimed_case_data": None})
             monitoring_active_flag = False
             return
 
@@ -1522,14 +2061,17 @@ def run_claimer_loop(stop_event_ref: threading.Event):
 
         while not stop_event_ref.is_set():
             loop_start_time = time.time()
+            # Checked once per cycle: the only reassignment before the guards below is to a message without these keywords
+            status_shows_error = any(err_kw in claimer_status_message.upper() for err_kw in CLAIMER_STATUS_ERROR_KEYWORDS)
 
-            pt_slot_free_at_loop_start = not bool(active_portugal_case_store)
-            gh_slot_free_at_loop_start = not bool(active_ghana_case_store)
+            pt_slot_taken, gh_slot_taken = active_case_slots()
+            pt_slot_free_at_loop_start = not pt_slot_taken
+            gh_slot_free_at_loop_start = not gh_slot_taken
             find_status_result = "INIT_LOOP_PASS"
 
+            current_timestamp_hm = time.strftime('%H:%M:%S') # One formatted time per cycle for every status message below
             if pt_slot_free_at_loop_start or gh_slot_free_at_loop_start:
-                current_timestamp_hm = time.strftime('%H:%M:%S')
-                if not any(err_kw in claimer_status_message.upper() for err_kw in ["ERROR", "FAILED", "CRITICAL", "STOP", "DEAD"]):
+                if not status_shows_error:
                     claimer_status_message = f"Claimer: Checking for cases (PT free: {pt_slot_free_at_loop_start}, GH free: {gh_slot_free_at_loop_start})... ({current_timestamp_hm})"
 
                 add_log(f"Claimer THREAD ({thread_name}): Calling find_and_claim_cases. PT_free={pt_slot_free_at_loop_start}, GH_free={gh_slot_free_at_loop_start}", "debug")
@@ -1542,14 +2084,8 @@ def run_claimer_loop(stop_event_ref: threading.Event):
                     find_status_result = "EXCEPTION_CALLING_FCC"
                     claimer_status_message = "Claimer Error: Uncaught exception from find_and_claim_cases. Check logs."
 
-                critical_statuses = [
-                    "DRIVER_DEAD_PRE_CHECK", "DRIVER_DEAD_RESP_CHECK", "DRIVER_DEAD_ROW_FIND",
-                    "DRIVER_DEAD_ROW_PROC", "DRIVER_DEAD_CLAIM_PROC", "DRIVER_DEAD_NAV_BACK_FAIL",
-                    "DRIVER_DEAD_OUTER_FCC", "EXCEPTION_CALLING_FCC", "ERROR_UNEXPECTED_FINDING_ROWS",
-                    "ERROR_UNKNOWN_FCC_OUTER" # Removed THREAD_OUTER_EXCEPTION as it's from this loop's handler
-                ]
-
-                if find_status_result in critical_statuses:
+                if find_status_result in CLAIMER_CRITICAL_STATUSES:
+                    driver_failed = True
                     claimer_status_message = f"Claimer CRITICAL: Fatal issue detected ({find_status_result}). Forcing stop."
                     add_log(f"Claimer THREAD ({thread_name}): {claimer_status_message}", "error")
                     stop_event_ref.set()
@@ -1559,17 +2095,21 @@ def run_claimer_loop(stop_event_ref: threading.Event):
                     claimed_country_from_status = find_status_result.split('_')[-1]
                     claimer_status_message = f"Claimer: Successfully processed claim for {claimed_country_from_status}."
                     add_log(f"Claimer THREAD ({thread_name}): {claimer_status_message}", "info")
+                    if not all(active_case_slots()):
+                        # One Chrome profile means one driver, so fill the other free slot with an immediate rescan instead of a later cycle
+                        add_log(f"Claimer THREAD ({thread_name}): Other slot still free after claiming {claimed_country_from_status}; rescanning now.", "debug")
+                        continue
                     add_log(f"Claimer THREAD ({thread_name}): Pausing for 3s after successful claim of {claimed_country_from_status} case.", "debug")
                     time.sleep(3)
                 elif find_status_result == "OK_BOTH_SLOTS_FULL":
-                     if not any(err_kw in claimer_status_message.upper() for err_kw in ["ERROR", "FAILED", "CRITICAL", "STOP", "DEAD"]):
+                     if not status_shows_error:
                         claimer_status_message = f"Claimer: Both PT & GH slots full. Waiting... ({current_timestamp_hm})"
                 else: # Handles OK_NO_ROWS_VISIBLE, OK_TIMEOUT_NO_ROWS, OK_NO_NEW_CLAIMABLE_SLOT_OR_CASE etc.
-                    if not any(err_kw in claimer_status_message.upper() for err_kw in ["ERROR", "FAILED", "CRITICAL", "STOP", "DEAD"]):
+                    if not status_shows_error:
                         claimer_status_message = f"Claimer: No new suitable case or slot. Status: {find_status_result}. ({current_timestamp_hm})"
             else:
-                if not any(err_kw in claimer_status_message.upper() for err_kw in ["ERROR", "FAILED", "CRITICAL", "STOP", "DEAD"]):
-                    claimer_status_message = f"Claimer: Both PT & GH slots full. Waiting... ({time.strftime('%H:%M:%S')})"
+                if not status_shows_error:
+                    claimer_status_message = f"Claimer: Both PT & GH slots full. Waiting... ({current_timestamp_hm})"
 
             if stop_event_ref.is_set():
                 add_log(f"Claimer THREAD ({thread_name}): Stop event detected before/during main loop wait. Breaking from while loop.", "debug"); break
@@ -1577,11 +2117,7 @@ def run_claimer_loop(stop_event_ref: threading.Event):
             loop_duration = time.time() - loop_start_time
             wait_time_seconds = max(0.1, 7.0 - loop_duration)
 
-            for _ in range(int(wait_time_seconds * 20)):
-                if stop_event_ref.is_set(): break
-                time.sleep(0.05)
-
-            if stop_event_ref.is_set():
+            if stop_event_ref.wait(timeout=wait_time_seconds): # returns True as soon as stop is requested, False on timeout
                 add_log(f"Claimer THREAD ({thread_name}): Stop event detected after inner wait. Breaking from while loop.", "debug"); break
 
         add_log(f"Claimer THREAD ({thread_name}): Exited main while loop. stop_event.is_set() = {stop_event_ref.is_set()}", "info")
@@ -1592,17 +2128,16 @@ def run_claimer_loop(stop_event_ref: threading.Event):
         claimer_status_message = f"Claimer THREAD ({thread_name}): Outer Critical Thread Error during execution. Check logs."
         add_log(f"Claimer THREAD ({thread_name}): {claimer_status_message} Details: {thread_err}", "error")
         traceback.print_exc()
+        driver_failed = True
         if stop_event_ref and not stop_event_ref.is_set():
             stop_event_ref.set()
-        try: data_queue_claimer.put_nowait({"status": "THREAD_OUTER_EXCEPTION", "claimed_case_data": None})
-        except queue.Full: add_log(f"Claimer THREAD ({thread_name}): Data queue full on THREAD_OUTER_EXCEPTION.", "warning")
+        post_claimer_message({"status": "THREAD_OUTER_EXCEPTION", "claimed_case_data": None})
 
     finally:
         add_log(f"Claimer THREAD ({thread_name}): Starting cleanup (finally block).", "info")
         if driver:
-            add_log(f"Claimer THREAD ({thread_name}): Attempting to quit WebDriver.", "info")
-            try: driver.quit()
-            except Exception as qe: add_log(f"Claimer THREAD ({thread_name}): Error quitting WebDriver in finally: {qe}", "warning")
+            add_log(f"Claimer THREAD ({thread_name}): {'Quitting' if driver_failed else 'Keeping'} WebDriver {'after failure' if driver_failed else 'open for the next Start'}.", "info")
+            release_claimer_driver(driver, keep_alive=not driver_failed)
 
         monitoring_active_flag = False
 
@@ -1633,9 +2168,40 @@ def run_claimer_loop(stop_event_ref: threading.Event):
 #  are already in place above this block.)
 
 # --- Dash App Initialization ---
-app = dash.Dash(__name__, suppress_callback_exceptions=True, prevent_initial_callbacks='initial_duplicate')
+app = dash.Dash(__name__, suppress_callback_exceptions=True, prevent_initial_callbacks='initial_duplicate', compress=flask_compress is not None)
 app.title = "Universal Operations Hub"
 
+UI_EVENTS_KEEPALIVE_SECONDS = 15
+UI_EVENTS_MIN_GAP_SECONDS = 0.5 # Coalesces bursts (e.g. many log lines) into one push
+
+@app.server.route('/ui-events')
+def ui_events_stream():
+    """Server-Sent Events: sends ui_change_versions whenever a counter changes, at most every UI_EVENTS_MIN_GAP_SECONDS."""
+    def stream():
+        last_sent_versions = None
+        while True:
+            with ui_change_condition:
+                ui_change_condition.wait_for(lambda: ui_change_versions != last_sent_versions, timeout=UI_EVENTS_KEEPALIVE_SECONDS)
+                current_versions = dict(ui_change_versions)
+            if current_versions != last_sent_versions:
+                last_sent_versions = current_versions
+                yield f"data: {json.dumps(current_versions)}\n\n"
+                time.sleep(UI_EVENTS_MIN_GAP_SECONDS)
+            else: yield ": keepalive\n\n"
+    return flask.Response(stream(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.server.route('/output-files/<file_token>')
+def serve_output_file(file_token):
+    """Streams a generated Excel/ZIP straight from disk; dcc.send_file would base64 the whole file into a callback response."""
+    file_path = os.path.join(OUTPUT_FILES_DIR, os.path.basename(file_token))
+    if not is_output_file(file_path): flask.abort(404)
+    return flask.send_file(file_path, as_attachment=True, download_name=flask.request.args.get('name') or os.path.basename(file_path))
+
+def output_file_url(path, download_name):
+    """Download link for a file from new_output_file_path (None when there is no such file), used as an html.A href."""
+    if not is_output_file(path): return None
+    return app.get_relative_path(f"/output-files/{os.path.basename(path)}") + '?' + urlencode({'name': download_name})
+
 # --- Dash App Layout ---
 # (Your existing style definitions: dark_theme_styles, input_style, button_style, etc. remain here)
 dark_theme_styles = {
@@ -1659,6 +2225,14 @@ button_style = {
     'cursor': 'pointer', 'borderRadius': '5px'
 }
 disabled_button_style = {**button_style, 'backgroundColor': '#555', 'cursor': 'not-allowed'}
+# Button style variants used by callbacks, built once here instead of re-merged on every invocation (treat as read-only)
+hidden_button_style = {**button_style, 'display': 'none'}
+visible_button_style = {**button_style, 'display': 'inline-block'}
+visible_button_style_spaced = {**button_style, 'display': 'inline-block', 'marginRight': '5px'}
+hidden_button_style_spaced = {**button_style, 'display': 'none', 'marginRight': '5px'}
+refresh_button_style = {**button_style, 'backgroundColor': '#007BFF', 'marginRight': '10px'}
+secondary_download_button_style = {**button_style, 'marginLeft': '5px'}
+finish_case_button_style = {**button_style, 'marginTop': '10px', 'backgroundColor': '#d9534f'}
 textarea_style = {
     'width': '100%',
     'backgroundColor': '#252526', 'color': '#E0E0E0',
@@ -1672,6 +2246,12 @@ section_style = {
     'padding': '15px', 'border': '1px solid #333',
     'borderRadius': '5px', 'margin':'10px', 'flex': '1'
 }
+upload_style = {
+    'width': '95%', 'height': '60px', 'lineHeight': '60px', 'borderWidth': '1px', 'borderStyle': 'dashed',
+    'borderRadius': '5px', 'textAlign': 'center', 'margin': '10px auto', 'color': '#aaa'
+}
+country_dropdown_style = {'marginBottom': '10px', 'color': '#333'}
+OUTPUT_COUNTRY_OPTIONS = [{'label': c, 'value': c} for c in ("Portugal", "Ghana", "Czechia")] # shared by the scraper and PDF dropdowns
 
 SIDEBAR_STYLE_VISIBLE = {
     'padding': '15px', 'borderRight': '1px solid #444',
@@ -1715,28 +2295,27 @@ app.layout = html.Div(style=dark_theme_styles, children=[
     dcc.Store(id='claimer-thread-status-store'),
     dcc.Store(id='active-pt-case-data-store', data={}),
     dcc.Store(id='active-gh-case-data-store', data={}),
-    dcc.Store(id='web-scraper-output-store', data={'timestamp': None, 'excel_bytes': None, 'excel_name': None, 'zip_bytes': None, 'zip_name': None}),
-    dcc.Store(id='local-image-output-store', data={'timestamp': None, 'zip_bytes': None, 'zip_name': None}),
-    dcc.Store(id='pdf-output-store', data={'timestamp': None, 'excel_bytes': None, 'excel_name': None, 'zip_bytes': None, 'zip_name': None}),
+    dcc.Store(id='web-scraper-output-store', data={'timestamp': None, 'excel_path': None, 'excel_name': None, 'excel_url': None, 'zip_path': None, 'zip_name': None, 'zip_url': None}),
+    dcc.Store(id='local-image-output-store', data={'timestamp': None, 'zip_path': None, 'zip_name': None, 'zip_url': None}),
+    dcc.Store(id='pdf-output-store', data={'timestamp': None, 'excel_path': None, 'excel_name': None, 'excel_url': None, 'zip_path': None, 'zip_name': None, 'zip_url': None}),
     dcc.Store(id='auto-scrape-pt-store', data={'timestamp': None}),
     dcc.Store(id='auto-scrape-gh-store', data={'timestamp': None}),
-    dcc.Store(id='sidebar-data-store', data={'timestamp': None, 'bot_log_data': None, 'leaderboard_data': None, 'monthly_leaderboard_data': None, 'daily_leaderboard_case_details_log': None}),
-    dcc.Store(id='processing-flags-store', data={'scraping': False, 'local_processing': False, 'pdf_processing': False, 'claiming': False}),
+    dcc.Store(id='sidebar-data-store', data={'timestamp': None, 'daily_leaderboard_case_details_log': None}), # Tables already hold their rows; only what the cell-click branch reads back is kept here
+    dcc.Store(id='processing-flags-store', data={'active': []}),
     dcc.Store(id='uploaded-local-images-store', data=[]),
     dcc.Store(id='uploaded-pdf-files-store', data=[]),
+    dcc.Store(id='pdf-upload-pending-store'), # Upload contents forwarded to the server only when the selection changed
     dcc.Store(id='sidebar-state-store', data={'is_collapsed': False}),
 
     html.Div(id='hidden-trigger-div', style={'display': 'none'}),
 
-    dcc.Interval(id='interval-log-update', interval=2*1000, n_intervals=0),
+    # Log and active-case views refresh on /ui-events pushes; their intervals are only a slow fallback if the stream drops
+    dcc.Store(id='ui-events-connected'), dcc.Store(id='claimer-events-store'), dcc.Store(id='log-events-store'), dcc.Store(id='log-rendered-version'),
+    dcc.Store(id='active-cases-rendered-version'), dcc.Store(id='claimer-ui-rendered-key'),
+    dcc.Interval(id='interval-log-update', interval=30*1000, n_intervals=0),
     dcc.Interval(id='interval-status-update', interval=1*1000, n_intervals=0),
-    dcc.Interval(id='interval-active-cases-refresh', interval=3*1000, n_intervals=0),
+    dcc.Interval(id='interval-active-cases-refresh', interval=30*1000, n_intervals=0),
 
-    dcc.Download(id="download-excel-web"), dcc.Download(id="download-zip-web"),
-    dcc.Download(id="download-zip-local"),
-    dcc.Download(id="download-excel-pdf"), dcc.Download(id="download-zip-pdf"),
-    dcc.Download(id="download-auto-excel-pt"), dcc.Download(id="download-auto-zip-pt"),
-    dcc.Download(id="download-auto-excel-gh"), dcc.Download(id="download-auto-zip-gh"),
 
     html.Div(id="app-container", className="row", style={'display': 'flex', 'flexDirection': 'row', 'height': 'calc(100vh - 80px)'}, children=[
         html.Div(id='sidebar', style=SIDEBAR_STYLE_VISIBLE, children=[
@@ -1812,35 +2391,35 @@ app.layout = html.Div(style=dark_theme_styles, children=[
             html.Div(className="row", style={'display': 'flex', 'flexDirection': 'row', 'flexWrap':'wrap'}, children=[
                 html.Div(style=section_style, children=[
                     html.H4("1. Scrape Menu from Web 🌐"),
-                    dcc.Dropdown(id='scraper-country-dropdown', options=[{'label': c, 'value': c} for c in ["Portugal", "Ghana", "Czechia"]], value='Portugal', style={'marginBottom': '10px', 'color': '#333'}),
+                    dcc.Dropdown(id='scraper-country-dropdown', options=OUTPUT_COUNTRY_OPTIONS, value='Portugal', style=country_dropdown_style),
                     dcc.Input(id='scraper-url-input', type='text', placeholder='Enter Menu URL...', style=input_style),
                     html.Button("🚀 Start Scraping", id='scraper-start-button', style=button_style),
                     html.Div(id='scraper-status-placeholder', style={'marginTop': '10px'}),
                     html.Div(id='scraper-download-area', children=[
-                        html.Button("💾 Excel", id="scraper-download-excel-button", style={**button_style, 'display':'none', 'marginRight':'5px'}),
-                        html.Button("🖼️ Images ZIP", id="scraper-download-zip-button", style={**button_style, 'display':'none'})
+                        html.A("💾 Excel", id="scraper-download-excel-button", style=hidden_button_style_spaced),
+                        html.A("🖼️ Images ZIP", id="scraper-download-zip-button", style=hidden_button_style)
                     ], style={'marginTop':'10px'})
                 ]),
                 html.Div(style=section_style, children=[
                     html.H4("2. Process Local Images 🖼️"),
-                    dcc.Upload(id='local-image-uploader', children=html.Div(['Drag/Drop or ', html.A('Select Images')]), style={'width': '95%', 'height': '60px', 'lineHeight': '60px', 'borderWidth': '1px', 'borderStyle': 'dashed', 'borderRadius': '5px', 'textAlign': 'center', 'margin': '10px auto', 'color': '#aaa'}, multiple=True),
+                    dcc.Upload(id='local-image-uploader', children=html.Div(['Drag/Drop or ', html.A('Select Images')]), style=upload_style, multiple=True),
                     html.Div(id='local-image-upload-status'),
                     html.Button("⚙️ Process Images", id='local-image-process-button', style=button_style),
                     html.Div(id='local-image-status-placeholder', style={'marginTop': '10px'}),
                     html.Div(id='local-image-download-area', children=[
-                         html.Button("🖼️ Download ZIP", id="local-image-download-zip-button", style={**button_style, 'display':'none'})
+                         html.A("🖼️ Download ZIP", id="local-image-download-zip-button", style=hidden_button_style)
                     ], style={'marginTop':'10px'})
                 ]),
                 html.Div(style=section_style, children=[
                     html.H4("3. Extract Data from PDF 📄"),
-                    dcc.Dropdown(id='pdf-country-dropdown', options=[{'label': c, 'value': c} for c in ["Portugal", "Ghana", "Czechia"]], value='Portugal', style={'marginBottom': '10px', 'color': '#333'}),
-                    dcc.Upload(id='pdf-file-uploader', children=html.Div(['Drag/Drop or ', html.A('Select PDFs')]), style={'width': '95%', 'height': '60px', 'lineHeight': '60px', 'borderWidth': '1px', 'borderStyle': 'dashed', 'borderRadius': '5px', 'textAlign': 'center', 'margin': '10px auto', 'color': '#aaa'}, multiple=True),
+                    dcc.Dropdown(id='pdf-country-dropdown', options=OUTPUT_COUNTRY_OPTIONS, value='Portugal', style=country_dropdown_style),
+                    dcc.Upload(id='pdf-file-uploader', children=html.Div(['Drag/Drop or ', html.A('Select PDFs')]), style=upload_style, multiple=True),
                     html.Div(id='pdf-upload-status'),
                     html.Button("📄 Process PDF(s)", id='pdf-process-button', style=button_style),
                     html.Div(id='pdf-status-placeholder', style={'marginTop': '10px'}),
                     html.Div(id='pdf-download-area', children=[
-                        html.Button("💾 Excel", id="pdf-download-excel-button", style={**button_style, 'display':'none', 'marginRight':'5px'}),
-                        html.Button("🖼️ Images ZIP", id="pdf-download-zip-button", style={**button_style, 'display':'none'})
+                        html.A("💾 Excel", id="pdf-download-excel-button", style=hidden_button_style_spaced),
+                        html.A("🖼️ Images ZIP", id="pdf-download-zip-button", style=hidden_button_style)
                     ], style={'marginTop':'10px'})
                 ]),
             ]),
@@ -1877,34 +2456,68 @@ def toggle_sidebar(n_clicks_toggle, sidebar_state):
     
     return sidebar_style_to_set, main_content_style_to_set, {'is_collapsed': new_state_is_collapsed}
 
-@app.callback(Output('live-log-display', 'value'),
-              Input('interval-log-update', 'n_intervals'))
-def update_log_display_callback(n_intervals_log):
-    global app_log_messages
-    return "\n".join(app_log_messages)
+# Opens the /ui-events stream once per page and copies each changed counter into its store, which triggers the matching callback
+app.clientside_callback(
+    """
+    function(pathname) {
+        if (!window.uiEventsSource) {
+            const lastVersions = {};
+            window.uiEventsSource = new EventSource(%s);
+            window.uiEventsSource.onmessage = function(event) {
+                const versions = JSON.parse(event.data);
+                if (versions.claimer !== lastVersions.claimer) window.dash_clientside.set_props('claimer-events-store', {data: versions.claimer});
+                if (versions.log !== lastVersions.log) window.dash_clientside.set_props('log-events-store', {data: versions.log});
+                Object.assign(lastVersions, versions);
+            };
+        }
+        return window.dash_clientside.no_update;
+    }
+    """ % json.dumps(app.get_relative_path('/ui-events')),
+    Output('ui-events-connected', 'data'),
+    Input('url', 'pathname')
+)
+
+log_text_cache = {'version': None, 'text': ''} # Joined app_log_messages, rebuilt only when the log version has moved
+
+def get_log_text():
+    with app_log_lock:
+        current_log_version = ui_change_versions['log'] # read before joining, so the cached text is never older than its version
+        if log_text_cache['version'] != current_log_version:
+            log_text_cache['text'] = "\n".join(app_log_messages); log_text_cache['version'] = current_log_version
+        return log_text_cache['text'], current_log_version
+
+@app.callback([Output('live-log-display', 'value'),
+               Output('log-rendered-version', 'data')],
+              [Input('log-events-store', 'data'),
+               Input('interval-log-update', 'n_intervals')],
+              State('log-rendered-version', 'data'))
+def update_log_display_callback(log_version, n_intervals_log, rendered_log_version):
+    log_text, current_log_version = get_log_text()
+    if rendered_log_version == current_log_version: return dash.no_update, dash.no_update # this page already shows it; send nothing
+    return log_text, current_log_version
 
 @app.callback(
     [Output('claimer-status-display', 'value'),
      Output('claimer-controls-div', 'children'),
-     Output('claimer-monitoring-caption', 'style')],
+     Output('claimer-monitoring-caption', 'style'),
+     Output('claimer-ui-rendered-key', 'data')],
     [Input('interval-status-update', 'n_intervals'),
-     Input('processing-flags-store', 'data')]
+     Input('processing-flags-store', 'data')],
+    State('claimer-ui-rendered-key', 'data')
 )
-def update_claimer_ui(n_intervals_status, processing_flags):
+def update_claimer_ui(n_intervals_status, processing_flags, rendered_ui_key):
     global claimer_status_message, monitoring_active_flag
-    is_other_process_running = processing_flags.get('scraping', False) or \
-                               processing_flags.get('local_processing', False) or \
-                               processing_flags.get('pdf_processing', False) or \
-                               processing_flags.get('claiming', False)
-    
     claimer_btn_disabled_status = ("Starting..." in claimer_status_message) or \
                                   ("Stopping..." in claimer_status_message) or \
                                   ("Initializing..." in claimer_status_message)
+    # Everything the outputs depend on; when this page already shows it, skip the button rebuild and the round-trip payload
+    ui_key = [claimer_status_message, monitoring_active_flag, claimer_btn_disabled_status]
+    if rendered_ui_key == ui_key: raise dash.exceptions.PreventUpdate
     
     if monitoring_active_flag:
         controls_children = [
             html.Div(style={'display':'flex'}, children=[
-                html.Button("🔄 Refresh UI", id="claimer-refresh-button", style={**button_style, 'backgroundColor': '#007BFF', 'marginRight':'10px'}, disabled=claimer_btn_disabled_status),
+                html.Button("🔄 Refresh UI", id="claimer-refresh-button", style=refresh_button_style, disabled=claimer_btn_disabled_status),
                 html.Button("⏹️ Stop Monitoring", id="claimer-start-stop-button", style=button_style if not claimer_btn_disabled_status else disabled_button_style, disabled=claimer_btn_disabled_status)
             ])
         ]
@@ -1914,7 +2527,7 @@ def update_claimer_ui(n_intervals_status, processing_flags):
             html.Button("▶️ Start Monitoring", id="claimer-start-stop-button", style=button_style if not claimer_btn_disabled_status else disabled_button_style, disabled=claimer_btn_disabled_status)
         ]
         caption_style = {'display': 'none'}
-    return claimer_status_message, controls_children, caption_style
+    return claimer_status_message, controls_children, caption_style, ui_key
 
 @app.callback(
     Output('claimer-thread-status-store', 'data', allow_duplicate=True),
@@ -1943,16 +2556,15 @@ def toggle_monitoring(n_clicks_toggle_claimer, current_processing_flags):
             add_log(claimer_status_message, "error")
             return {'timestamp': time.time(), 'status': 'user_data_dir_error', 'monitoring_active': False}
 
-        active_portugal_case_store.clear()
-        active_ghana_case_store.clear()
-        while not data_queue_claimer.empty():
-            try: data_queue_claimer.get_nowait()
-            except queue.Empty: break
+        with active_case_stores_lock:
+            active_portugal_case_store.clear()
+            active_ghana_case_store.clear()
+            mark_active_cases_changed()
+        data_queue_claimer.clear(); claimer_status_queue.clear()
         
         monitoring_active_flag = True
         stop_event_claimer.clear()
         claimer_status_message = "Claimer: Starting..."
-        if not isinstance(data_queue_claimer, queue.Queue): data_queue_claimer = queue.Queue()
         
         claimer_thread_instance = threading.Thread(target=run_claimer_loop, args=(stop_event_claimer,), daemon=True) 
         claimer_thread_instance.start()
@@ -1971,17 +2583,40 @@ def manual_refresh_ui(n_clicks_refresh):
         add_log("UI: Manual Refresh button clicked (claimer UI).", "info")
     return f"manual_claimer_refreshed_at_{time.time()}"
 
+MAX_CLAIMER_MSGS_PER_TICK = 16
+
+def _render_case_card(case, country_name, country_code, flag_emoji):
+    """Active case card: header, auto-scraped file links (or a pending note) and the Finish button for that country."""
+    card_content = [
+        html.H5(f"{country_name} Case {flag_emoji} - Task ID: {case.get('display_id', 'N/A')}", style={'color':'#66BB6A'}),
+        html.P(f"Account: {case.get('account_name', 'N/A')}"),
+        html.P(f"Title: {case.get('case_title', 'N/A')}") 
+    ] 
+    scraped_files = case.get("scraped_files_data")
+    if case.get("scrape_pending"):
+        card_content.append(html.P("⏳ Preparing auto-scraped files...", style={'marginTop':'10px'}))
+    elif scraped_files:
+        card_content.append(html.H6("Auto-Scraped Files:", style={'marginTop':'10px'}))
+        card_content.extend(html.A(f"{label} ({scraped_files[f'{kind}_name']})", href=output_file_url(scraped_files.get(f'{kind}_path'), scraped_files[f'{kind}_name']), style=link_style)
+                            for kind, label, link_style in (('excel', "📄 Excel", button_style), ('zip', "🖼️ Images ZIP", secondary_download_button_style))
+                            if scraped_files.get(f'{kind}_path') and scraped_files.get(f'{kind}_name'))
+    card_content.append(html.Button(f"✅ Finish {country_name} Case", id={'type': 'finish-case-button', 'index': country_code}, style=finish_case_button_style))
+    return html.Div(card_content, style=card_style)
+
 @app.callback(
     [Output('active-cases-display', 'children'),
      Output('active-cases-refresh-timestamp', 'children'),
      Output('active-pt-case-data-store', 'data', allow_duplicate=True),
-     Output('active-gh-case-data-store', 'data', allow_duplicate=True)
+     Output('active-gh-case-data-store', 'data', allow_duplicate=True),
+     Output('active-cases-rendered-version', 'data')
     ],
-    [Input('interval-active-cases-refresh', 'n_intervals'),
+    [Input('claimer-events-store', 'data'),
+     Input('interval-active-cases-refresh', 'n_intervals'),
      Input('claimer-thread-status-store', 'data')],
+    State('active-cases-rendered-version', 'data'),
     prevent_initial_call=True 
 )
-def update_active_cases_display(n_intervals_active_case, claimer_thread_trigger_data):
+def update_active_cases_display(claimer_version, n_intervals_active_case, claimer_thread_trigger_data, rendered_cards_version):
     global active_portugal_case_store, active_ghana_case_store, data_queue_claimer
 
     new_pt_case_data_for_store = dash.no_update
@@ -1989,69 +2624,62 @@ def update_active_cases_display(n_intervals_active_case, claimer_thread_trigger_
 
     children = []
     try:
-        while not data_queue_claimer.empty():
-            queued_message = data_queue_claimer.get_nowait()
+        queued_messages = []
+        # Statuses first, then claims, so a claim drained in this tick is not cleared by an older failure status.
+        # At most MAX_CLAIMER_MSGS_PER_TICK per queue; leftovers get a fresh push instead of stretching this callback.
+        for source_q in (claimer_status_queue, data_queue_claimer):
+            for _ in range(MAX_CLAIMER_MSGS_PER_TICK):
+                try: queued_messages.append(source_q.popleft())
+                except IndexError: break
+            if source_q: notify_ui_change('claimer')
+        for queued_message in queued_messages:
             q_status = queued_message.get("status")
             claimed_data_in_q = queued_message.get("claimed_case_data")
             add_log(f"Dash UI (Active Cases): Processing Q msg: Status '{q_status}'", "debug")
 
             if "CLAIM_SUCCESS" in q_status and claimed_data_in_q:
                 country = claimed_data_in_q.get("country")
-                if country == "Portugal": 
-                    active_portugal_case_store = claimed_data_in_q
-                    new_pt_case_data_for_store = claimed_data_in_q 
-                elif country == "Ghana": 
-                    active_ghana_case_store = claimed_data_in_q
-                    new_gh_case_data_for_store = claimed_data_in_q
+                with active_case_stores_lock:
+                    if country == "Portugal": 
+                        active_portugal_case_store = claimed_data_in_q
+                        new_pt_case_data_for_store = claimed_data_in_q 
+                    elif country == "Ghana": 
+                        active_ghana_case_store = claimed_data_in_q
+                        new_gh_case_data_for_store = claimed_data_in_q
+                    mark_active_cases_changed()
             elif q_status in ["DRIVER_INIT_FAIL", "LOGIN_FAIL", "THREAD_EXCEPTION", "DRIVER_DEAD_PRE_CHECK", "DRIVER_DEAD"]:
-                active_portugal_case_store.clear()
-                active_ghana_case_store.clear()
+                with active_case_stores_lock:
+                    active_portugal_case_store.clear()
+                    active_ghana_case_store.clear()
+                    mark_active_cases_changed()
                 new_pt_case_data_for_store = {} 
                 new_gh_case_data_for_store = {} 
                 add_log(f"Dash UI: Claimer thread issue '{q_status}', clearing active case stores and globals.", "warning")
 
-    except queue.Empty: pass
     except Exception as e: add_log(f"Dash UI: Error processing claimer queue for active cases display: {e}", "error")
 
-    if not active_portugal_case_store and not active_ghana_case_store:
+    with active_case_stores_lock:
+        if collect_case_scrape_result(active_portugal_case_store): new_pt_case_data_for_store = active_portugal_case_store; mark_active_cases_changed()
+        if collect_case_scrape_result(active_ghana_case_store): new_gh_case_data_for_store = active_ghana_case_store; mark_active_cases_changed()
+        pt_case = dict(active_portugal_case_store); gh_case = dict(active_ghana_case_store)
+        current_cards_version = active_cases_version
+    # Render and send these snapshots: a concurrent claim/Finish can't change them while Dash serializes the response
+    if new_pt_case_data_for_store is not dash.no_update: new_pt_case_data_for_store = pt_case
+    if new_gh_case_data_for_store is not dash.no_update: new_gh_case_data_for_store = gh_case
+
+    # Cards unchanged since this page last rendered them (status-only messages, fallback ticks, Start/Stop without a store change):
+    # skip the rebuild and DOM diff. The country stores are likewise only written when a claim/failure/scrape result changed them.
+    if rendered_cards_version == current_cards_version:
+        return dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update
+
+    if not pt_case and not gh_case:
         children.append(html.Div("No active cases being handled by the bot.", style=card_style))
     
-    if active_portugal_case_store:
-        case = active_portugal_case_store
-        card_content = [
-            html.H5(f"Portugal Case 🇵🇹 - Task ID: {case.get('display_id', 'N/A')}", style={'color':'#66BB6A'}),
-            html.P(f"Account: {case.get('account_name', 'N/A')}"),
-            html.P(f"Title: {case.get('case_title', 'N/A')}") 
-        ] 
-        scraped_files = case.get("scraped_files_data")
-        if scraped_files:
-            card_content.append(html.H6("Auto-Scraped Files:", style={'marginTop':'10px'}))
-            if scraped_files.get("excel_bytes") and scraped_files.get("excel_name"):
-                 card_content.append(html.Button(f"📄 Excel ({scraped_files.get('excel_name')})", id={'type':'auto-download-btn', 'index': 'pt-excel'}, style=button_style))
-            if scraped_files.get("zip_bytes") and scraped_files.get("zip_name"):
-                 card_content.append(html.Button(f"🖼️ Images ZIP ({scraped_files.get('zip_name')})", id={'type':'auto-download-btn', 'index': 'pt-zip'}, style={**button_style, 'marginLeft':'5px'}))
-        card_content.append(html.Button("✅ Finish Portugal Case", id={'type': 'finish-case-button', 'index': 'pt'}, style={**button_style, 'marginTop':'10px', 'backgroundColor':'#d9534f'}))
-        children.append(html.Div(card_content, style=card_style))
-
-    if active_ghana_case_store:
-        case = active_ghana_case_store
-        card_content = [
-            html.H5(f"Ghana Case 🇬🇭 - Task ID: {case.get('display_id', 'N/A')}", style={'color':'#66BB6A'}),
-            html.P(f"Account: {case.get('account_name', 'N/A')}"),
-            html.P(f"Title: {case.get('case_title', 'N/A')}") 
-        ] 
-        scraped_files = case.get("scraped_files_data")
-        if scraped_files:
-            card_content.append(html.H6("Auto-Scraped Files:", style={'marginTop':'10px'}))
-            if scraped_files.get("excel_bytes") and scraped_files.get("excel_name"):
-                card_content.append(html.Button(f"📄 Excel ({scraped_files.get('excel_name')})", id={'type':'auto-download-btn', 'index': 'gh-excel'}, style=button_style))
-            if scraped_files.get("zip_bytes") and scraped_files.get("zip_name"):
-                card_content.append(html.Button(f"🖼️ Images ZIP ({scraped_files.get('zip_name')})", id={'type':'auto-download-btn', 'index': 'gh-zip'}, style={**button_style, 'marginLeft':'5px'}))
-        card_content.append(html.Button("✅ Finish Ghana Case", id={'type': 'finish-case-button', 'index': 'gh'}, style={**button_style, 'marginTop':'10px', 'backgroundColor':'#d9534f'}))
-        children.append(html.Div(card_content, style=card_style))
+    if pt_case: children.append(_render_case_card(pt_case, 'Portugal', 'pt', '🇵🇹'))
+    if gh_case: children.append(_render_case_card(gh_case, 'Ghana', 'gh', '🇬🇭'))
         
     timestamp_text = f"Active cases view updated: {time.strftime('%H:%M:%S')}"
-    return children, timestamp_text, new_pt_case_data_for_store, new_gh_case_data_for_store
+    return children, timestamp_text, new_pt_case_data_for_store, new_gh_case_data_for_store, current_cards_version
 
 @app.callback(
     [Output('active-pt-case-data-store', 'data', allow_duplicate=True),
@@ -2064,21 +2692,25 @@ def finish_case_callback(n_clicks_finish):
     if not ctx.triggered or not any(n_clicks_finish):
         return dash.no_update, dash.no_update
 
-    triggered_button_id_dict = json.loads(ctx.triggered[0]['prop_id'].split('.')[0])
-    country_index = triggered_button_id_dict.get('index')
+    country_index = (ctx.triggered_id or {}).get('index') # already-parsed pattern id
 
     updated_pt_store = dash.no_update
     updated_gh_store = dash.no_update
 
     case_to_finish_details = None
-    if country_index == 'pt' and active_portugal_case_store:
-        case_to_finish_details = active_portugal_case_store.copy()
-        active_portugal_case_store.clear()
+    with active_case_stores_lock:
+        if country_index == 'pt' and active_portugal_case_store:
+            case_to_finish_details = active_portugal_case_store.copy(); active_portugal_case_store.clear()
+        elif country_index == 'gh' and active_ghana_case_store:
+            case_to_finish_details = active_ghana_case_store.copy(); active_ghana_case_store.clear()
+        if case_to_finish_details: mark_active_cases_changed()
+    if case_to_finish_details:
+        case_scrape_futures.pop(case_to_finish_details.get('display_id'), None) # a still-running scrape is no longer wanted
+        notify_ui_change('claimer')
+    if country_index == 'pt' and case_to_finish_details:
         updated_pt_store = {}
         add_log(f"UI: 'Finish Portugal Case' processing for Task ID: {case_to_finish_details.get('display_id', 'N/A')}", "info")
-    elif country_index == 'gh' and active_ghana_case_store:
-        case_to_finish_details = active_ghana_case_store.copy()
-        active_ghana_case_store.clear()
+    elif country_index == 'gh' and case_to_finish_details:
         updated_gh_store = {}
         add_log(f"UI: 'Finish Ghana Case' processing for Task ID: {case_to_finish_details.get('display_id', 'N/A')}", "info")
     else:
@@ -2087,24 +2719,25 @@ def finish_case_callback(n_clicks_finish):
 
     if case_to_finish_details:
         finish_time_obj = datetime.now()
+        finish_ts_str = finish_time_obj.isoformat(sep=' ', timespec='seconds')
         calculated_duration_seconds = None
         if case_to_finish_details.get("claimed_time"):
             try:
-                claimed_datetime_obj = datetime.strptime(case_to_finish_details["claimed_time"], "%Y-%m-%d %H:%M:%S")
+                claimed_datetime_obj = datetime.fromisoformat(case_to_finish_details["claimed_time"])
                 calculated_duration_seconds = (finish_time_obj - claimed_datetime_obj).total_seconds()
             except ValueError:
                 add_log(f"Warning: Could not parse claimed_time '{case_to_finish_details.get('claimed_time')}' for duration.", "warning")
 
         log_entry_to_append = {
             'Date': finish_time_obj.strftime('%Y-%m-%d'),
-            'Observed Timestamp': finish_time_obj.strftime('%Y-%m-%d %H:%M:%S'),
+            'Observed Timestamp': finish_ts_str,
             'Claimed Timestamp': case_to_finish_details.get("claimed_time", pd.NA),
-            'Finished Timestamp': finish_time_obj.strftime('%Y-%m-%d %H:%M:%S'),
+            'Finished Timestamp': finish_ts_str,
             'Duration (seconds)': calculated_duration_seconds if calculated_duration_seconds is not None else pd.NA,
             'Duration (HH:MM:SS)': format_duration(calculated_duration_seconds) if calculated_duration_seconds is not None else pd.NA, 
             'Case Display ID': case_to_finish_details.get('display_id', 'N/A'),
             'Country': case_to_finish_details.get('country', 'N/A'),
-            'Assigned User': "BOT_CLAIMED", 
+            'Assigned User': BOT_ASSIGNED_USER, 
             'Status (Observed)': "Completed", 
             'Account Name': case_to_finish_details.get('account_name', 'N/A'),
             'Case Title': case_to_finish_details.get('case_title', 'N/A'),
@@ -2112,56 +2745,27 @@ def finish_case_callback(n_clicks_finish):
         }
         append_to_case_log(log_entry_to_append) 
         add_log(f"Case '{case_to_finish_details.get('display_id')}' for {case_to_finish_details.get('country')} marked finished and logged.", "success")
+        finished_case_files = case_to_finish_details.get("scraped_files_data") or {}
+        delete_output_files(finished_case_files.get("excel_path"), finished_case_files.get("zip_path"))
         
     return updated_pt_store, updated_gh_store
 
-@app.callback(
-    Output("download-auto-excel-pt", "data"),
-    Input({'type': 'auto-download-btn', 'index': 'pt-excel'}, 'n_clicks'),
-    State('active-pt-case-data-store', 'data'),
-    prevent_initial_call=True
-)
-def download_auto_pt_excel(n_clicks_dl, pt_case_data_from_store):
-    if not n_clicks_dl or not pt_case_data_from_store: raise dash.exceptions.PreventUpdate
-    scraped_data_nested = pt_case_data_from_store.get("scraped_files_data", {})
-    if not scraped_data_nested.get('excel_bytes'): raise dash.exceptions.PreventUpdate
-    return dict(content=scraped_data_nested['excel_bytes'], filename=scraped_data_nested.get('excel_name', 'auto_scraped_pt.xlsx'), base64=True)
+# --- Processing Operation Gate --- scrape / local images / PDF each run inside a Dash callback thread; only one at a time.
+# Server-side set: the processing-flags-store only reaches the browser when a callback returns, so it can't gate a running one.
+active_processing_ops = set()
+processing_ops_lock = threading.Lock()
 
-@app.callback(
-    Output("download-auto-zip-pt", "data"),
-    Input({'type': 'auto-download-btn', 'index': 'pt-zip'}, 'n_clicks'),
-    State('active-pt-case-data-store', 'data'), 
-    prevent_initial_call=True
-)
-def download_auto_pt_zip(n_clicks_dl, pt_case_data_from_store):
-    if not n_clicks_dl or not pt_case_data_from_store: raise dash.exceptions.PreventUpdate
-    scraped_data_nested = pt_case_data_from_store.get("scraped_files_data", {})
-    if not scraped_data_nested.get('zip_bytes'): raise dash.exceptions.PreventUpdate
-    return dict(content=scraped_data_nested['zip_bytes'], filename=scraped_data_nested.get('zip_name', 'auto_scraped_pt_images.zip'), base64=True)
-
-@app.callback(
-    Output("download-auto-excel-gh", "data"),
-    Input({'type': 'auto-download-btn', 'index': 'gh-excel'}, 'n_clicks'),
-    State('active-gh-case-data-store', 'data'), 
-    prevent_initial_call=True
-)
-def download_auto_gh_excel(n_clicks_dl, gh_case_data_from_store):
-    if not n_clicks_dl or not gh_case_data_from_store: raise dash.exceptions.PreventUpdate
-    scraped_data_nested = gh_case_data_from_store.get("scraped_files_data", {})
-    if not scraped_data_nested.get('excel_bytes'): raise dash.exceptions.PreventUpdate
-    return dict(content=scraped_data_nested['excel_bytes'], filename=scraped_data_nested.get('excel_name', 'auto_scraped_gh.xlsx'), base64=True)
+def try_begin_processing(op_name):
+    """Registers op_name as running. False (nothing registered) when any processing operation is already active."""
+    with processing_ops_lock:
+        if active_processing_ops: return False
+        active_processing_ops.add(op_name); return True
 
-@app.callback(
-    Output("download-auto-zip-gh", "data"),
-    Input({'type': 'auto-download-btn', 'index': 'gh-zip'}, 'n_clicks'),
-    State('active-gh-case-data-store', 'data'), 
-    prevent_initial_call=True
-)
-def download_auto_gh_zip(n_clicks_dl, gh_case_data_from_store):
-    if not n_clicks_dl or not gh_case_data_from_store: raise dash.exceptions.PreventUpdate
-    scraped_data_nested = gh_case_data_from_store.get("scraped_files_data", {})
-    if not scraped_data_nested.get('zip_bytes'): raise dash.exceptions.PreventUpdate
-    return dict(content=scraped_data_nested['zip_bytes'], filename=scraped_data_nested.get('zip_name', 'auto_scraped_gh_images.zip'), base64=True)
+def end_processing(op_name):
+    """Unregisters op_name and returns the processing-flags-store data ({'active': [...]}) for the callback's output."""
+    with processing_ops_lock:
+        active_processing_ops.discard(op_name)
+        return {'active': sorted(active_processing_ops)}
 
 # --- WEB SCRAPER CALLBACKS ---
 @app.callback(
@@ -2172,74 +2776,65 @@ def download_auto_gh_zip(n_clicks_dl, gh_case_data_from_store):
      Output('processing-flags-store', 'data', allow_duplicate=True)],
     [Input('scraper-start-button', 'n_clicks')],
     [State('scraper-url-input', 'value'),
-     State('scraper-country-dropdown', 'value'),
-     State('processing-flags-store', 'data')],
+     State('scraper-country-dropdown', 'value')],
     prevent_initial_call=True
 )
-def run_web_scraper_callback(n_clicks_scrape, url, selected_country_scrape, current_processing_flags):
-    global ffmpeg_path_global, IMAGES_OUTPUT_FOLDER 
+def run_web_scraper_callback(n_clicks_scrape, url, selected_country_scrape):
+    global IMAGES_OUTPUT_FOLDER 
 
     ctx = dash.callback_context
-    if not n_clicks_scrape or not ctx.triggered or ctx.triggered[0]['prop_id'].split('.')[0] != 'scraper-start-button':
+    if not n_clicks_scrape or ctx.triggered_id != 'scraper-start-button':
         return dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update
 
-    hidden_button_style_dict = {**button_style, 'display': 'none'}
-    visible_button_style_dict = {**button_style, 'display': 'inline-block', 'marginRight':'5px'}
-    
-    if current_processing_flags.get('scraping') or \
-       current_processing_flags.get('local_processing') or \
-       current_processing_flags.get('pdf_processing'):
-        return html.P("Another data processing operation (scrape, local, or PDF) is already in progress. Please wait.", style={'color': 'orange'}), \
-               dash.no_update, hidden_button_style_dict, hidden_button_style_dict, dash.no_update
-
     if not url or not url.startswith(('http:', 'https:')):
         return html.P("Please enter a valid URL (starting with http: or https:).", style={'color': 'red'}), \
-               dash.no_update, hidden_button_style_dict, hidden_button_style_dict, dash.no_update
+               dash.no_update, hidden_button_style, hidden_button_style, dash.no_update
 
-    updated_flags = current_processing_flags.copy()
-    updated_flags['scraping'] = True
+    if not try_begin_processing('scraping'):
+        return html.P("Another data processing operation (scrape, local, or PDF) is already in progress. Please wait.", style={'color': 'orange'}), \
+               dash.no_update, hidden_button_style, hidden_button_style, dash.no_update
     
-    scraper_output_data = {'timestamp': None, 'excel_bytes': None, 'excel_name': None, 'zip_bytes': None, 'zip_name': None}
-    excel_style_to_set = hidden_button_style_dict
-    zip_style_to_set = hidden_button_style_dict
+    scraper_output_data = {'timestamp': None, 'excel_path': None, 'excel_name': None, 'excel_url': None, 'zip_path': None, 'zip_name': None, 'zip_url': None}
+    excel_style_to_set = hidden_button_style
+    zip_style_to_set = hidden_button_style
     status_message_content = "Starting web scraping... This may take some moments. Please wait."
     status_message = html.P(status_message_content, style={'color': 'lightblue'})
 
     try:
         add_log(f"Web Scraper: Starting for URL: {url}, Country: {selected_country_scrape}", "info")
-        if not ffmpeg_path_global: find_ffmpeg_on_startup() 
         
-        menu_data = scrape_website(url, ffmpeg_path_global) 
+        menu_data = scrape_website(url, get_ffmpeg_path()) 
         if not menu_data:
             status_message = html.P(f"No data scraped from {url}. Check logs for details.", style={'color': 'orange'})
         else:
             add_log(f"Web Scraper: Scraped {len(menu_data)} items. Processing images and data...", "info")
-            df_processed, images_saved = process_web_images_and_data(menu_data, url, ffmpeg_path_global) 
+            df_processed, images_saved = process_web_images_and_data(menu_data, url, get_ffmpeg_path()) 
             
             if df_processed is None or df_processed.empty:
                 status_message = html.P("Web scraping data processing failed or yielded no data. Check logs.", style={'color': 'orange'})
             else:
                 add_log(f"Web Scraper: Data processed ({df_processed.shape[0]} items). Creating output files...", "info")
-                excel_bytes, excel_name, zip_bytes, zip_name = create_output_files(df_processed, images_saved, IMAGES_OUTPUT_FOLDER, selected_country_scrape) 
+                excel_path, excel_name, zip_path, zip_name = create_output_files(df_processed, images_saved, IMAGES_OUTPUT_FOLDER, selected_country_scrape) 
                 
                 scraper_output_data['timestamp'] = time.time()
                 files_generated = False
-                if excel_bytes:
-                    scraper_output_data['excel_bytes'] = base64.b64encode(excel_bytes).decode()
+                if excel_path:
+                    scraper_output_data['excel_path'] = excel_path
                     scraper_output_data['excel_name'] = excel_name
-                    excel_style_to_set = visible_button_style_dict
+                    scraper_output_data['excel_url'] = output_file_url(excel_path, excel_name)
+                    excel_style_to_set = visible_button_style_spaced
                     files_generated = True
-                if zip_bytes:
-                    scraper_output_data['zip_bytes'] = base64.b64encode(zip_bytes).decode()
+                if zip_path:
+                    scraper_output_data['zip_path'] = zip_path
                     scraper_output_data['zip_name'] = zip_name
-                    zip_style_to_set = visible_button_style_dict
+                    scraper_output_data['zip_url'] = output_file_url(zip_path, zip_name)
+                    zip_style_to_set = visible_button_style_spaced
                     files_generated = True
                 
                 status_message = html.P("Scraping & processing complete. Files ready." if files_generated else "Scraping complete, but no output files generated. Check logs.", 
                                         style={'color': 'green' if files_generated else 'orange'})
     except Exception as e_scraper:
-        detailed_error_msg = traceback.format_exc()
-        add_log(f"Web Scraper: CRITICAL ERROR for '{url}': {e_scraper}\n{detailed_error_msg}", "error")
+        add_log_exception(f"Web Scraper: CRITICAL ERROR for '{url}': {e_scraper}")
         status_message = html.Div([
             html.P("An error occurred during web scraping:", style={'color': 'red', 'fontWeight': 'bold'}),
             html.Pre(f"{str(e_scraper)}\nSee server logs for more details.", 
@@ -2247,31 +2842,17 @@ def run_web_scraper_callback(n_clicks_scrape, url, selected_country_scrape, curr
                             'maxHeight': '100px', 'overflowY': 'auto', 'whiteSpace': 'pre-wrap'})
         ])
     finally:
-        updated_flags['scraping'] = False
+        updated_flags = end_processing('scraping')
     
     return status_message, scraper_output_data, excel_style_to_set, zip_style_to_set, updated_flags
 
-@app.callback(
-    Output("download-excel-web", "data"), 
-    Input("scraper-download-excel-button", "n_clicks"), 
-    State("web-scraper-output-store", "data"), 
-    prevent_initial_call=True
-)
-def download_web_excel_callback(n_clicks_dl_excel, web_store_data):
-    if not n_clicks_dl_excel or not web_store_data or not web_store_data.get('excel_bytes'):
-        raise dash.exceptions.PreventUpdate
-    return dict(content=web_store_data['excel_bytes'], filename=web_store_data.get('excel_name', 'scraped_data.xlsx'), base64=True)
-
-@app.callback(
-    Output("download-zip-web", "data"), 
-    Input("scraper-download-zip-button", "n_clicks"), 
-    State("web-scraper-output-store", "data"), 
-    prevent_initial_call=True
+# The output stores carry ready-made download URLs, so pointing the links at them needs no server round-trip
+app.clientside_callback(
+    "function(data) { data = data || {}; return [data.excel_url || null, data.zip_url || null]; }",
+    [Output('scraper-download-excel-button', 'href'),
+     Output('scraper-download-zip-button', 'href')],
+    Input('web-scraper-output-store', 'data')
 )
-def download_web_zip_callback(n_clicks_dl_zip, web_store_data):
-    if not n_clicks_dl_zip or not web_store_data or not web_store_data.get('zip_bytes'):
-        raise dash.exceptions.PreventUpdate
-    return dict(content=web_store_data['zip_bytes'], filename=web_store_data.get('zip_name', 'scraped_images.zip'), base64=True)
 
 # --- LOCAL IMAGE PROCESSING CALLBACKS ---
 @app.callback(
@@ -2279,13 +2860,17 @@ def download_web_zip_callback(n_clicks_dl_zip, web_store_data):
      Output('uploaded-local-images-store', 'data')],
     [Input('local-image-uploader', 'contents')],
     [State('local-image-uploader', 'filename'),
-     State('local-image-uploader', 'last_modified')],
+     State('local-image-uploader', 'last_modified'),
+     State('uploaded-local-images-store', 'data')],
     prevent_initial_call=True
 )
-def update_local_image_upload_list(list_of_image_contents, list_of_image_names, list_of_image_dates):
+def update_local_image_upload_list(list_of_image_contents, list_of_image_names, list_of_image_dates, previous_image_files_data):
     if list_of_image_contents is not None:
-        new_image_files_data = [{'filename': n, 'last_modified': d, 'content': c} 
-                              for c, n, d in zip(list_of_image_contents, list_of_image_names, list_of_image_dates)]
+        delete_uploaded_files(item.get('path') for item in previous_image_files_data or [])
+        # Decode/write each upload on the decode pool; the store only carries file paths, not the base64 blobs
+        saved_paths = list(upload_decode_executor.map(save_uploaded_file, list_of_image_contents, list_of_image_names))
+        new_image_files_data = [{'filename': n, 'last_modified': d, 'path': p} 
+                              for p, n, d in zip(saved_paths, list_of_image_names, list_of_image_dates)]
         status_message_display = html.Div([
             html.P(f"{len(new_image_files_data)} image(s) selected:"),
             html.Ul([html.Li(data['filename']) for data in new_image_files_data], style={'maxHeight':'100px', 'overflowY':'auto'})
@@ -2299,62 +2884,57 @@ def update_local_image_upload_list(list_of_image_contents, list_of_image_names,
      Output('local-image-download-zip-button', 'style'),
      Output('processing-flags-store', 'data', allow_duplicate=True)],
     [Input('local-image-process-button', 'n_clicks')],
-    [State('uploaded-local-images-store', 'data'),
-     State('processing-flags-store', 'data')],
+    [State('uploaded-local-images-store', 'data')],
     prevent_initial_call=True
 )
-def process_local_images_callback(n_clicks_process_local, local_uploaded_files_data, current_processing_flags):
-    global ffmpeg_path_global, LOCAL_IMAGES_OUTPUT_FOLDER 
+def process_local_images_callback(n_clicks_process_local, local_uploaded_files_data):
+    global LOCAL_IMAGES_OUTPUT_FOLDER 
 
     ctx = dash.callback_context
-    if not n_clicks_process_local or not ctx.triggered or ctx.triggered[0]['prop_id'].split('.')[0] != 'local-image-process-button':
+    if not n_clicks_process_local or ctx.triggered_id != 'local-image-process-button':
         return dash.no_update, dash.no_update, dash.no_update, dash.no_update
 
-    hidden_btn_style = {**button_style, 'display': 'none'}
-    visible_btn_style = {**button_style, 'display': 'inline-block'}
+    hidden_btn_style = hidden_button_style
+    visible_btn_style = visible_button_style
     
-    if current_processing_flags.get('scraping') or \
-       current_processing_flags.get('local_processing') or \
-       current_processing_flags.get('pdf_processing'):
-        return html.P("Another data processing operation (scrape, local, or PDF) is active. Please wait.", style={'color': 'orange'}), dash.no_update, hidden_btn_style, dash.no_update
     if not local_uploaded_files_data:
         return html.P("No images uploaded to process.", style={'color': 'red'}), dash.no_update, hidden_btn_style, dash.no_update
+    if not try_begin_processing('local_processing'):
+        return html.P("Another data processing operation (scrape, local, or PDF) is active. Please wait.", style={'color': 'orange'}), dash.no_update, hidden_btn_style, dash.no_update
 
-    updated_flags = current_processing_flags.copy()
-    updated_flags['local_processing'] = True
-    output_store_data_local_img = {'timestamp': None, 'zip_bytes': None, 'zip_name': None}
+    output_store_data_local_img = {'timestamp': None, 'zip_path': None, 'zip_name': None, 'zip_url': None}
     zip_style_local_img = hidden_btn_style
     status_msg_local_img = html.P("Processing local images...", style={'color': 'lightblue'})
     processed_image_paths_local = []
 
     try:
         add_log(f"Local Img Proc: Starting for {len(local_uploaded_files_data)} files.", "info")
-        if not ffmpeg_path_global: find_ffmpeg_on_startup() 
-        if not os.path.exists(LOCAL_IMAGES_OUTPUT_FOLDER): os.makedirs(LOCAL_IMAGES_OUTPUT_FOLDER)
-
-        for i, file_data_item in enumerate(local_uploaded_files_data):
-            content_type_local, content_string_local = file_data_item['content'].split(',')
-            img_bytes_local = base64.b64decode(content_string_local)
-            base_name_local = sanitize_filename(f"{i}_{os.path.splitext(file_data_item['filename'])[0]}") 
-            path_local = process_single_image(img_bytes_local, base_name_local, LOCAL_IMAGES_OUTPUT_FOLDER, ffmpeg_path_global) 
-            
-            if path_local and path_local != "FFmpeg required": 
-                processed_image_paths_local.append(path_local)
-            elif path_local == "FFmpeg required": 
-                add_log(f"FFmpeg needed for local image {file_data_item['filename']}, but conversion failed or FFmpeg not found.", "warning")
+
+        # Decode/resize fans out over iter_processed_images' worker pool (processes for bigger batches); uploaded files are read lazily as submitted
+        local_image_jobs = ((i, read_uploaded_file(file_data_item.get('path'))) for i, file_data_item in enumerate(local_uploaded_files_data))
+        indexed_paths_local = []
+        for i, jpeg_bytes_local, failure_reason_local in iter_processed_images(local_image_jobs, get_ffmpeg_path(), job_count=len(local_uploaded_files_data)):
+            file_name_local = local_uploaded_files_data[i]['filename']
+            path_local = write_processed_image(jpeg_bytes_local, sanitize_filename(f"{i}_{os.path.splitext(file_name_local)[0]}"), LOCAL_IMAGES_OUTPUT_FOLDER) if jpeg_bytes_local else None
+            if path_local: 
+                indexed_paths_local.append((i, path_local))
+            elif failure_reason_local == "FFmpeg required": 
+                add_log(f"FFmpeg needed for local image {file_name_local}, but conversion failed or FFmpeg not found.", "warning")
             else: 
-                add_log(f"Failed to process local image: {file_data_item['filename']}", "warning")
+                add_log(f"Failed to process local image: {file_name_local} ({failure_reason_local or 'write failed'})", "warning")
+        processed_image_paths_local = [path_local for _, path_local in sorted(indexed_paths_local)] # upload order in the ZIP
         
         if processed_image_paths_local:
-            zip_buffer_local = io.BytesIO()
+            zip_path_local = new_output_file_path('.zip')
             zip_filename_local = f"processed_local_images_{time.strftime('%Y%m%d%H%M%S')}.zip"
-            with zipfile.ZipFile(zip_buffer_local, 'w', zipfile.ZIP_DEFLATED) as zf_local:
-                for p_local in processed_image_paths_local: zf_local.write(p_local, arcname=os.path.basename(p_local))
+            with zipfile.ZipFile(zip_path_local, 'w', zipfile.ZIP_STORED, allowZip64=True) as zf_local: # JPEGs, stored like the web images ZIP; streamed to disk
+                for p_local in processed_image_paths_local: write_stored_zip_member(zf_local, p_local)
             
             output_store_data_local_img.update({
                 'timestamp': time.time(),
-                'zip_bytes': base64.b64encode(zip_buffer_local.getvalue()).decode(),
-                'zip_name': zip_filename_local
+                'zip_path': zip_path_local,
+                'zip_name': zip_filename_local,
+                'zip_url': output_file_url(zip_path_local, zip_filename_local)
             })
             zip_style_local_img = visible_btn_style
             status_msg_local_img = html.P(f"Processed {len(processed_image_paths_local)} images. ZIP ready.", style={'color': 'green'})
@@ -2364,38 +2944,54 @@ def process_local_images_callback(n_clicks_process_local, local_uploaded_files_d
             add_log("Local Img Proc: No images successfully processed.", "warning")
             
     except Exception as e_local_img:
-        detailed_error_local_img = traceback.format_exc()
-        add_log(f"Local Img Proc: CRITICAL ERROR: {e_local_img}\n{detailed_error_local_img}", "error")
+        add_log_exception(f"Local Img Proc: CRITICAL ERROR: {e_local_img}")
         status_msg_local_img = html.P(f"Error processing local images: {e_local_img}", style={'color': 'red'})
     finally:
-        updated_flags['local_processing'] = False
+        updated_flags = end_processing('local_processing')
         
     return status_msg_local_img, output_store_data_local_img, zip_style_local_img, updated_flags
 
-@app.callback(
-    Output("download-zip-local", "data"), 
-    Input("local-image-download-zip-button", "n_clicks"), 
-    State("local-image-output-store", "data"), 
-    prevent_initial_call=True
+app.clientside_callback(
+    "function(data) { return (data && data.zip_url) || null; }",
+    Output('local-image-download-zip-button', 'href'),
+    Input('local-image-output-store', 'data')
 )
-def download_local_images_zip_callback(n_clicks_dl_local_zip, local_img_store_data):
-    if not n_clicks_dl_local_zip or not local_img_store_data or not local_img_store_data.get('zip_bytes'):
-        raise dash.exceptions.PreventUpdate
-    return dict(content=local_img_store_data['zip_bytes'], filename=local_img_store_data.get('zip_name', 'local_images.zip'), base64=True)
 
 # --- PDF PROCESSING CALLBACKS ---
+# Re-selecting the same PDFs (same names, dates and sizes as the saved uploads) stays in the browser: nothing is sent or decoded again
+app.clientside_callback(
+    """
+    function(contents, filenames, lastModified, savedFiles) {
+        if (!contents) throw window.dash_clientside.PreventUpdate;
+        const unchanged = savedFiles && savedFiles.length === contents.length && savedFiles.every((saved, i) =>
+            saved.filename === filenames[i] && saved.last_modified === lastModified[i] && saved.size === contents[i].length);
+        return unchanged ? window.dash_clientside.no_update : contents;
+    }
+    """,
+    Output('pdf-upload-pending-store', 'data'),
+    Input('pdf-file-uploader', 'contents'),
+    [State('pdf-file-uploader', 'filename'),
+     State('pdf-file-uploader', 'last_modified'),
+     State('uploaded-pdf-files-store', 'data')],
+    prevent_initial_call=True
+)
+
 @app.callback(
     [Output('pdf-upload-status', 'children'),
      Output('uploaded-pdf-files-store', 'data')],
-    [Input('pdf-file-uploader', 'contents')],
+    [Input('pdf-upload-pending-store', 'data')],
     [State('pdf-file-uploader', 'filename'),
-     State('pdf-file-uploader', 'last_modified')],
+     State('pdf-file-uploader', 'last_modified'),
+     State('uploaded-pdf-files-store', 'data')],
     prevent_initial_call=True
 )
-def update_pdf_upload_list(list_of_pdf_contents, list_of_pdf_names, list_of_pdf_dates):
+def update_pdf_upload_list(list_of_pdf_contents, list_of_pdf_names, list_of_pdf_dates, previous_pdf_files_data):
     if list_of_pdf_contents is not None:
-        new_pdf_files_data = [{'filename': n, 'last_modified': d, 'content': c} 
-                             for c, n, d in zip(list_of_pdf_contents, list_of_pdf_names, list_of_pdf_dates)]
+        delete_uploaded_files(item.get('path') for item in previous_pdf_files_data or [])
+        # Same as image uploads: decode once into UPLOADED_FILES_DIR, the store only carries the paths
+        saved_paths = list(upload_decode_executor.map(save_uploaded_file, list_of_pdf_contents, list_of_pdf_names))
+        new_pdf_files_data = [{'filename': n, 'last_modified': d, 'size': len(c), 'path': p} # size: data URL length, compared clientside
+                             for p, n, d, c in zip(saved_paths, list_of_pdf_names, list_of_pdf_dates, list_of_pdf_contents)]
         status_message_pdf_upload = html.Div([
             html.P(f"{len(new_pdf_files_data)} PDF(s) selected:"),
             html.Ul([html.Li(data['filename']) for data in new_pdf_files_data], style={'maxHeight':'100px', 'overflowY':'auto'})
@@ -2403,13 +2999,6 @@ def update_pdf_upload_list(list_of_pdf_contents, list_of_pdf_names, list_of_pdf_
         return status_message_pdf_upload, new_pdf_files_data
     return html.P("Drag and drop or select PDF files to process."), []
 
-class MockUploadedFile: 
-    def __init__(self, name, content_bytes):
-        self.name = name
-        self._content_bytes = content_bytes
-    def getvalue(self):
-        return self._content_bytes
-
 @app.callback(
     [Output('pdf-status-placeholder', 'children'),
      Output('pdf-output-store', 'data'),
@@ -2418,109 +3007,82 @@ class MockUploadedFile:
      Output('processing-flags-store', 'data', allow_duplicate=True)],
     [Input('pdf-process-button', 'n_clicks')],
     [State('uploaded-pdf-files-store', 'data'),
-     State('pdf-country-dropdown', 'value'),
-     State('processing-flags-store', 'data')],
+     State('pdf-country-dropdown', 'value')],
     prevent_initial_call=True
 )
-def process_pdf_files_callback(n_clicks_process_pdf, pdf_uploaded_store_data, selected_country_for_pdf, current_processing_flags):
-    global ffmpeg_path_global, PDF_IMAGES_OUTPUT_FOLDER 
+def process_pdf_files_callback(n_clicks_process_pdf, pdf_uploaded_store_data, selected_country_for_pdf):
+    global PDF_IMAGES_OUTPUT_FOLDER 
 
     ctx = dash.callback_context
-    if not n_clicks_process_pdf or not ctx.triggered or ctx.triggered[0]['prop_id'].split('.')[0] != 'pdf-process-button':
+    if not n_clicks_process_pdf or ctx.triggered_id != 'pdf-process-button':
         return dash.no_update, dash.no_update, dash.no_update, dash.no_update, dash.no_update
 
-    hidden_btn_style = {**button_style, 'display': 'none'}
-    visible_btn_style = {**button_style, 'display': 'inline-block', 'marginRight':'5px'}
+    hidden_btn_style = hidden_button_style
+    visible_btn_style = visible_button_style_spaced
     
-    if current_processing_flags.get('scraping') or \
-       current_processing_flags.get('local_processing') or \
-       current_processing_flags.get('pdf_processing'):
-        return html.P("Another data processing operation (scrape, local, or PDF) is active. Please wait.", style={'color': 'orange'}), dash.no_update, hidden_btn_style, hidden_btn_style, dash.no_update
     if not pdf_uploaded_store_data:
         return html.P("No PDF files uploaded to process.", style={'color': 'red'}), dash.no_update, hidden_btn_style, hidden_btn_style, dash.no_update
+    pdf_files_for_processing = [] # (path, filename): the PDF workers open the saved uploads themselves
+    for file_data_pdf in pdf_uploaded_store_data:
+        pdf_path = file_data_pdf.get('path')
+        try: has_content = is_uploaded_file(pdf_path) and os.path.getsize(pdf_path) > 0
+        except OSError: has_content = False # deleted meanwhile by a newer upload selection
+        if has_content: pdf_files_for_processing.append((pdf_path, file_data_pdf['filename']))
+        else: add_log(f"PDF Proc: No content for uploaded file {file_data_pdf['filename']}.", "error")
+    if not pdf_files_for_processing:
+        return html.P("No valid PDF content found in the uploaded files.", style={'color': 'red'}), dash.no_update, hidden_btn_style, hidden_btn_style, dash.no_update
+    if not try_begin_processing('pdf_processing'):
+        return html.P("Another data processing operation (scrape, local, or PDF) is active. Please wait.", style={'color': 'orange'}), dash.no_update, hidden_btn_style, hidden_btn_style, dash.no_update
 
-    updated_flags = current_processing_flags.copy()
-    updated_flags['pdf_processing'] = True
-    output_store_data_pdf = {'timestamp': None, 'excel_bytes': None, 'excel_name': None, 'zip_bytes': None, 'zip_name': None}
+    output_store_data_pdf = {'timestamp': None, 'excel_path': None, 'excel_name': None, 'excel_url': None, 'zip_path': None, 'zip_name': None, 'zip_url': None}
     excel_style_pdf = hidden_btn_style
     zip_style_pdf = hidden_btn_style
     status_msg_pdf = html.P("Processing PDF files...", style={'color': 'lightblue'})
-    
-    mock_pdf_files_for_processing = []
-    for file_data_pdf in pdf_uploaded_store_data:
-        try:
-            content_string_pdf = file_data_pdf['content'].split(',')[1]
-            pdf_bytes_content = base64.b64decode(content_string_pdf)
-            mock_pdf_files_for_processing.append(MockUploadedFile(file_data_pdf['filename'], pdf_bytes_content))
-        except Exception as e_b64_decode_pdf:
-            add_log(f"PDF Proc: Error decoding base64 content for {file_data_pdf['filename']}: {e_b64_decode_pdf}", "error")
-    
-    if not mock_pdf_files_for_processing:
-         status_msg_pdf = html.P("No valid PDF content found in uploaded files after attempting to decode.", style={'color': 'red'})
-         updated_flags['pdf_processing'] = False
-         return status_msg_pdf, output_store_data_pdf, excel_style_pdf, zip_style_pdf, updated_flags
 
     try:
-        add_log(f"PDF Proc: Starting for {len(mock_pdf_files_for_processing)} files, Country output format: {selected_country_for_pdf}", "info")
-        if not ffmpeg_path_global: find_ffmpeg_on_startup() 
+        add_log(f"PDF Proc: Starting for {len(pdf_files_for_processing)} files, Country output format: {selected_country_for_pdf}", "info")
         
-        df_pdf_data_processed, all_pdf_extracted_image_paths = process_extracted_pdf_data(mock_pdf_files_for_processing, selected_country_for_pdf) 
+        df_pdf_data_processed, all_pdf_extracted_image_paths = process_extracted_pdf_data(pdf_files_for_processing, selected_country_for_pdf) 
 
         if df_pdf_data_processed is None or df_pdf_data_processed.empty:
             status_msg_pdf = html.P("PDF processing failed or yielded no item data. Check logs.", style={'color': 'orange'})
             add_log("PDF Proc: df_pdf_data_processed is None or empty after extraction.", "warning")
         else:
             add_log(f"PDF Proc: Data extracted ({df_pdf_data_processed.shape[0]} items). Creating output files...", "info")
-            excel_bytes_pdf, excel_name_pdf, zip_bytes_pdf, zip_name_pdf = create_output_files( 
+            excel_path_pdf, excel_name_pdf, zip_path_pdf, zip_name_pdf = create_output_files( 
                 df_pdf_data_processed, all_pdf_extracted_image_paths, PDF_IMAGES_OUTPUT_FOLDER, selected_country_for_pdf
             )
             
             output_store_data_pdf['timestamp'] = time.time()
             files_generated_pdf = False
-            if excel_bytes_pdf:
-                output_store_data_pdf.update({'excel_bytes': base64.b64encode(excel_bytes_pdf).decode(), 'excel_name': excel_name_pdf})
+            if excel_path_pdf:
+                output_store_data_pdf.update({'excel_path': excel_path_pdf, 'excel_name': excel_name_pdf, 'excel_url': output_file_url(excel_path_pdf, excel_name_pdf)})
                 excel_style_pdf = visible_btn_style
                 files_generated_pdf = True
-            if zip_bytes_pdf and all_pdf_extracted_image_paths:
-                output_store_data_pdf.update({'zip_bytes': base64.b64encode(zip_bytes_pdf).decode(), 'zip_name': zip_name_pdf})
+            if zip_path_pdf and all_pdf_extracted_image_paths:
+                output_store_data_pdf.update({'zip_path': zip_path_pdf, 'zip_name': zip_name_pdf, 'zip_url': output_file_url(zip_path_pdf, zip_name_pdf)})
                 zip_style_pdf = visible_btn_style
                 files_generated_pdf = True
             
             status_msg_pdf = html.P("PDF processing complete. Files ready." if files_generated_pdf else 
                                    "PDF processing done, but no files to download (or no images to zip).", 
                                    style={'color': 'green' if files_generated_pdf else 'orange'})
-            add_log(f"PDF Proc: Complete. Excel: {'Yes' if excel_bytes_pdf else 'No'}, Images ZIP: {'Yes' if zip_bytes_pdf and all_pdf_extracted_image_paths else 'No'}", "info")
+            add_log(f"PDF Proc: Complete. Excel: {'Yes' if excel_path_pdf else 'No'}, Images ZIP: {'Yes' if zip_path_pdf and all_pdf_extracted_image_paths else 'No'}", "info")
 
     except Exception as e_pdf_proc_main:
-        detailed_error_pdf_main = traceback.format_exc()
-        add_log(f"PDF Proc: CRITICAL ERROR: {e_pdf_proc_main}\n{detailed_error_pdf_main}", "error")
+        add_log_exception(f"PDF Proc: CRITICAL ERROR: {e_pdf_proc_main}")
         status_msg_pdf = html.P(f"Error processing PDFs: {e_pdf_proc_main}", style={'color': 'red'})
     finally:
-        updated_flags['pdf_processing'] = False
+        updated_flags = end_processing('pdf_processing')
         
     return status_msg_pdf, output_store_data_pdf, excel_style_pdf, zip_style_pdf, updated_flags
 
-@app.callback(
-    Output("download-excel-pdf", "data"), 
-    Input("pdf-download-excel-button", "n_clicks"), 
-    State("pdf-output-store", "data"), 
-    prevent_initial_call=True
-)
-def download_pdf_excel_callback(n_clicks_dl_pdf_excel, pdf_store_data_dl):
-    if not n_clicks_dl_pdf_excel or not pdf_store_data_dl or not pdf_store_data_dl.get('excel_bytes'):
-        raise dash.exceptions.PreventUpdate
-    return dict(content=pdf_store_data_dl['excel_bytes'], filename=pdf_store_data_dl.get('excel_name', 'pdf_extracted_data.xlsx'), base64=True)
-
-@app.callback(
-    Output("download-zip-pdf", "data"), 
-    Input("pdf-download-zip-button", "n_clicks"), 
-    State("pdf-output-store", "data"), 
-    prevent_initial_call=True
+app.clientside_callback(
+    "function(data) { data = data || {}; return [data.excel_url || null, data.zip_url || null]; }",
+    [Output('pdf-download-excel-button', 'href'),
+     Output('pdf-download-zip-button', 'href')],
+    Input('pdf-output-store', 'data')
 )
-def download_pdf_images_zip_callback(n_clicks_dl_pdf_zip, pdf_store_data_zip):
-    if not n_clicks_dl_pdf_zip or not pdf_store_data_zip or not pdf_store_data_zip.get('zip_bytes'):
-        raise dash.exceptions.PreventUpdate
-    return dict(content=pdf_store_data_zip['zip_bytes'], filename=pdf_store_data_zip.get('zip_name', 'pdf_extracted_images.zip'), base64=True)
 
 
 # --- UPDATED CALLBACK FOR DAILY LOG AND LEADERBOARDS (Bot, Daily, Monthly) ---
@@ -2541,6 +3103,8 @@ def download_pdf_images_zip_callback(n_clicks_dl_pdf_zip, pdf_store_data_zip):
      State('year-picker', 'value'),
      State('daily-leaderboard-table', 'data'), 
      State('sidebar-data-store', 'data')],
+    running=[(Output('load-log-button', 'disabled'), True, False),
+             (Output('load-monthly-leaderboard-button', 'disabled'), True, False)], # No stacked reloads while one is in flight
     prevent_initial_call=True
 )
 def update_sidebar_reports(
@@ -2549,7 +3113,7 @@ def update_sidebar_reports(
     daily_leaderboard_current_data, current_sidebar_data 
 ):
     ctx = dash.callback_context
-    triggered_id = ctx.triggered[0]['prop_id'].split('.')[0] if ctx.triggered else None
+    triggered_id = ctx.triggered_id
 
     # Initialize outputs
     bot_table_component = dash.no_update
@@ -2559,9 +3123,7 @@ def update_sidebar_reports(
     daily_case_details_component = dash.no_update
     monthly_leaderboard_component = dash.no_update # This will hold the full DataTable or a message
     
-    sidebar_store_output = current_sidebar_data if current_sidebar_data else \
-                           {'timestamp': None, 'bot_log_data': None, 'leaderboard_data': None, 
-                            'monthly_leaderboard_data': None, 'daily_leaderboard_case_details_log': None}
+    sidebar_store_output = {'timestamp': None, 'daily_leaderboard_case_details_log': (current_sidebar_data or {}).get('daily_leaderboard_case_details_log')}
     if triggered_id: 
         sidebar_store_output['timestamp'] = time.time()
 
@@ -2579,19 +3141,17 @@ def update_sidebar_reports(
             return error_msg, [], default_daily_lb_columns, error_msg, html.Div(), dash.no_update, sidebar_store_output
 
         try:
-            df_log_full = get_case_log_df() 
+            df_log_full = get_parsed_case_log_df() 
             if df_log_full.empty:
                 error_msg = html.P("Case activity log file is empty.", style={'color':'orange'})
                 return error_msg, [], default_daily_lb_columns, error_msg, html.Div(), dash.no_update, sidebar_store_output
 
-            df_proc_daily = df_log_full.copy()
-            if 'Date' not in df_proc_daily.columns:
+            if 'Date' not in df_log_full.columns:
                 error_msg = html.P("Error: 'Date' column missing in log.", style={'color':'red'})
                 return error_msg, [], default_daily_lb_columns, error_msg, html.Div(), dash.no_update, sidebar_store_output
             
-            df_proc_daily['Date_dt'] = pd.to_datetime(df_proc_daily['Date'], errors='coerce').dt.date
-            selected_dt_obj = pd.to_datetime(selected_date_str).date()
-            df_filtered_for_day = df_proc_daily[df_proc_daily['Date_dt'] == selected_dt_obj].copy()
+            selected_day_ts = pd.Timestamp(selected_date_str).normalize()
+            df_filtered_for_day = get_case_log_period_rows('day_rows', selected_day_ts)
 
             if df_filtered_for_day.empty:
                 no_activity_msg = html.P(f"No activity found for {selected_date_str}.", style={'color':'orange'})
@@ -2599,23 +3159,16 @@ def update_sidebar_reports(
                 daily_lb_data_out = []
                 daily_lb_columns_out = default_daily_lb_columns
                 daily_lb_status_msg_out = no_activity_msg
-                sidebar_store_output['bot_log_data'] = None
-                sidebar_store_output['leaderboard_data'] = None 
                 sidebar_store_output['daily_leaderboard_case_details_log'] = None
             else:
                 # Bot Activity
-                bot_user_id = "BOT_CLAIMED" 
-                df_bot_activity_day = df_filtered_for_day[df_filtered_for_day['Assigned User'].astype(str).str.contains(bot_user_id, na=False, case=False)]
-                if not df_bot_activity_day.empty:
-                    bot_cols = ['Observed Timestamp', 'Case Display ID', 'Country', 'Status (Observed)', 'Account Name', 'Duration (HH:MM:SS)']
-                    bot_cols_exist = [c for c in bot_cols if c in df_bot_activity_day.columns]
-                    bot_df_display = df_bot_activity_day[bot_cols_exist].fillna("N/A")
+                bot_activity_records = get_bot_activity_records(selected_day_ts)
+                if bot_activity_records:
                     bot_table_component = dash_table.DataTable(
-                        columns=[{"name": i, "id": i} for i in bot_df_display.columns], data=bot_df_display.to_dict('records'),
+                        columns=[{"name": i, "id": i} for i in bot_activity_records[0]], data=bot_activity_records,
                         style_cell={'textAlign': 'left', 'backgroundColor': '#252526', 'color': '#E0E0E0', 'border': '1px solid #3E3E3E', 'fontSize': '11px', 'whiteSpace': 'normal', 'height': 'auto', 'minWidth': '50px', 'maxWidth': '130px', 'overflow': 'hidden', 'textOverflow': 'ellipsis'},
                         style_header={'backgroundColor': '#4CAF50', 'fontWeight': 'bold', 'color': 'white'}, page_size=5, sort_action="native"
                     )
-                    sidebar_store_output['bot_log_data'] = bot_df_display.to_dict('records')
                 else:
                     bot_table_component = html.P(f"No bot activity for {selected_date_str}.")
 
@@ -2627,68 +3180,31 @@ def update_sidebar_reports(
                     daily_lb_status_msg_out = html.P(f"Leaderboard error: Missing columns on {selected_date_str}.", style={'color':'red'})
                     daily_lb_data_out = []
                     daily_lb_columns_out = default_daily_lb_columns
-                    sidebar_store_output['leaderboard_data'] = None
                     sidebar_store_output['daily_leaderboard_case_details_log'] = None
                 else:
-                    df_day_lb = df_filtered_for_day.copy() 
-                    try: 
-                        df_day_lb[obs_ts_col] = pd.to_datetime(df_day_lb[obs_ts_col], errors='coerce')
-                    except Exception as e_ts_daily_lb_load_fix: 
-                        add_log(f"Leaderboard (Daily Load): Warning converting '{obs_ts_col}': {e_ts_daily_lb_load_fix}", "warning")
-                    
-                    df_day_lb[case_id_col] = df_day_lb[case_id_col].astype(str)
-                    df_day_lb[status_col] = df_day_lb[status_col].astype(str).str.strip().str.lower() 
-                    df_day_lb[user_col] = df_day_lb[user_col].astype(str).str.strip()
-
-                    if pd.api.types.is_datetime64_any_dtype(df_day_lb[obs_ts_col]) and not df_day_lb[obs_ts_col].isnull().all():
-                        df_day_lb.sort_values(by=[case_id_col, obs_ts_col], inplace=True, na_position='first')
-                    else:
-                        df_day_lb.sort_values(by=[case_id_col], inplace=True, na_position='first')
-                    
-                    user_scores_day = {}
-                    counted_case_ids_day = set()
-                    daily_leaderboard_details_for_store = {} 
-
-                    for _, row in df_day_lb.iterrows():
-                        case_id = row[case_id_col]
-                        status = row[status_col]
-                        user = row[user_col]
-                        is_bot = bot_user_id.lower() in user.lower() if user else True
-                        if not user or user.lower() == 'n/a' or user == "" or is_bot: continue
-
-                        if status == "inprogress" and case_id not in counted_case_ids_day:
-                            user_scores_day[user] = user_scores_day.get(user, 0) + 1
-                            counted_case_ids_day.add(case_id)
-                            if user not in daily_leaderboard_details_for_store:
-                                daily_leaderboard_details_for_store[user] = []
-                            daily_leaderboard_details_for_store[user].append(case_id)
-                    
-                    sidebar_store_output['daily_leaderboard_case_details_log'] = daily_leaderboard_details_for_store
-
-                    if user_scores_day:
-                        lb_df_day = pd.DataFrame(list(user_scores_day.items()), columns=['Assigned User', 'Cases to InProgress'])
-                        lb_df_day.sort_values(by='Cases to InProgress', ascending=False, inplace=True)
+                    df_day_lb = leaderboard_candidate_rows(df_filtered_for_day, case_id_col, obs_ts_col, user_col)
+                    counted_rows_day = first_inprogress_rows(df_day_lb, case_id_col)
+                    sidebar_store_output['daily_leaderboard_case_details_log'] = counted_rows_day.groupby(user_col, sort=False, observed=True)[case_id_col].agg(list).to_dict()
+
+                    if not counted_rows_day.empty:
+                        lb_df_day = leaderboard_from_rows(counted_rows_day, user_col)
                         
                         daily_lb_data_out = lb_df_day.to_dict('records')
                         daily_lb_columns_out = [{"name": i, "id": i} for i in lb_df_day.columns]
                         daily_lb_status_msg_out = None 
-                        sidebar_store_output['leaderboard_data'] = lb_df_day.to_dict('records')
                     else:
                         daily_lb_data_out = []
                         daily_lb_columns_out = default_daily_lb_columns
                         daily_lb_status_msg_out = html.P(f"No 'InProgress' transitions for users on {selected_date_str}.")
-                        sidebar_store_output['leaderboard_data'] = None
         except Exception as e_daily:
             error_msg_daily_text = f"Error loading daily log for {selected_date_str}: {e_daily}"
             error_msg_daily_comp = html.P(error_msg_daily_text, style={'color':'red'})
-            add_log(f"Sidebar: Error processing daily log: {e_daily}\n{traceback.format_exc()}", "error")
+            add_log_exception(f"Sidebar: Error processing daily log: {e_daily}")
             bot_table_component = error_msg_daily_comp
             daily_lb_data_out = []
             daily_lb_columns_out = default_daily_lb_columns
             daily_lb_status_msg_out = error_msg_daily_comp
             daily_case_details_component = html.Div()
-            sidebar_store_output['bot_log_data'] = None
-            sidebar_store_output['leaderboard_data'] = None
             sidebar_store_output['daily_leaderboard_case_details_log'] = None
         
     elif triggered_id == 'daily-leaderboard-table' and active_cell_daily and daily_leaderboard_current_data: # daily_leaderboard_current_data is from State
@@ -2727,76 +3243,40 @@ def update_sidebar_reports(
             monthly_leaderboard_component = html.P("Please select both month and year.", style={'color':'red'})
         else:
             try:
-                df_log_full_monthly = get_case_log_df()
+                df_log_full_monthly = get_parsed_case_log_df()
                 if df_log_full_monthly.empty:
                     monthly_leaderboard_component = html.P("Case activity log is empty.", style={'color':'orange'})
                 else:
-                    df_proc_monthly = df_log_full_monthly.copy()
+                    df_proc_monthly = df_log_full_monthly
                     if 'Date' not in df_proc_monthly.columns:
                          monthly_leaderboard_component = html.P("Error: 'Date' column missing in log.", style={'color':'red'})
                     else:
-                        df_proc_monthly['Date_dt'] = pd.to_datetime(df_proc_monthly['Date'], errors='coerce')
-                        df_filtered_for_month = df_proc_monthly[
-                            (df_proc_monthly['Date_dt'].dt.month == int(selected_month)) &
-                            (df_proc_monthly['Date_dt'].dt.year == int(selected_year))
-                        ].copy()
+                        df_filtered_for_month = get_case_log_period_rows('month_rows', pd.Period(year=int(selected_year), month=int(selected_month), freq='M'))
 
                         if df_filtered_for_month.empty:
                             month_name = datetime(2000,int(selected_month),1).strftime('%B') if selected_month else "Selected Month"
                             monthly_leaderboard_component = html.P(f"No activity found for {month_name} {selected_year}.", style={'color':'orange'})
-                            sidebar_store_output['monthly_leaderboard_data'] = None
                         else:
                             obs_ts_col, case_id_col, status_col, user_col = 'Observed Timestamp', 'Case Display ID', 'Status (Observed)', 'Assigned User'
                             req_cols_monthly = [obs_ts_col, case_id_col, status_col, user_col]
                             if not all(col in df_filtered_for_month.columns for col in req_cols_monthly):
                                 monthly_leaderboard_component = html.P(f"Monthly Leaderboard error: Missing columns.", style={'color':'red'})
                             else:
-                                try: 
-                                    df_filtered_for_month[obs_ts_col] = pd.to_datetime(df_filtered_for_month[obs_ts_col], errors='coerce')
-                                except Exception as e_ts_monthly_load_fix: 
-                                    add_log(f"Leaderboard (Monthly Load): Warning converting '{obs_ts_col}': {e_ts_monthly_load_fix}", "warning")
-
-                                df_filtered_for_month[case_id_col] = df_filtered_for_month[case_id_col].astype(str)
-                                df_filtered_for_month[status_col] = df_filtered_for_month[status_col].astype(str).str.strip().str.lower() # Corrected typo
-                                df_filtered_for_month[user_col] = df_filtered_for_month[user_col].astype(str).str.strip()
-
-                                if pd.api.types.is_datetime64_any_dtype(df_filtered_for_month[obs_ts_col]) and not df_filtered_for_month[obs_ts_col].isnull().all():
-                                     df_filtered_for_month.sort_values(by=[case_id_col, obs_ts_col], inplace=True, na_position='first')
-                                else:
-                                     df_filtered_for_month.sort_values(by=[case_id_col], inplace=True, na_position='first')
-
-                                user_scores_month = {}
-                                counted_case_ids_month = set()
-                                bot_user_id = "BOT_CLAIMED"
-
-                                for _, row in df_filtered_for_month.iterrows():
-                                    case_id = row[case_id_col]
-                                    status = row[status_col]
-                                    user = row[user_col]
-                                    is_bot = bot_user_id.lower() in user.lower() if user else True
-                                    if not user or user.lower() == 'n/a' or user == "" or is_bot: continue
-
-                                    if status == "inprogress" and case_id not in counted_case_ids_month:
-                                        user_scores_month[user] = user_scores_month.get(user, 0) + 1
-                                        counted_case_ids_month.add(case_id)
-                                
-                                if user_scores_month:
-                                    lb_df_month = pd.DataFrame(list(user_scores_month.items()), columns=['Assigned User', 'Cases to InProgress'])
-                                    lb_df_month.sort_values(by='Cases to InProgress', ascending=False, inplace=True)
+                                df_month_lb = leaderboard_candidate_rows(df_filtered_for_month, case_id_col, obs_ts_col, user_col)
+                                counted_rows_month = first_inprogress_rows(df_month_lb, case_id_col)
+                                if not counted_rows_month.empty:
+                                    lb_df_month = leaderboard_from_rows(counted_rows_month, user_col)
                                     monthly_leaderboard_component = dash_table.DataTable(
                                         columns=[{"name": i, "id": i} for i in lb_df_month.columns], data=lb_df_month.to_dict('records'),
                                         style_cell={'textAlign': 'left', 'backgroundColor': '#252526', 'color': '#E0E0E0', 'border': '1px solid #3E3E3E', 'fontSize': '12px'},
                                         style_header={'backgroundColor': '#007BFF', 'fontWeight': 'bold', 'color': 'white'}, page_size=10, sort_action="native"
                                     )
-                                    sidebar_store_output['monthly_leaderboard_data'] = lb_df_month.to_dict('records')
                                 else:
                                     month_name_disp = datetime(2000,int(selected_month),1).strftime('%B') if selected_month else "Selected Month"
                                     monthly_leaderboard_component = html.P(f"No 'InProgress' transitions for users in {month_name_disp} {selected_year}.")
-                                    sidebar_store_output['monthly_leaderboard_data'] = None
             except Exception as e_monthly:
                 monthly_leaderboard_component = html.P(f"Error loading monthly leaderboard: {e_monthly}", style={'color':'red'})
-                add_log(f"Sidebar: Error processing monthly leaderboard: {e_monthly}\n{traceback.format_exc()}", "error")
-                sidebar_store_output['monthly_leaderboard_data'] = None
+                add_log_exception(f"Sidebar: Error processing monthly leaderboard: {e_monthly}")
     else:
         pass
 
@@ -2812,10 +3292,10 @@ def update_sidebar_reports(
 
 # --- Application Entry Point ---
 if __name__ == '__main__':
+    multiprocessing.freeze_support() # Image worker processes in frozen (PyInstaller) builds
     add_log("Application (Dash) starting...", "info")
-    find_ffmpeg_on_startup() 
-    add_log(f"FFmpeg Path (Global): {ffmpeg_path_global if 'ffmpeg_path_global' in globals() else 'Not Set'}", "info")
-    get_case_log_df() 
+    add_log(f"FFmpeg Path: {get_ffmpeg_path() or 'Not Set'}", "info") # warms the get_ffmpeg_path cache
+    get_parsed_case_log_df() # Creates/migrates the log and warms the parsed cache, so the first sidebar click doesn't pay for it
     app.run(debug=True, host='0.0.0.0', port=8050)
 
 
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+# Worker-process code for appultimabackup.py: image decode/resize and PDF extraction.
+# The app's process pool runs these in 'spawn' workers, so this module must stay free of import-time side effects (no threads,
+# temp dirs, Dash app, UI log). Workers never call add_log: they collect (message, level) pairs in a log_entries list and
+# return it, and the app process adds them to its log.
+
+# --- Python Standard Library Imports ---
+import io
+import os
+import re
+import subprocess
+import sys
+import traceback
+from collections import namedtuple
+from functools import lru_cache
+
+# --- Third-Party Library Imports ---
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+import fitz # PyMuPDF
+
+MenuItem = namedtuple('MenuItem', 'ID image_filename Category Price name_pt description_pt image_url') # one scraped row; fields line up with MENU_ITEM_COLUMNS
+IMAGE_OUTPUT_SIZE = (1200, 1200) # Menu upload format: every exported image is exactly this size
+
+FILENAME_DROP_CHARS_RE = re.compile(r'[\\/*?:"<>|]+')
+FILENAME_UNSAFE_RUN_RE = re.compile(r'[^A-Za-z0-9.-]+') # spaces, underscores and any other unsafe chars collapse into one '_'
+PDF_PRICE_RE = re.compile(r'(\€|\$|R\$|£|zł|GHS)?\s*(\d+([.,]\d{1,2})?)', re.IGNORECASE) # first number in a PDF text block, with optional currency
+
+@lru_cache(maxsize=4096) # pure; PDF item IDs re-sanitize the same file name for every row
+def sanitize_filename(name):
+    name_part, ext_part = os.path.splitext(str(name) if name is not None else '')
+    name = FILENAME_UNSAFE_RUN_RE.sub('_', FILENAME_DROP_CHARS_RE.sub('', name_part))[:100].strip('_ ')
+    return f"{name}{ext_part.lower()}" if ext_part else name
+
+# --- Image Processing ---
+def convert_image_with_ffmpeg(input_data, ffmpeg_executable_path, log_entries, output_format='png'):
+    if not ffmpeg_executable_path: log_entries.append(("DEBUG: FFmpeg Error: No executable path.", "debug")); return None
+    process = None
+    try:
+        # Input is streamed through stdin (no temp file on disk); AVIF/HEIC need a full demuxer, so one process per image is kept.
+        command = [ffmpeg_executable_path, '-y', '-loglevel', 'error', '-i', 'pipe:0', '-f', 'image2pipe', '-vcodec', output_format, 'pipe:1']
+        startupinfo = None; creationflags = 0
+        if sys.platform == "win32":
+            startupinfo = subprocess.STARTUPINFO(); startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW; startupinfo.wShowWindow = subprocess.SW_HIDE; creationflags = subprocess.CREATE_NO_WINDOW
+        process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=1 << 20, startupinfo=startupinfo, creationflags=creationflags)
+        stdout, stderr = process.communicate(input=input_data, timeout=15)
+        if process.returncode != 0: log_entries.append((f"DEBUG: FFmpeg Error (Code {process.returncode}): {stderr.decode(errors='ignore').strip()}", "debug")); return None
+        elif stderr:
+            warning_message = stderr.decode(errors='ignore').strip()
+            if warning_message and "deprecated pixel format" not in warning_message.lower(): log_entries.append((f"DEBUG: FFmpeg Warning: {warning_message}", "debug"))
+        if not stdout: log_entries.append(("DEBUG: FFmpeg Error: No output data", "debug")); return None
+        return stdout
+    except FileNotFoundError: log_entries.append((f"DEBUG: FFmpeg Error: Executable not found at '{ffmpeg_executable_path}'.", "debug")); return None
+    except subprocess.TimeoutExpired:
+        log_entries.append(("DEBUG: FFmpeg Error: Process timed out.", "debug"))
+        if process:
+            try: process.kill(); process.communicate()
+            except Exception as kill_e: log_entries.append((f"DEBUG: Exception during FFmpeg process kill: {kill_e}", "debug"))
+        return None
+    except Exception as e: log_entries.append((f"DEBUG: Error during FFmpeg processing: {e}", "debug")); return None
+
+def decode_and_resize_image(image_data, ffmpeg_path_to_use=None):
+    """Image bytes -> (1200x1200 JPEG bytes, None, log_entries) or (None, reason, log_entries).
+    reason is "FFmpeg required" when PIL cannot decode the image and no FFmpeg path was given."""
+    log_entries = []; img_to_process = None
+    try:
+        img_to_process = Image.open(io.BytesIO(image_data))
+        img_to_process.draft('RGB', (IMAGE_OUTPUT_SIZE[0] * 2, IMAGE_OUTPUT_SIZE[1] * 2)) # JPEG only: DCT-scaled decode, still >= 2x the final size for LANCZOS
+    except (IOError, Image.DecompressionBombError, SyntaxError, UnidentifiedImageError) as e:
+        if not ffmpeg_path_to_use: return None, "FFmpeg required", log_entries
+        png_data = convert_image_with_ffmpeg(image_data, ffmpeg_path_to_use, log_entries)
+        if not png_data: return None, f"PIL failed ({type(e).__name__}) and FFmpeg fallback conversion failed", log_entries
+        try: img_to_process = Image.open(io.BytesIO(png_data))
+        except Exception as e_pil_ffmpeg: return None, f"Error opening image post-FFmpeg fallback: {e_pil_ffmpeg}", log_entries
+    except Exception as e_pil: return None, f"Unexpected PIL error: {type(e_pil).__name__} - {e_pil}", log_entries
+
+    try:
+        if img_to_process.mode == 'RGBA':
+            # Alpha-blend onto white in one vectorized pass (no split() copies / paste)
+            rgba = np.asarray(img_to_process)
+            alpha = rgba[..., 3:4].astype(np.uint16)
+            rgb = (rgba[..., :3].astype(np.uint16) * alpha + 255 * (255 - alpha)) // 255
+            img_final = Image.fromarray(rgb.astype(np.uint8), 'RGB')
+        elif img_to_process.mode != 'RGB':
+            img_final = img_to_process.convert('RGB')
+        else:
+            img_final = img_to_process
+
+        # Already-final images skip resampling; big downscales reduce by box filter first (reducing_gap) before LANCZOS
+        img_resized = img_final if img_final.size == IMAGE_OUTPUT_SIZE else img_final.resize(IMAGE_OUTPUT_SIZE, Image.Resampling.LANCZOS, reducing_gap=3.0)
+        jpeg_buffer = io.BytesIO()
+        img_resized.save(jpeg_buffer, "JPEG", quality=90, optimize=True, progressive=True)
+        return jpeg_buffer.getvalue(), None, log_entries
+    except Exception as e_resize_save: return None, f"Error during resize/encode: {e_resize_save}", log_entries
+
+def write_processed_image(jpeg_bytes, output_filename_base, output_folder, log_entries=None):
+    """Writes JPEG bytes from decode_and_resize_image to <output_folder>/<output_filename_base>.jpg. Returns the path or None."""
+    output_filepath_jpg = os.path.join(output_folder, f"{output_filename_base}.jpg")
+    try:
+        with open(output_filepath_jpg, 'wb') as out_f: out_f.write(jpeg_bytes)
+        return output_filepath_jpg
+    except Exception as e_write:
+        if log_entries is not None: log_entries.append((f"DEBUG: Error saving {output_filepath_jpg}: {e_write}", "debug"))
+        return None
+
+def process_single_image(image_data, output_filename_base, output_folder, ffmpeg_path_to_use, log_entries):
+    """Processes a single image (bytes). Converts, resizes, and saves as JPEG. Returns the path or None."""
+    if not image_data:
+        log_entries.append((f"DEBUG: Skipping {output_filename_base} - No image data provided.", "debug"))
+        return None
+
+    try:
+        jpeg_bytes, failure_reason, decode_log_entries = decode_and_resize_image(image_data, ffmpeg_path_to_use)
+        log_entries.extend(decode_log_entries)
+        if failure_reason == "FFmpeg required":
+            log_entries.append((f"DEBUG: PIL failed for {output_filename_base}, FFmpeg needed but not found/configured.", "debug"))
+            return None
+        if not jpeg_bytes:
+            log_entries.append((f"DEBUG: Image processing failed for {output_filename_base}: {failure_reason}", "debug"))
+            return None
+        return write_processed_image(jpeg_bytes, output_filename_base, output_folder, log_entries)
+    except Exception as e_outer:
+        log_entries.append((f"DEBUG: Unexpected error processing image {output_filename_base}: {e_outer}", "error"))
+        return None
+
+# --- PDF Processing ---
+def extract_text_and_images_from_pdf(pdf_path, pdf_name, output_folder, ffmpeg_path_to_use=None):
+    """Extracts text blocks and images (saved to output_folder) from a PDF file on disk.
+    Returns (items, image_paths, log_entries)."""
+    extracted_items = []
+    extracted_images_paths = []
+    seen_image_filenames = set()
+    log_entries = []
+    doc = None
+    _internal_pdf_item_counter = 1
+
+    try:
+        doc = fitz.open(pdf_path, filetype="pdf") # read by the worker itself, so the PDF bytes never go through the pool's pipe
+        log_entries.append((f"PDF '{pdf_name}': Opened with {doc.page_count} pages.", "info"))
+        sanitized_pdf_name = sanitize_filename(os.path.splitext(pdf_name)[0])
+
+        for page_num in range(len(doc)):
+            page = doc.load_page(page_num)
+
+            # "blocks" is tokenized by MuPDF into (x0, y0, x1, y1, text, block_no, type) tuples; cheaper than "dict" mode, which builds per-span dicts
+            for block_text in [block[4] for block in page.get_text("blocks") if block[6] == 0]:
+                text = ' '.join(block_text.split()) # whitespace runs (incl. newlines) -> one space, same as normalized_text()
+                if len(text) <= 5: continue
+                lines = block_text.strip().split('\n')
+                item_name_scraped = lines[0].strip()
+                item_desc = " ".join(lines[1:]).strip() if len(lines) > 1 else ""
+
+                id_for_excel = item_name_scraped if item_name_scraped else f"PDF_{sanitize_filename(pdf_name)}_Item_{_internal_pdf_item_counter}"
+
+                price_match = PDF_PRICE_RE.search(text)
+                item_price = price_match.group(0).strip() if price_match else "N/A"
+                if price_match and item_name_scraped.endswith(item_price): item_name_scraped = item_name_scraped[:-len(item_price)].strip()
+                if price_match and item_desc.startswith(item_price): item_desc = item_desc[len(item_price):].strip()
+
+                extracted_items.append(MenuItem(id_for_excel, None, "PDF Extracted", item_price, item_name_scraped, item_desc, None))
+                _internal_pdf_item_counter +=1
+
+            image_list = page.get_images(full=True)
+            for img_index, img in enumerate(image_list):
+                xref = img[0]
+                try:
+                    base_image = doc.extract_image(xref)
+                    if not base_image: continue
+                    image_bytes = base_image.pop("image"); del base_image # keep only the encoded bytes alive (no smask/metadata dict)
+                except Exception as e_img_extract:
+                    log_entries.append((f"PDF '{pdf_name}': Error extracting image xref {xref} on page {page_num + 1}: {e_img_extract}", "warning"))
+                    continue
+
+                img_filename_base = f"pdf_{sanitized_pdf_name}_p{page_num + 1}_img{img_index}"
+                # Passed as bytes on purpose: io.BytesIO(bytes) shares the buffer, while io.BytesIO(memoryview) would copy it
+                processed_image_path = process_single_image(image_bytes, img_filename_base, output_folder, ffmpeg_path_to_use, log_entries)
+                del image_bytes # free the embedded image before extracting the next one
+
+                if processed_image_path:
+                    extracted_images_paths.append(processed_image_path)
+                    image_filename = os.path.basename(processed_image_path)
+                    if image_filename not in seen_image_filenames: # text items never carry an image_filename, so only image rows are tracked
+                        seen_image_filenames.add(image_filename)
+                        extracted_items.append(MenuItem(f"PDF_Image_{_internal_pdf_item_counter}", image_filename, "PDF Image", "N/A",
+                                                        f"Image: {image_filename}", f"Extracted from page {page_num + 1} of {pdf_name}", None))
+                        _internal_pdf_item_counter +=1
+        log_entries.append((f"PDF '{pdf_name}': Extracted {len(extracted_items)} items (text/image placeholders) and processed {len(extracted_images_paths)} images.", "info"))
+    except Exception as e: log_entries.append((f"Error processing PDF '{pdf_name}': {e}\n{traceback.format_exc()}", "error"))
+    finally:
+        if doc: doc.close()
+    return extracted_items, extracted_images_paths, log_entries